@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+import sys
+from src.batch.video_cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
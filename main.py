@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 import sys
+import logging
 from PyQt6.QtWidgets import QApplication
 from src.gui.main_window import MainWindow
 
 def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s: %(message)s')
     app = QApplication(sys.argv)
+    app.setApplicationName('Zeeman Spectroscopy Analyzer')
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
@@ -0,0 +1,314 @@
+"""
+Headless (Qt-free) analysis of whole sets of Zeeman ring images.
+"""
+import csv
+import json
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.physics.zeeman import ZeemanMeasurement, process_measurement, calculate_bohr_magneton
+from src.processing.image_processor import ImageProcessor
+from src.processing.polar_rings import ring_order_is_plausible
+from src.processing.result_cache import MISS, DetectionResultCache
+
+RING_TYPES = ('inner', 'middle', 'outer')
+
+@dataclass
+class BatchItem:
+    file: str
+    current: float
+    center_x: Optional[float] = None
+    center_y: Optional[float] = None
+    radius_lower: Optional[float] = None
+    radius_upper: Optional[float] = None
+    mm_per_pixel: Optional[float] = None
+
+@dataclass
+class BatchSettings:
+    calibration_params: Tuple[float, float]
+    wavelength_nm: float = 643.8
+    mm_per_pixel: Optional[float] = None
+    refine_center: bool = True
+    center_search: str = 'coarse_to_fine'
+    center_search_window_half_size: int = 10
+    result_cache: Optional[str] = None                # SQLite file reused across runs
+    result_cache_bytes: int = 64 * 1024 * 1024
+
+@dataclass
+class BatchResult:
+    item: BatchItem
+    center: Optional[Tuple[float, float]] = None
+    radii_px: Dict[str, Optional[float]] = field(default_factory=lambda: dict.fromkeys(RING_TYPES))
+    measurement: Optional[ZeemanMeasurement] = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+    order_spacing_sq: Optional[float] = None          # r^2 spacing of successive orders, if several were seen
+    detection_cache: Optional[str] = None             # 'hit' or 'miss' when a result cache was consulted
+
+def _optional_float(value: Optional[str]) -> Optional[float]:
+    if value is None or str(value).strip() == '':
+        return None
+    return float(value)
+
+def load_manifest(path: Path) -> List[BatchItem]:
+    items = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if not row.get('file'):
+                continue
+            items.append(BatchItem(
+                file=row['file'].strip(),
+                current=float(row['current']),
+                center_x=_optional_float(row.get('center_x')),
+                center_y=_optional_float(row.get('center_y')),
+                radius_lower=_optional_float(row.get('radius_lower')),
+                radius_upper=_optional_float(row.get('radius_upper')),
+                mm_per_pixel=_optional_float(row.get('mm_per_pixel')),
+            ))
+    return items
+
+def load_calibration_file(path: Path) -> Tuple[float, float]:
+    currents, fields = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            currents.append(float(row['current']))
+            fields.append(float(row['field']))
+    if len(currents) < 2:
+        raise ValueError("Calibration file needs at least two (current, field) points.")
+    slope, intercept = np.polyfit(currents, fields, 1)
+    return float(slope), float(intercept)
+
+def load_image(path: Path) -> np.ndarray:
+    image = cv2.imread(str(path))
+    if image is None:
+        raise ValueError(f"Failed to load image {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def detect_rings(processor: ImageProcessor, enhanced_image: np.ndarray, item: BatchItem, settings: BatchSettings
+                 ) -> Tuple[Tuple[float, float], Dict[str, Optional[float]], Optional[float]]:
+    cache = processor.result_cache
+    if cache is None:
+        return _detect_rings(processor, enhanced_image, item, settings)
+    # The whole per-image search is cached, not just the center refinement inside it.
+    key = cache.key(enhanced_image, ('detect_rings', item.center_x, item.center_y, item.radius_lower,
+                                     item.radius_upper, settings.refine_center, settings.center_search,
+                                     settings.center_search_window_half_size, processor.circle_scorer.thickness))
+    cached = cache.get(key)
+    if cached is not MISS:
+        processor.last_detection_cached = True
+        return tuple(cached['center']), cached['order'], cached['order_spacing_sq']
+    center, order, order_spacing_sq = _detect_rings(processor, enhanced_image, item, settings)
+    cache.put(key, {'center': center, 'order': order, 'order_spacing_sq': order_spacing_sq})
+    processor.last_detection_cached = False
+    return center, order, order_spacing_sq
+
+def _detect_rings(processor: ImageProcessor, enhanced_image: np.ndarray, item: BatchItem, settings: BatchSettings
+                  ) -> Tuple[Tuple[float, float], Dict[str, Optional[float]], Optional[float]]:
+    height, width = enhanced_image.shape
+    if item.center_x is not None and item.center_y is not None:
+        center = (item.center_x, item.center_y)
+    else:
+        center = processor.estimate_ring_center(enhanced_image)
+        if center is None:
+            raise ValueError("Could not locate the ring center.")
+
+    max_radius = min(center[0], center[1], width - 1 - center[0], height - 1 - center[1])
+    lower = item.radius_lower if item.radius_lower is not None else 0.0
+    upper = item.radius_upper if item.radius_upper is not None else max_radius
+    if not (0 <= lower < upper):
+        raise ValueError("Annulus limits are invalid.")
+
+    if settings.refine_center:
+        refine_lower, refine_upper = lower, upper
+        # Refining against the whole frame, or an annulus spanning several rings, is slow and
+        # unreliable; use the band around the brightest ring instead.
+        coarse = processor.detect_rings_polar(enhanced_image, center[0], center[1], lower, upper)
+        if coarse:
+            brightest = max(coarse['rings'], key=lambda ring: ring['intensity'])['radius_peak']
+            band = max(5.0, 0.05 * brightest)
+            refine_lower, refine_upper = max(lower, brightest - band), min(upper, brightest + band)
+        refined = processor.auto_detect_radius_refined(
+            enhanced_image, int(round(center[0])), int(round(center[1])), int(refine_lower), int(np.ceil(refine_upper)),
+            center_search_window_half_size=settings.center_search_window_half_size,
+            center_search=settings.center_search)
+        if refined:
+            center = (float(refined['center_x']), float(refined['center_y']))
+
+    detected = processor.detect_rings_polar(enhanced_image, center[0], center[1], lower, upper)
+    if not detected:
+        raise ValueError("No rings found in the annulus.")
+
+    complete = [order for order in detected['orders'] if all(order[name] is not None for name in RING_TYPES)]
+    plausible = [order for order in complete if ring_order_is_plausible(order, detected['order_spacing_sq'])]
+    if complete and not plausible:
+        radii = ', '.join(f"{order['inner']:.1f}/{order['middle']:.1f}/{order['outer']:.1f}" for order in complete)
+        raise ValueError(f"No plausible ring order (r_i/r_c/r_o: {radii} px)")
+    candidates = plausible or detected['orders']
+    if item.radius_lower is None or item.radius_upper is None:
+        # Without an annulus hint the first complete order stands in for the user's choice.
+        return center, candidates[0], detected['order_spacing_sq']
+    # An annulus that spans several orders is taken to be centered on the one that is meant.
+    target = (item.radius_lower + item.radius_upper) / 2
+    order = min(candidates, key=lambda order: abs(_order_radius(order) - target))
+    return center, order, detected['order_spacing_sq']
+
+def _order_radius(order: Dict[str, Optional[float]]) -> float:
+    if order['middle'] is not None:
+        return order['middle']
+    return float(np.mean([order[name] for name in RING_TYPES if order[name] is not None]))
+
+def build_measurement(item: BatchItem, radii_px: Dict[str, Optional[float]],
+                      settings: BatchSettings) -> ZeemanMeasurement:
+    mm_per_pixel = item.mm_per_pixel if item.mm_per_pixel is not None else settings.mm_per_pixel
+    if not mm_per_pixel:
+        raise ValueError("No mm/pixel scale given for this image.")
+    missing = [name for name in RING_TYPES if radii_px[name] is None]
+    if missing:
+        raise ValueError(f"Rings not found: {', '.join(missing)}")
+
+    slope, intercept = settings.calibration_params
+    magnetic_field = (slope * item.current + intercept) / 1e4  # Convert Gauss to Tesla
+
+    measurement = ZeemanMeasurement(
+        B_field=magnetic_field,
+        R_center=radii_px['middle'] * mm_per_pixel,
+        R_inner=radii_px['inner'] * mm_per_pixel,
+        R_outer=radii_px['outer'] * mm_per_pixel,
+        wavelength=settings.wavelength_nm * 1e-9,
+        current=item.current,
+        mm_per_pixel=mm_per_pixel
+    )
+    return process_measurement(measurement)
+
+def attach_result_cache(processor: ImageProcessor, settings: BatchSettings):
+    if settings.result_cache and processor.result_cache is None:
+        processor.result_cache = DetectionResultCache(Path(settings.result_cache), settings.result_cache_bytes)
+
+def analyze_image(processor: ImageProcessor, image: np.ndarray, item: BatchItem, settings: BatchSettings) -> BatchResult:
+    result = BatchResult(item=item)
+    attach_result_cache(processor, settings)
+    processor.last_detection_cached = None
+    try:
+        t0 = time.perf_counter()
+        processor.image = image
+        enhanced = processor.enhance_image()
+        t1 = time.perf_counter()
+        result.center, order, result.order_spacing_sq = detect_rings(processor, enhanced, item, settings)
+        result.radii_px = dict(order)
+        t2 = time.perf_counter()
+        result.measurement = build_measurement(item, result.radii_px, settings)
+        t3 = time.perf_counter()
+        result.timings.update(enhance=t1 - t0, detect=t2 - t1, measure=t3 - t2)
+    except Exception as e:
+        result.error = str(e)
+    finally:
+        processor.image = None
+    if processor.last_detection_cached is not None:
+        result.detection_cache = 'hit' if processor.last_detection_cached else 'miss'
+    return result
+
+def analyze_item(processor: ImageProcessor, item: BatchItem, image_dir: Path, settings: BatchSettings) -> BatchResult:
+    t0 = time.perf_counter()
+    try:
+        image = load_image(image_dir / item.file)
+    except Exception as e:
+        return BatchResult(item=item, error=str(e))
+    load_time = time.perf_counter() - t0
+    result = analyze_image(processor, image, item, settings)
+    result.timings['load'] = load_time
+    return result
+
+def run_batch(items: List[BatchItem], image_dir: Path, settings: BatchSettings, progress=None) -> List[BatchResult]:
+    processor = ImageProcessor()
+    results = []
+    for i, item in enumerate(items):
+        results.append(analyze_item(processor, item, image_dir, settings))
+        if progress:
+            progress(i + 1, len(items), results[-1])
+    return results
+
+def throughput_report(results: List[BatchResult], wall_time: float, workers: int = 1) -> Dict[str, object]:
+    stages = {}
+    for result in results:
+        for stage, seconds in result.timings.items():
+            stages.setdefault(stage, []).append(seconds)
+    cache_hits = sum(1 for result in results if result.detection_cache == 'hit')
+    cache_lookups = sum(1 for result in results if result.detection_cache is not None)
+    return {
+        'images': len(results),
+        'workers': workers,
+        'wall_time_s': wall_time,
+        'images_per_s': len(results) / wall_time if wall_time > 0 else 0.0,
+        'stages': {
+            stage: {'total_s': float(np.sum(times)), 'mean_s': float(np.mean(times)), 'count': len(times)}
+            for stage, times in stages.items()
+        },
+        'result_cache': {
+            'hits': cache_hits,
+            'lookups': cache_lookups,
+            'hit_rate': cache_hits / cache_lookups if cache_lookups else 0.0,
+        }
+    }
+
+def summarize(results: List[BatchResult]) -> Dict[str, float]:
+    measurements = [r.measurement for r in results if r.measurement is not None]
+    (bohr_magneton_inner, bohr_magneton_outer, bohr_magneton_avg,
+     specific_charge_inner, specific_charge_outer, specific_charge_avg) = calculate_bohr_magneton(measurements)
+    return {
+        'images': len(results),
+        'measurements': len(measurements),
+        'failures': sum(1 for r in results if r.error),
+        'bohr_magneton_inner': float(bohr_magneton_inner),
+        'bohr_magneton_outer': float(bohr_magneton_outer),
+        'bohr_magneton_avg': float(bohr_magneton_avg),
+        'specific_charge_inner': float(specific_charge_inner),
+        'specific_charge_outer': float(specific_charge_outer),
+        'specific_charge_avg': float(specific_charge_avg),
+    }
+
+MEASUREMENT_COLUMNS = [
+    'file', 'I(A)', 'B(T)', 'center_x(px)', 'center_y(px)',
+    'r_i(px)', 'r_c(px)', 'r_o(px)', 'R_i(mm)', 'R_c(mm)', 'R_o(mm)',
+    'Δλ_i(nm)', 'Δλ_o(nm)', 'ΔE_i(eV)', 'ΔE_o(eV)', 'error'
+]
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return format(value, spec) if value is not None else ""
+
+def measurement_row(result: BatchResult) -> List[str]:
+    m = result.measurement
+    center = result.center or (None, None)
+    return [
+        result.item.file,
+        _fmt(result.item.current, '.4f'),
+        _fmt(m.B_field if m else None, '.6f'),
+        _fmt(center[0], '.2f'),
+        _fmt(center[1], '.2f'),
+        _fmt(result.radii_px.get('inner'), '.3f'),
+        _fmt(result.radii_px.get('middle'), '.3f'),
+        _fmt(result.radii_px.get('outer'), '.3f'),
+        _fmt(m.R_inner if m else None, '.4f'),
+        _fmt(m.R_center if m else None, '.4f'),
+        _fmt(m.R_outer if m else None, '.4f'),
+        _fmt(m.delta_lambda_i * 1e9 if m and m.delta_lambda_i is not None else None, '.6f'),
+        _fmt(m.delta_lambda_o * 1e9 if m and m.delta_lambda_o is not None else None, '.6f'),
+        _fmt(m.delta_E_i / 1.602176634e-19 if m and m.delta_E_i is not None else None, '.6e'),
+        _fmt(m.delta_E_o / 1.602176634e-19 if m and m.delta_E_o is not None else None, '.6e'),
+        result.error or ""
+    ]
+
+def write_outputs(results: List[BatchResult], output_dir: Path) -> Dict[str, float]:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / 'measurements.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(MEASUREMENT_COLUMNS)
+        for result in results:
+            writer.writerow(measurement_row(result))
+
+    summary = summarize(results)
+    with open(output_dir / 'results.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    return summary
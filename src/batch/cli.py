@@ -0,0 +1,103 @@
+"""
+Command-line entry point for headless batch analysis.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from src.batch.analysis import (BatchSettings, load_manifest, load_calibration_file, run_batch, write_outputs,
+                                throughput_report)
+from src.batch.parallel import ParallelBatchExecutor
+
+def add_analysis_arguments(parser: argparse.ArgumentParser):
+    calibration = parser.add_mutually_exclusive_group(required=True)
+    calibration.add_argument('--calibration', nargs=2, type=float, metavar=('SLOPE', 'INTERCEPT'),
+                             help='Field calibration B(Gauss) = SLOPE * I(A) + INTERCEPT')
+    calibration.add_argument('--calibration-file', type=Path,
+                             help='CSV with columns current,field (Gauss) to fit the calibration from')
+
+    parser.add_argument('--mm-per-pixel', type=float, help='Image scale in mm/pixel (a batch manifest can override it per image)')
+    parser.add_argument('--wavelength', type=float, default=643.8, help='Wavelength in nm (default: 643.8)')
+    parser.add_argument('--center-search', choices=['grid', 'coarse_to_fine'], default='coarse_to_fine',
+                        help='Center refinement strategy (default: coarse_to_fine)')
+    parser.add_argument('--search-half-size', type=int, default=10,
+                        help='Center search window half size in pixels (default: 10)')
+    parser.add_argument('--no-refine-center', action='store_true',
+                        help='Use the given or tracked center as-is instead of refining it')
+    parser.add_argument('--cache', type=Path,
+                        help='SQLite file caching detection results, so repeated runs skip the center search')
+    parser.add_argument('--cache-size', type=float, default=64,
+                        help='Maximum size of the detection cache in MB (default: 64)')
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Analyze a directory of Zeeman ring images without the GUI.')
+    parser.add_argument('image_dir', type=Path, help='Directory containing the ring images')
+    parser.add_argument('manifest', type=Path,
+                        help='CSV with columns file,current and optionally center_x,center_y,'
+                             'radius_lower,radius_upper,mm_per_pixel')
+    parser.add_argument('-o', '--output', type=Path, default=Path('batch_output'),
+                        help='Directory for measurements.csv and results.json')
+
+    add_analysis_arguments(parser)
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='Worker processes; 0 uses all cores, 1 runs in-process (default: 1)')
+    parser.add_argument('--max-in-flight', type=int,
+                        help='Frames queued to workers at once (default: twice the worker count)')
+    return parser
+
+def settings_from_args(args: argparse.Namespace) -> BatchSettings:
+    if args.calibration_file:
+        calibration_params = load_calibration_file(args.calibration_file)
+    else:
+        calibration_params = tuple(args.calibration)
+    return BatchSettings(
+        calibration_params=calibration_params,
+        wavelength_nm=args.wavelength,
+        mm_per_pixel=args.mm_per_pixel,
+        refine_center=not args.no_refine_center,
+        center_search=args.center_search,
+        center_search_window_half_size=args.search_half_size,
+        result_cache=str(args.cache) if args.cache else None,
+        result_cache_bytes=int(args.cache_size * 1024 * 1024)
+    )
+
+def print_progress(done: int, total: int, result):
+    status = f"error: {result.error}" if result.error else "ok"
+    print(f"[{done}/{total}] {result.item.file}: {status}", file=sys.stderr)
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = settings_from_args(args)
+    items = load_manifest(args.manifest)
+    if not items:
+        print("Manifest lists no images.", file=sys.stderr)
+        return 1
+
+    if args.workers == 1:
+        start = time.perf_counter()
+        results = run_batch(items, args.image_dir, settings, progress=print_progress)
+        wall_time = time.perf_counter() - start
+        workers = 1
+    else:
+        executor = ParallelBatchExecutor(workers=args.workers or None, max_in_flight=args.max_in_flight)
+        results = executor.run(items, args.image_dir, settings, progress=print_progress)
+        wall_time = executor.wall_time
+        workers = executor.workers
+    summary = write_outputs(results, args.output)
+
+    report = throughput_report(results, wall_time, workers)
+    with open(args.output / 'throughput.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    stage_text = ", ".join(f"{stage} {stats['mean_s'] * 1e3:.1f} ms" for stage, stats in report['stages'].items())
+    print(f"Throughput: {report['images_per_s']:.2f} images/s on {workers} worker(s) (mean per image: {stage_text})")
+    if report['result_cache']['lookups']:
+        print(f"Detection cache: {report['result_cache']['hits']} of {report['result_cache']['lookups']} "
+              f"lookups hit ({report['result_cache']['hit_rate']:.0%})")
+
+    print(f"Measurements: {summary['measurements']} of {summary['images']} images "
+          f"({summary['failures']} failed)")
+    print(f"Average Bohr magneton: {summary['bohr_magneton_avg']:.3e} J/T")
+    print(f"Average specific charge (e/m): {summary['specific_charge_avg']:.3e} C/kg")
+    print(f"Results written to {args.output}")
+    return 0 if summary['measurements'] else 1
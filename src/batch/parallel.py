@@ -0,0 +1,122 @@
+"""
+Process-pool batch analysis with frames handed to workers through shared memory.
+"""
+import os
+import time
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.batch.analysis import BatchItem, BatchResult, BatchSettings, analyze_image, load_image
+from src.processing.image_processor import ImageProcessor
+
+_worker_processor: Optional[ImageProcessor] = None
+
+def _init_worker():
+    global _worker_processor
+    # Parallelism comes from the pool; OpenCV's own thread pool would only oversubscribe the cores.
+    cv2.setNumThreads(1)
+    _worker_processor = ImageProcessor()
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the block with the resource tracker. Pool
+        # workers share the parent's tracker, so that only repeats the parent's registration;
+        # unregistering here would drop it and break the parent's unlink.
+        return shared_memory.SharedMemory(name=name)
+
+def _analyze_shared_frame(shm_name: str, shape: Tuple[int, ...], dtype: str,
+                          item: BatchItem, settings: BatchSettings) -> BatchResult:
+    shm = _attach_shared_memory(shm_name)
+    try:
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        result = analyze_image(_worker_processor, frame, item, settings)
+        del frame
+        return result
+    finally:
+        shm.close()
+
+class ParallelBatchExecutor:
+    def __init__(self, workers: Optional[int] = None, max_in_flight: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.wall_time = 0.0
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+    def _restart_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._start_pool()
+
+    def run(self, items: List[BatchItem], image_dir: Path, settings: BatchSettings, progress=None) -> List[BatchResult]:
+        results: List[Optional[BatchResult]] = [None] * len(items)
+        pending: Dict = {}
+        done_count = 0
+
+        def finish(index: int, result: BatchResult):
+            nonlocal done_count
+            results[index] = result
+            done_count += 1
+            if progress:
+                progress(done_count, len(items), result)
+
+        def collect(return_when):
+            completed, _ = wait(list(pending), return_when=return_when)
+            for future in completed:
+                index, shm, load_time = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = BatchResult(item=items[index], error=f"Worker failed: {e}")
+                finally:
+                    shm.close()
+                    shm.unlink()
+                result.timings['load'] = load_time
+                finish(index, result)
+
+        start = time.perf_counter()
+        self._start_pool()
+        try:
+            for index, item in enumerate(items):
+                while len(pending) >= self.max_in_flight:
+                    collect(FIRST_COMPLETED)
+
+                t0 = time.perf_counter()
+                try:
+                    image = load_image(image_dir / item.file)
+                except Exception as e:
+                    finish(index, BatchResult(item=item, error=str(e)))
+                    continue
+                shm = shared_memory.SharedMemory(create=True, size=image.nbytes)
+                np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+                load_time = time.perf_counter() - t0
+                args = (shm.name, image.shape, image.dtype.str, item, settings)
+                del image
+
+                try:
+                    future = self._pool.submit(_analyze_shared_frame, *args)
+                except BrokenProcessPool:
+                    # A crashed worker poisons the pool; in-flight frames are reported as failed, later ones get a fresh pool.
+                    collect(ALL_COMPLETED)
+                    self._restart_pool()
+                    future = self._pool.submit(_analyze_shared_frame, *args)
+                pending[future] = (index, shm, load_time)
+
+            while pending:
+                collect(ALL_COMPLETED)
+        finally:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+            for _, shm, _ in pending.values():
+                shm.close()
+                shm.unlink()
+        self.wall_time = time.perf_counter() - start
+        return results
@@ -0,0 +1,253 @@
+"""
+Streaming analysis of ring videos: frames are read one at a time, paired with the coil
+current from a timestamped log and analyzed as they arrive.
+"""
+import csv
+import threading
+import time
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from src.batch.analysis import BatchItem, BatchResult, BatchSettings, analyze_image
+from src.processing.image_processor import ImageProcessor
+from src.processing.polar_rings import ring_order_is_plausible
+
+TRACK_SPAN = 0.5            # half-width in r^2 of the tracked annulus, as a fraction of the order spacing
+TRACK_TOLERANCE = 0.25      # allowed r^2 shift of the tracked middle ring, as a fraction of the order spacing
+
+@dataclass
+class VideoFrame:
+    index: int
+    time_s: float
+    image: np.ndarray
+
+@dataclass
+class VideoSettings:
+    step: int = 1                       # analyze every step-th frame; the others are grabbed but not decoded to RGB
+    start_s: float = 0.0
+    stop_s: Optional[float] = None
+    time_offset_s: float = 0.0          # added to frame times before looking up the current log
+    track_center: bool = True           # follow the previous frame's center and ring order
+    track_margin_px: float = 5.0        # minimum slack around the tracked middle ring
+
+def iter_video_frames(path: Path, step: int = 1, start_s: float = 0.0,
+                      stop_s: Optional[float] = None) -> Iterator[VideoFrame]:
+    if step < 1:
+        raise ValueError("Frame step must be at least 1.")
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise ValueError(f"Failed to open video {path}")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS)
+        if start_s > 0:
+            capture.set(cv2.CAP_PROP_POS_MSEC, start_s * 1000)
+        index = int(capture.get(cv2.CAP_PROP_POS_FRAMES))
+        grabbed = 0
+        while capture.grab():
+            time_s = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if time_s <= 0 and index > 0 and fps > 0:
+                # Some backends do not report timestamps.
+                time_s = index / fps
+            if stop_s is not None and time_s > stop_s:
+                break
+            if grabbed % step == 0:
+                ok, image = capture.retrieve()
+                if ok:
+                    yield VideoFrame(index, time_s, cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+            index += 1
+            grabbed += 1
+    finally:
+        capture.release()
+
+def _parse_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.strip()).timestamp()
+
+class CurrentLog:
+    def __init__(self, times: np.ndarray, currents: np.ndarray):
+        order = np.argsort(times, kind='stable')
+        self.times = np.asarray(times, dtype=np.float64)[order]
+        self.currents = np.asarray(currents, dtype=np.float64)[order]
+        if len(self.times) == 0:
+            raise ValueError("Current log is empty.")
+
+    @classmethod
+    def load(cls, path: Path) -> 'CurrentLog':
+        # CSV with columns time,current. Times are seconds or ISO 8601 timestamps; either way
+        # they are taken relative to the first row, which is matched to the start of the video.
+        times, currents = [], []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if not row.get('time'):
+                    continue
+                times.append(_parse_time(row['time']))
+                currents.append(float(row['current']))
+        if not times:
+            raise ValueError(f"No time,current rows in {path}")
+        times = np.array(times)
+        return cls(times - times[0], np.array(currents))
+
+    def current_at(self, time_s: float) -> Optional[float]:
+        # Linear interpolation between log entries; None outside the logged interval.
+        if time_s < self.times[0] or time_s > self.times[-1]:
+            return None
+        return float(np.interp(time_s, self.times, self.currents))
+
+class VideoAnalysis:
+    """
+    Iterating yields one BatchResult per analyzed frame, as soon as it is ready.
+
+    Only the current frame is held in memory. Frames with no logged current are reported
+    as errors. With track_center, the rings are located from scratch only until the first
+    frame is measured in a plausible ring order; every later frame is searched around the
+    last measured center and ring order, so the whole sweep measures one interference order.
+    A frame in which that order cannot be measured is reported as a failure.
+    """
+    def __init__(self, path: Path, current_log: CurrentLog, settings: BatchSettings,
+                 video_settings: Optional[VideoSettings] = None, processor: Optional[ImageProcessor] = None):
+        self.path = Path(path)
+        self.current_log = current_log
+        self.settings = settings
+        self.video_settings = video_settings or VideoSettings()
+        self.processor = processor or ImageProcessor()
+        self.cancelled = threading.Event()
+        self.frames_analyzed = 0
+        self.measurements = 0
+        self.failures = 0
+        self.first_index: Optional[int] = None
+        self.last_index: Optional[int] = None
+        self.first_time_s = 0.0
+        self.video_time_s = 0.0
+        self.wall_time_s = 0.0
+        self.stage_totals: Dict[str, float] = {}
+
+    def __iter__(self) -> Iterator[BatchResult]:
+        video = self.video_settings
+        tracked: Optional[BatchResult] = None      # last frame measured in the tracked order
+        order_spacing_sq: Optional[float] = None   # taken from the first tracked frame
+        started = time.perf_counter()
+        frames = iter_video_frames(self.path, video.step, video.start_s, video.stop_s)
+        try:
+            while not self.cancelled.is_set():
+                t0 = time.perf_counter()
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                load_time = time.perf_counter() - t0
+
+                log_time_s = frame.time_s + video.time_offset_s
+                current = self.current_log.current_at(log_time_s)
+                item = BatchItem(file=f'{self.path.name}#{frame.index}',
+                                 current=current if current is not None else np.nan)
+                if current is None:
+                    result = BatchResult(item=item, error=f'No current logged at {log_time_s:.3f} s')
+                else:
+                    result = self._analyze_frame(frame.image, item, tracked, order_spacing_sq)
+                    if tracked is None:
+                        order_spacing_sq = result.order_spacing_sq
+                    self._check_order(result, order_spacing_sq)
+                result.timings['load'] = load_time
+                if video.track_center and result.error is None:
+                    tracked = result
+
+                self._count(result, frame)
+                self.wall_time_s = time.perf_counter() - started
+                yield result
+        finally:
+            frames.close()
+            self.wall_time_s = time.perf_counter() - started
+
+    def _analyze_frame(self, image: np.ndarray, item: BatchItem, tracked: Optional[BatchResult],
+                       order_spacing_sq: Optional[float]) -> BatchResult:
+        if tracked is None:
+            return analyze_image(self.processor, image, item, self.settings)
+        # Search around the previous frame's center. When other orders are visible, restrict the
+        # search to an annulus reaching halfway to the neighbouring orders in r^2, which keeps
+        # them out however far the tracked order splits.
+        middle = tracked.radii_px['middle']
+        margin = self.video_settings.track_margin_px
+        if order_spacing_sq is not None:
+            half_width_sq = TRACK_SPAN * order_spacing_sq
+            item.radius_lower = max(0.0, min(middle - margin, np.sqrt(max(0.0, middle ** 2 - half_width_sq))))
+            item.radius_upper = max(middle + margin, np.sqrt(middle ** 2 + half_width_sq))
+        item.center_x, item.center_y = tracked.center
+        result = self._check_tracking(analyze_image(self.processor, image, item, self.settings), tracked, order_spacing_sq)
+        # On failure, locate the center again within the annulus, then fall back to a full
+        # search; either is accepted only if it finds the tracked order.
+        fallbacks = [BatchItem(file=item.file, current=item.current)]
+        if item.radius_lower is not None:
+            fallbacks.insert(0, BatchItem(file=item.file, current=item.current,
+                                          radius_lower=item.radius_lower, radius_upper=item.radius_upper))
+        for fallback in fallbacks:
+            if result.error is None:
+                break
+            failed_timings = result.timings
+            result = self._check_tracking(analyze_image(self.processor, image, fallback, self.settings),
+                                          tracked, order_spacing_sq)
+            for stage, seconds in failed_timings.items():
+                result.timings[stage] = result.timings.get(stage, 0.0) + seconds
+        return result
+
+    def _check_tracking(self, result: BatchResult, tracked: BatchResult,
+                        order_spacing_sq: Optional[float]) -> BatchResult:
+        # The middle ring does not shift with the field, so a large jump means another order.
+        if result.error is not None:
+            return result
+        expected = tracked.radii_px['middle']
+        tolerance = self.video_settings.track_margin_px
+        if order_spacing_sq is not None:
+            tolerance = max(tolerance, np.sqrt(expected ** 2 + TRACK_TOLERANCE * order_spacing_sq) - expected)
+        if abs(result.radii_px['middle'] - expected) > tolerance:
+            result.error = (f"Lost the tracked ring order: middle ring at {result.radii_px['middle']:.1f} px, "
+                            f"expected {expected:.1f} px")
+            result.measurement = None
+        return result
+
+    def _check_order(self, result: BatchResult, order_spacing_sq: Optional[float]):
+        # Frames are checked against the spacing seen in the first tracked frame, since a
+        # tracked annulus usually shows too few orders to estimate it again.
+        if result.error is not None or ring_order_is_plausible(result.radii_px, order_spacing_sq):
+            return
+        radii = result.radii_px
+        result.error = (f"No plausible ring order (r_i/r_c/r_o: "
+                        f"{radii['inner']:.1f}/{radii['middle']:.1f}/{radii['outer']:.1f} px)")
+        result.measurement = None
+
+    def _count(self, result: BatchResult, frame: VideoFrame):
+        self.frames_analyzed += 1
+        if result.measurement is not None:
+            self.measurements += 1
+        if result.error:
+            self.failures += 1
+        if self.first_index is None:
+            self.first_index = frame.index
+            self.first_time_s = frame.time_s
+        self.last_index = frame.index
+        self.video_time_s = frame.time_s - self.first_time_s
+        for stage, seconds in result.timings.items():
+            self.stage_totals[stage] = self.stage_totals.get(stage, 0.0) + seconds
+
+    def report(self) -> Dict[str, Any]:
+        frames_read = self.last_index - self.first_index + 1 if self.first_index is not None else 0
+        wall = self.wall_time_s
+        return {
+            'video': str(self.path),
+            'frames_read': frames_read,
+            'frames_analyzed': self.frames_analyzed,
+            'step': self.video_settings.step,
+            'measurements': self.measurements,
+            'failures': self.failures,
+            'wall_time_s': wall,
+            'frames_per_s': self.frames_analyzed / wall if wall > 0 else 0.0,
+            'video_frames_per_s': frames_read / wall if wall > 0 else 0.0,
+            'realtime_factor': self.video_time_s / wall if wall > 0 else 0.0,
+            'stages': {
+                stage: {'total_s': total, 'mean_s': total / self.frames_analyzed}
+                for stage, total in self.stage_totals.items()
+            }
+        }
@@ -0,0 +1,70 @@
+"""
+Command-line entry point for streaming analysis of ring videos.
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from src.batch.analysis import MEASUREMENT_COLUMNS, measurement_row, summarize
+from src.batch.cli import add_analysis_arguments, settings_from_args
+from src.batch.video import CurrentLog, VideoAnalysis, VideoSettings
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Analyze a video of a current sweep frame by frame without the GUI.')
+    parser.add_argument('video', type=Path, help='Video file readable by OpenCV')
+    parser.add_argument('current_log', type=Path,
+                        help='CSV with columns time,current; time in seconds or ISO 8601, relative to the first row')
+    parser.add_argument('-o', '--output', type=Path, default=Path('video_output'),
+                        help='Directory for measurements.csv, results.json and throughput.json')
+
+    add_analysis_arguments(parser)
+    parser.add_argument('--step', type=int, default=1, help='Analyze every STEP-th frame (default: 1)')
+    parser.add_argument('--start', type=float, default=0.0, help='Start time in the video, in seconds')
+    parser.add_argument('--stop', type=float, help='Stop time in the video, in seconds')
+    parser.add_argument('--time-offset', type=float, default=0.0,
+                        help='Seconds added to frame times before looking up the current log')
+    parser.add_argument('--no-tracking', action='store_true',
+                        help="Locate the rings in every frame instead of following the previous frame's center and ring order")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = settings_from_args(args)
+    analysis = VideoAnalysis(args.video, CurrentLog.load(args.current_log), settings,
+                             VideoSettings(step=args.step, start_s=args.start, stop_s=args.stop,
+                                           time_offset_s=args.time_offset, track_center=not args.no_tracking))
+
+    # Rows are written as frames finish, so a long video can be followed (or interrupted) midway.
+    args.output.mkdir(parents=True, exist_ok=True)
+    results = []
+    with open(args.output / 'measurements.csv', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(MEASUREMENT_COLUMNS)
+        try:
+            for result in analysis:
+                writer.writerow(measurement_row(result))
+                f.flush()
+                results.append(result)
+                status = f"error: {result.error}" if result.error else "ok"
+                print(f"{result.item.file} (I = {result.item.current:.3f} A): {status}", file=sys.stderr)
+        except KeyboardInterrupt:
+            print("Interrupted; writing results for the frames analyzed so far.", file=sys.stderr)
+
+    report = analysis.report()
+    with open(args.output / 'throughput.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Throughput: {report['frames_per_s']:.2f} analyzed frames/s, {report['video_frames_per_s']:.2f} video "
+          f"frames/s ({report['realtime_factor']:.2f}x real time, every {report['step']} frame(s))")
+    if not results:
+        print("No frames analyzed.", file=sys.stderr)
+        return 1
+
+    summary = summarize(results)
+    with open(args.output / 'results.json', 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"Measurements: {summary['measurements']} of {summary['images']} frames ({summary['failures']} failed)")
+    print(f"Average Bohr magneton: {summary['bohr_magneton_avg']:.3e} J/T")
+    print(f"Average specific charge (e/m): {summary['specific_charge_avg']:.3e} C/kg")
+    print(f"Results written to {args.output}")
+    return 0 if summary['measurements'] else 1
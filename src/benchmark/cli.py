@@ -0,0 +1,72 @@
+"""
+Command-line entry point for the synthetic detection benchmark.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from src.benchmark.suite import (CONDITIONS, STAGES, BenchmarkSettings, build_cases, run_benchmark, results_to_dict,
+                                 write_results, compare_to_baseline)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark ring detection speed and accuracy on synthetic '
+                                                 'Fabry-Perot frames with known ring radii.')
+    parser.add_argument('-o', '--output', type=Path, default=Path('benchmark_results.json'),
+                        help='JSON file for the results (default: benchmark_results.json)')
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[1, 5, 12],
+                        help='Frame sizes to generate (default: 1 5 12)')
+    parser.add_argument('--conditions', nargs='+', choices=CONDITIONS, default=list(CONDITIONS),
+                        help='Image conditions to generate (default: all)')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per stage, the first of which is reported as cold (default: 3, minimum: 2)')
+    parser.add_argument('--center-search', choices=['grid', 'coarse_to_fine'], default='coarse_to_fine',
+                        help='Center refinement strategy (default: coarse_to_fine)')
+    parser.add_argument('--search-half-size', type=int, default=10,
+                        help='Center search window half size in pixels (default: 10)')
+    parser.add_argument('--seed', type=int, default=0, help='Noise seed (default: 0)')
+    parser.add_argument('--baseline', type=Path, help='Earlier results JSON to check for regressions against')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed relative slowdown per stage before flagging a regression (default: 0.25)')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.5,
+                        help='Allowed growth of a radius/center error in pixels (default: 0.5)')
+    return parser
+
+def print_progress(done: int, total: int, result):
+    if result.error:
+        print(f"[{done}/{total}] {result.case.name}: error: {result.error}", file=sys.stderr)
+        return
+    timing_text = ", ".join(f"{stage} {result.timings[stage]['min_s'] * 1e3:.1f} ms" for stage in STAGES)
+    radius_error = result.accuracy.get('auto_radius_error_px')
+    center_error = result.accuracy.get('auto_center_error_px')
+    accuracy_text = (f"radius error {radius_error:+.2f} px, center error {center_error:.2f} px"
+                     if radius_error is not None else "auto-detection failed")
+    print(f"[{done}/{total}] {result.case.name} ({result.width}x{result.height}): {timing_text}; {accuracy_text}",
+          file=sys.stderr)
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if any(mp <= 0 for mp in args.megapixels):
+        print("Frame sizes must be positive.", file=sys.stderr)
+        return 1
+    settings = BenchmarkSettings(repeats=args.repeats, center_search=args.center_search,
+                                 center_search_window_half_size=args.search_half_size, seed=args.seed)
+    cases = build_cases(args.megapixels, args.conditions, seed=args.seed)
+    results = run_benchmark(cases, settings, progress=print_progress)
+    report = results_to_dict(results, settings)
+    write_results(report, args.output)
+    print(f"Results written to {args.output}")
+
+    failures = [result.case.name for result in results if result.error]
+    if failures:
+        print(f"Failed cases: {', '.join(failures)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, time_tolerance=args.time_tolerance,
+                                          accuracy_tolerance_px=args.accuracy_tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 1 if failures else 0
@@ -0,0 +1,221 @@
+"""
+Speed and accuracy benchmark of the ring-detection pipeline on synthetic frames.
+"""
+import datetime
+import json
+import os
+import platform
+import statistics
+import time
+import cv2
+import numpy as np
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from src.benchmark.synthetic import SyntheticRingSpec, SyntheticRingImage, generate_rings
+from src.processing.image_processor import ImageProcessor
+
+CONDITIONS = ('clean', 'nominal', 'noisy', 'blurred', 'vignetted', 'off_center', 'wide_split')
+STAGES = ('enhance', 'analyze_sampled', 'analyze_integrated', 'auto_detect')
+
+@dataclass
+class BenchmarkSettings:
+    repeats: int = 3
+    center_search: str = 'coarse_to_fine'
+    center_search_window_half_size: int = 10
+    click_error: Tuple[int, int] = (3, -2)     # Offset of the starting center from the true one, in pixels
+    seed: int = 0
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    condition: str
+    spec: SyntheticRingSpec
+
+@dataclass
+class CaseResult:
+    case: BenchmarkCase
+    width: int = 0
+    height: int = 0
+    truth: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    accuracy: Dict[str, Optional[float]] = field(default_factory=dict)
+    evaluations: Optional[int] = None
+    error: Optional[str] = None
+
+def condition_spec(condition: str, megapixels: float, seed: int = 0) -> SyntheticRingSpec:
+    spec = SyntheticRingSpec(megapixels=megapixels, seed=seed)
+    if condition == 'clean':
+        return replace(spec, blur_sigma=0.0, peak_photons=0.0, read_noise=0.0, vignetting=0.0)
+    if condition == 'nominal':
+        return spec
+    if condition == 'noisy':
+        return replace(spec, peak_photons=30.0, read_noise=8.0)
+    if condition == 'blurred':
+        return replace(spec, blur_sigma=3.0)
+    if condition == 'vignetted':
+        return replace(spec, vignetting=0.7)
+    if condition == 'off_center':
+        short_side = np.sqrt(megapixels * 1e6 / spec.aspect)
+        return replace(spec, center_offset=(0.06 * short_side, -0.04 * short_side))
+    if condition == 'wide_split':
+        return replace(spec, zeeman_splitting=0.3)
+    raise ValueError(f"Unknown benchmark condition '{condition}'.")
+
+def build_cases(megapixels: Sequence[float], conditions: Sequence[str] = CONDITIONS, seed: int = 0) -> List[BenchmarkCase]:
+    return [BenchmarkCase(name=f"{condition}@{mp:g}MP", condition=condition, spec=condition_spec(condition, mp, seed))
+            for mp in megapixels for condition in conditions]
+
+def annulus_for(order: Dict[str, float], next_order: Optional[Dict[str, float]]) -> Tuple[int, int]:
+    # Half-way to the neighbouring components, as a user would bracket the middle ring.
+    gaps = [order['middle'] - order['inner'], order['outer'] - order['middle']]
+    half = 0.5 * min(gap for gap in gaps if gap > 0) if any(gap > 0 for gap in gaps) else None
+    if half is None:
+        half = 0.25 * (next_order['middle'] - order['middle']) if next_order else 0.1 * order['middle']
+    half = max(3.0, half)
+    return int(np.floor(order['middle'] - half)), int(np.ceil(order['middle'] + half))
+
+def _timed(function: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def _summarize_runs(runs: List[float]) -> Dict[str, Any]:
+    # The first run pays for cold caches (e.g. the integrator's bin map); the rest show the steady state.
+    warm = runs[1:] or runs
+    return {'runs_s': runs, 'cold_s': runs[0], 'min_s': min(warm), 'median_s': statistics.median(warm)}
+
+def run_case(case: BenchmarkCase, settings: BenchmarkSettings) -> CaseResult:
+    result = CaseResult(case=case)
+    try:
+        generate_time, synthetic = _timed(lambda: generate_rings(case.spec))
+        result.height, result.width = synthetic.image.shape[:2]
+        result.timings['generate'] = _summarize_runs([generate_time])
+        _measure(synthetic, settings, result)
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+def _measure(synthetic: SyntheticRingImage, settings: BenchmarkSettings, result: CaseResult):
+    if not synthetic.rings:
+        raise ValueError("No complete ring order fits in the frame.")
+    order = synthetic.first_order()
+    next_order = synthetic.rings[1] if len(synthetic.rings) > 1 else None
+    true_x, true_y = synthetic.center
+    lower, upper = annulus_for(order, next_order)
+    start_x = int(round(true_x)) + settings.click_error[0]
+    start_y = int(round(true_y)) + settings.click_error[1]
+    result.truth = {'center_x': true_x, 'center_y': true_y, 'first_order': order,
+                    'annulus': [lower, upper], 'start_center': [start_x, start_y]}
+
+    # A fresh processor per case so caches from earlier (other-sized) frames do not flatter the timings.
+    processor = ImageProcessor()
+    processor.image = synthetic.image
+    runs = {stage: [] for stage in STAGES}
+    outcomes = {}
+    for _ in range(max(2, settings.repeats)):
+        processor.enhancement_cache.clear()
+        elapsed, enhanced = _timed(processor.enhance_image)
+        runs['enhance'].append(elapsed)
+        for method in ('sampled', 'integrated'):
+            elapsed, outcomes[method] = _timed(lambda: processor.analyze_ring_boundaries(
+                enhanced, true_x, true_y, order['middle'], profile_method=method))
+            runs[f'analyze_{method}'].append(elapsed)
+        elapsed, outcomes['auto_detect'] = _timed(lambda: processor.auto_detect_radius_refined(
+            enhanced, start_x, start_y, lower, upper,
+            center_search_window_half_size=settings.center_search_window_half_size,
+            center_search=settings.center_search))
+        runs['auto_detect'].append(elapsed)
+    result.timings.update({stage: _summarize_runs(stage_runs) for stage, stage_runs in runs.items()})
+
+    for method in ('sampled', 'integrated'):
+        bounds = outcomes[method]
+        result.accuracy[f'{method}_midpoint_error_px'] = (bounds[0] + bounds[1]) / 2 - order['middle'] if bounds else None
+        result.accuracy[f'{method}_width_px'] = bounds[1] - bounds[0] if bounds else None
+    detected = outcomes['auto_detect']
+    if detected:
+        result.accuracy['auto_radius_error_px'] = detected['radius_centerline'] - order['middle']
+        result.accuracy['auto_center_error_px'] = float(np.hypot(detected['center_x'] - true_x,
+                                                                 detected['center_y'] - true_y))
+        result.evaluations = detected['evaluations']
+    else:
+        result.accuracy['auto_radius_error_px'] = None
+        result.accuracy['auto_center_error_px'] = None
+        result.evaluations = processor.last_search_evaluations
+
+def run_benchmark(cases: Sequence[BenchmarkCase], settings: BenchmarkSettings,
+                  progress: Optional[Callable[[int, int, CaseResult], None]] = None) -> List[CaseResult]:
+    results = []
+    for i, case in enumerate(cases, start=1):
+        results.append(run_case(case, settings))
+        if progress is not None:
+            progress(i, len(cases), results[-1])
+    return results
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'opencv_threads': cv2.getNumThreads(),
+    }
+
+def results_to_dict(results: Sequence[CaseResult], settings: BenchmarkSettings) -> Dict[str, Any]:
+    cases = []
+    for result in results:
+        cases.append({
+            'name': result.case.name,
+            'condition': result.case.condition,
+            'megapixels': result.case.spec.megapixels,
+            'width': result.width,
+            'height': result.height,
+            'spec': asdict(result.case.spec),
+            'truth': result.truth,
+            'timings': result.timings,
+            'accuracy': result.accuracy,
+            'evaluations': result.evaluations,
+            'error': result.error,
+        })
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'settings': asdict(settings),
+        'cases': cases,
+    }
+
+def write_results(report: Dict[str, Any], path: Path):
+    path = Path(path)
+    if path.parent:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], time_tolerance: float = 0.25,
+                        accuracy_tolerance_px: float = 0.5, min_time_delta_s: float = 0.005) -> List[str]:
+    regressions = []
+    baseline_cases = {case['name']: case for case in baseline.get('cases', [])}
+    for case in report['cases']:
+        previous = baseline_cases.get(case['name'])
+        if previous is None:
+            continue
+        if case['error'] and not previous['error']:
+            regressions.append(f"{case['name']}: failed ({case['error']})")
+            continue
+        for stage in STAGES:
+            now, before = case['timings'].get(stage), previous['timings'].get(stage)
+            if (now and before and now['min_s'] > before['min_s'] * (1 + time_tolerance)
+                    and now['min_s'] - before['min_s'] > min_time_delta_s):
+                regressions.append(f"{case['name']}: {stage} slowed from {before['min_s'] * 1e3:.1f} ms "
+                                   f"to {now['min_s'] * 1e3:.1f} ms")
+        for metric, before in previous['accuracy'].items():
+            if metric.endswith('_width_px') or before is None:
+                continue
+            now = case['accuracy'].get(metric)
+            if now is None:
+                regressions.append(f"{case['name']}: {metric} no longer produced")
+            elif abs(now) > abs(before) + accuracy_tolerance_px:
+                regressions.append(f"{case['name']}: {metric} grew from {abs(before):.2f} px to {abs(now):.2f} px")
+    return regressions
@@ -0,0 +1,112 @@
+"""
+Synthetic Fabry-Perot ring images with known center and radii.
+"""
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+@dataclass
+class SyntheticRingSpec:
+    megapixels: float = 2.0
+    aspect: float = 4 / 3
+    first_ring_fraction: float = 0.3        # Middle radius of the first order, as a fraction of half the short side
+    order_spacing_fraction: float = 0.25    # Spacing of successive orders in r^2, same units squared
+    zeeman_splitting: float = 0.12          # Sigma component shift as a fraction of the free spectral range
+    sigma_weight: float = 0.5               # Sigma component intensity relative to the pi component
+    finesse: float = 20.0
+    center_offset: Tuple[float, float] = (0.0, 0.0)   # Pixels from the frame center
+    blur_sigma: float = 1.0                 # Pixels; 0 disables the optical blur
+    vignetting: float = 0.3                 # Relative intensity loss at the frame corners
+    peak_photons: float = 400.0             # Shot noise at the brightest pixel; 0 disables it
+    read_noise: float = 2.0                 # Gaussian noise in 8-bit counts
+    background: float = 8.0                 # Offset in 8-bit counts
+    seed: int = 0
+
+@dataclass
+class SyntheticRingImage:
+    image: np.ndarray
+    center: Tuple[float, float]
+    rings: List[Dict[str, float]] = field(default_factory=list)
+    spec: SyntheticRingSpec = field(default_factory=SyntheticRingSpec)
+
+    def first_order(self) -> Dict[str, float]:
+        return self.rings[0]
+
+def frame_size(megapixels: float, aspect: float) -> Tuple[int, int]:
+    height = int(round(np.sqrt(megapixels * 1e6 / aspect)))
+    width = int(round(height * aspect))
+    return width, height
+
+def ring_geometry(spec: SyntheticRingSpec, width: int, height: int) -> Tuple[float, float]:
+    half_short_side = min(width, height) / 2.0
+    r0 = spec.first_ring_fraction * half_short_side
+    spacing = spec.order_spacing_fraction * half_short_side ** 2
+    return r0, spacing
+
+def true_rings(spec: SyntheticRingSpec, width: int, height: int, center: Tuple[float, float]) -> List[Dict[str, float]]:
+    r0, spacing = ring_geometry(spec, width, height)
+    cx, cy = center
+    # Only report orders whose outer component lies entirely inside the frame.
+    max_radius = min(cx, cy, width - 1 - cx, height - 1 - cy)
+    rings = []
+    order = 0
+    while True:
+        middle_sq = r0 ** 2 + order * spacing
+        inner_sq = middle_sq - spec.zeeman_splitting * spacing
+        outer_sq = middle_sq + spec.zeeman_splitting * spacing
+        if np.sqrt(outer_sq) > max_radius:
+            return rings
+        if inner_sq > 0:
+            rings.append({'order': order, 'inner': float(np.sqrt(inner_sq)), 'middle': float(np.sqrt(middle_sq)),
+                          'outer': float(np.sqrt(outer_sq))})
+        order += 1
+
+def _airy(phase: np.ndarray, coefficient: float) -> np.ndarray:
+    return 1.0 / (1.0 + coefficient * np.sin(phase) ** 2)
+
+def generate_rings(spec: SyntheticRingSpec, rows_per_chunk: int = 512) -> SyntheticRingImage:
+    if spec.megapixels <= 0 or spec.aspect <= 0:
+        raise ValueError("Frame size must be positive.")
+    if not 0 <= spec.zeeman_splitting < 0.5:
+        raise ValueError("Zeeman splitting must be in [0, 0.5) of the free spectral range.")
+    if spec.finesse <= 0:
+        raise ValueError("Finesse must be positive.")
+
+    width, height = frame_size(spec.megapixels, spec.aspect)
+    cx = (width - 1) / 2.0 + spec.center_offset[0]
+    cy = (height - 1) / 2.0 + spec.center_offset[1]
+    r0, spacing = ring_geometry(spec, width, height)
+    coefficient = (2 * spec.finesse / np.pi) ** 2
+    components = [(0.0, 1.0), (-spec.zeeman_splitting, spec.sigma_weight), (spec.zeeman_splitting, spec.sigma_weight)]
+    corner_sq = max(cx, width - 1 - cx) ** 2 + max(cy, height - 1 - cy) ** 2
+
+    # Work in row chunks so 50 MP frames do not need several full-size float64 temporaries.
+    intensity = np.empty((height, width), dtype=np.float32)
+    x_sq = ((np.arange(width, dtype=np.float64) - cx) ** 2)[np.newaxis, :]
+    for y0 in range(0, height, rows_per_chunk):
+        y = np.arange(y0, min(height, y0 + rows_per_chunk), dtype=np.float64)[:, np.newaxis]
+        r_sq = x_sq + (y - cy) ** 2
+        # Order phase of an etalon is linear in r^2 for small angles; peaks sit at r0^2 + (m + shift) * spacing.
+        phase = np.pi * (r_sq - r0 ** 2) / spacing
+        chunk = sum(weight * _airy(phase - np.pi * shift, coefficient) for shift, weight in components)
+        chunk /= 1.0 + 2 * spec.sigma_weight
+        chunk *= 1.0 - spec.vignetting * r_sq / corner_sq
+        intensity[y0:y0 + len(y)] = chunk
+
+    if spec.blur_sigma > 0:
+        cv2.GaussianBlur(intensity, (0, 0), spec.blur_sigma, dst=intensity)
+
+    rng = np.random.default_rng(spec.seed)
+    frame = np.empty((height, width), dtype=np.uint8)
+    for y0 in range(0, height, rows_per_chunk):
+        chunk = intensity[y0:y0 + rows_per_chunk].astype(np.float64)
+        if spec.peak_photons > 0:
+            chunk = rng.poisson(np.maximum(chunk, 0) * spec.peak_photons) / spec.peak_photons
+        counts = spec.background + chunk * (255.0 - spec.background)
+        if spec.read_noise > 0:
+            counts += rng.normal(0.0, spec.read_noise, size=counts.shape)
+        frame[y0:y0 + len(chunk)] = np.clip(np.rint(counts), 0, 255)
+
+    image = cv2.cvtColor(frame, cv2.COLOR_GRAY2RGB)
+    return SyntheticRingImage(image=image, center=(cx, cy), rings=true_rings(spec, width, height, (cx, cy)), spec=spec)
@@ -14,6 +14,7 @@ class CalibrationWindow(QMainWindow):
         
         self.calibration_points = []  
         self.calibration_params = None
+        self.calibration_covariance = None
         
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -80,6 +81,22 @@ class CalibrationWindow(QMainWindow):
         
         self.update_plot()
     
+    def set_points(self, points, calibration_params=None):
+        self.calibration_points = [tuple(point) for point in points]
+        self.calibration_params = None
+        self.calibration_covariance = None
+        
+        self.table.setRowCount(len(self.calibration_points))
+        for row, (current, field) in enumerate(self.calibration_points):
+            self.table.setItem(row, 0, QTableWidgetItem(f"{current:.3f}"))
+            self.table.setItem(row, 1, QTableWidgetItem(f"{field:.1f}"))
+        if not self.calibration_points:
+            self.status_label.setText('No calibration data')
+        
+        self.update_plot()
+        if calibration_params is not None:
+            self.calibration_params = calibration_params
+    
     def update_plot(self):
         self.ax.clear()
         
@@ -92,7 +109,11 @@ class CalibrationWindow(QMainWindow):
                 currents = np.array(currents)
                 fields = np.array(fields)
                 
-                slope, intercept = np.polyfit(currents, fields, 1)
+                if len(self.calibration_points) > 2:
+                    (slope, intercept), self.calibration_covariance = np.polyfit(currents, fields, 1, cov=True)
+                else:
+                    slope, intercept = np.polyfit(currents, fields, 1)
+                    self.calibration_covariance = None
                 self.calibration_params = (slope, intercept)
                 
                 x_line = np.linspace(min(currents), max(currents), 100)
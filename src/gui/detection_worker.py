@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+import numpy as np
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from typing import Dict, Optional
+from src.processing.image_processor import DetectionCancelled, ImageProcessor
+from src.util.session import load_enhanced
+
+logger = logging.getLogger(__name__)
+
+class DetectionJob:
+    def __init__(self, record, image: np.ndarray, ring_type: str, center_x: int, center_y: int, lower: int, upper: int,
+                 center_search: str = 'grid', center_search_window_half_size: int = 10):
+        # The pixels are fetched on the GUI thread; the image store is not thread-safe.
+        self.record = record
+        self.image = image
+        self.ring_type = ring_type
+        self.center_x = center_x
+        self.center_y = center_y
+        self.lower = lower
+        self.upper = upper
+        self.center_search = center_search
+        self.center_search_window_half_size = center_search_window_half_size
+
+class _DetectionSignals(QObject):
+    progress = pyqtSignal(int, int, int)       # job id, evaluated, total
+    succeeded = pyqtSignal(int, object)        # job id, result dict or None
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+class _DetectionTask(QRunnable):
+    def __init__(self, job_id: int, job: DetectionJob, processor: ImageProcessor,
+                 signals: _DetectionSignals, cancelled: threading.Event):
+        super().__init__()
+        self.job_id = job_id
+        self.job = job
+        self.processor = processor
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def _progress(self, evaluated: int, total: int) -> bool:
+        self.signals.progress.emit(self.job_id, evaluated, total)
+        return not self.cancelled.is_set()
+
+    def run(self):
+        if self.cancelled.is_set():
+            self.signals.cancelled.emit(self.job_id)
+            return
+        job = self.job
+        started = time.perf_counter()
+        try:
+            self.processor.image = job.image
+            params = self.processor.enhancement_params()
+            if job.record is not None and self.processor.enhancement_cache.peek(job.image, params) is None:
+                # An enhanced image saved with the project saves recomputing it.
+                embedded = load_enhanced(job.record, params)
+                if embedded is not None:
+                    self.processor.enhancement_cache.put(job.image, params, embedded)
+            enhanced_image = self.processor.enhance_image()
+            if job.ring_type == 'all':
+                self.signals.progress.emit(self.job_id, 0, 1)
+                result = self.processor.detect_rings_polar(enhanced_image, job.center_x, job.center_y,
+                                                           job.lower, job.upper)
+                self.signals.progress.emit(self.job_id, 1, 1)
+            else:
+                result = self.processor.auto_detect_radius_refined(
+                    enhanced_image, job.center_x, job.center_y, job.lower, job.upper,
+                    center_search_window_half_size=job.center_search_window_half_size,
+                    center_search=job.center_search, progress=self._progress)
+        except DetectionCancelled:
+            self.signals.cancelled.emit(self.job_id)
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, str(e))
+            return
+        finally:
+            self.processor.image = None
+        logger.info("Auto-detection (%s) finished in %.2f s", job.ring_type, time.perf_counter() - started)
+        if self.cancelled.is_set():
+            self.signals.cancelled.emit(self.job_id)
+        else:
+            self.signals.succeeded.emit(self.job_id, result)
+
+class DetectionRunner(QObject):
+    progress = pyqtSignal(int, int)                 # evaluated, total
+    succeeded = pyqtSignal(object, object)          # job, result dict or None
+    failed = pyqtSignal(object, str)                # job, message
+    cancelled = pyqtSignal(object)                  # job
+
+    def __init__(self, processor: ImageProcessor, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.processor = processor
+        self.pool = QThreadPool()
+        # Jobs share the processor and its caches, so they run one at a time; a cancelled job
+        # stops at its next candidate center and the following job starts behind it.
+        self.pool.setMaxThreadCount(1)
+        self._signals = _DetectionSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.succeeded.connect(self._on_succeeded)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.cancelled.connect(self._on_cancelled)
+        self._job_id = 0
+        self._jobs: Dict[int, DetectionJob] = {}
+        self._cancelled = threading.Event()
+
+    def is_running(self) -> bool:
+        return self._job_id in self._jobs
+
+    def current_job(self) -> Optional[DetectionJob]:
+        return self._jobs.get(self._job_id)
+
+    def start(self, job: DetectionJob):
+        self.cancel()
+        self._job_id += 1
+        self._cancelled = threading.Event()
+        self._jobs[self._job_id] = job
+        self.pool.start(_DetectionTask(self._job_id, job, self.processor, self._signals, self._cancelled))
+
+    def cancel(self):
+        if self.is_running():
+            self._cancelled.set()
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
+
+    def _on_progress(self, job_id: int, evaluated: int, total: int):
+        if job_id == self._job_id and not self._cancelled.is_set():
+            self.progress.emit(evaluated, total)
+
+    def _take(self, job_id: int) -> Optional[DetectionJob]:
+        return self._jobs.pop(job_id, None)
+
+    def _on_succeeded(self, job_id: int, result):
+        job = self._take(job_id)
+        if job is not None:
+            self.succeeded.emit(job, result)
+
+    def _on_failed(self, job_id: int, message: str):
+        job = self._take(job_id)
+        if job is not None:
+            self.failed.emit(job, message)
+
+    def _on_cancelled(self, job_id: int):
+        job = self._take(job_id)
+        if job is not None:
+            self.cancelled.emit(job)
@@ -0,0 +1,256 @@
+import logging
+import weakref
+import cv2
+import numpy as np
+from collections import OrderedDict
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QPointF, QRect, QRectF
+from PyQt6.QtGui import QColor, QImage, QPainter, QPen
+from PyQt6.QtWidgets import QSizePolicy, QWidget
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+def build_pyramid(frame: np.ndarray, min_size: int = 256,
+                  allocate: Optional[Callable[[tuple, np.dtype], Optional[np.ndarray]]] = None) -> List[np.ndarray]:
+    levels = [frame]
+    while min(levels[-1].shape[:2]) >= 2 * min_size:
+        height, width = levels[-1].shape[:2]
+        shape = (height // 2, width // 2) + levels[-1].shape[2:]
+        dst = allocate(shape, levels[-1].dtype) if allocate is not None else None
+        levels.append(cv2.resize(levels[-1], (width // 2, height // 2), dst=dst, interpolation=cv2.INTER_AREA))
+    return levels
+
+def is_row_contiguous(array: np.ndarray) -> bool:
+    # QImage accepts any bytesPerLine, but pixels within a row must be packed.
+    if array.dtype != np.uint8 or array.strides[0] < 0:
+        return False
+    pixel_bytes = array.shape[2] if array.ndim == 3 else 1
+    return array.strides[-1] == 1 and (array.ndim == 2 or array.strides[1] == pixel_bytes)
+
+def qimage_format(array: np.ndarray) -> Optional[QImage.Format]:
+    if array.ndim == 2:
+        return QImage.Format.Format_Grayscale8
+    if array.ndim == 3 and array.shape[2] == 3:
+        return QImage.Format.Format_RGB888
+    if array.ndim == 3 and array.shape[2] == 4:
+        return QImage.Format.Format_RGBA8888
+    return None
+
+def qimage_view(array: np.ndarray) -> QImage:
+    # Zero-copy: the QImage points straight at the array's memory, so the caller has to keep
+    # the array alive for as long as the QImage is in use.
+    height, width = array.shape[:2]
+    return QImage(sip.voidptr(array.ctypes.data), width, height, array.strides[0], qimage_format(array))
+
+class DisplayBufferPool:
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.bytes_copied = 0
+        self.hits = 0
+        self.misses = 0
+        # Entries hold only the levels the pool owns; a frame used as its own base level is
+        # referenced weakly, so evicting it from the image store frees it here too.
+        self._pyramids: 'OrderedDict[int, Tuple[weakref.ref, List[np.ndarray]]]' = OrderedDict()
+        self._spare: Dict[Tuple[tuple, str], List[np.ndarray]] = {}
+
+    def pyramid(self, frame: np.ndarray) -> List[np.ndarray]:
+        key = id(frame)
+        entry = self._pyramids.get(key)
+        if entry is not None and entry[0]() is frame:
+            self._pyramids.move_to_end(key)
+            self.hits += 1
+            # A copied base level is the first owned level; otherwise the frame is the base.
+            return [frame] + entry[1] if is_row_contiguous(frame) else entry[1]
+        self.misses += 1
+
+        # Rows must be packed for a zero-copy QImage; anything else is copied once per frame.
+        owned = []
+        base = frame
+        if not is_row_contiguous(frame):
+            base = self._allocate(frame.shape, np.uint8)
+            if base is None:
+                base = np.empty(frame.shape, dtype=np.uint8)
+            np.copyto(base, frame, casting='unsafe')
+            owned.append(base)
+        levels = build_pyramid(base, allocate=self._allocate)
+        owned.extend(levels[1:])
+        size = sum(level.nbytes for level in owned)
+        self.bytes_copied += size
+
+        self._pyramids[key] = (weakref.ref(frame, lambda _, key=key: self._release(key)), owned)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes and len(self._pyramids) > 1:
+            self._release(next(iter(self._pyramids)))
+        return levels
+
+    def _allocate(self, shape: tuple, dtype: np.dtype) -> Optional[np.ndarray]:
+        # Frames of the same size take over the buffers of pyramids that have been released.
+        spare = self._spare.get((tuple(shape), np.dtype(dtype).str))
+        return spare.pop() if spare else None
+
+    def _release(self, key: int):
+        entry = self._pyramids.pop(key, None)
+        if entry is None:
+            return
+        for level in entry[1]:
+            self.current_bytes -= level.nbytes
+            spare = self._spare.setdefault((level.shape, level.dtype.str), [])
+            if len(spare) < 2:
+                spare.append(level)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pyramids': len(self._pyramids),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'bytes_copied': self.bytes_copied,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+class ImageCanvas(QWidget):
+    TILE_SIZE = 256
+
+    def __init__(self, parent: Optional[QWidget] = None, max_cached_tiles: int = 512):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.frame: Optional[np.ndarray] = None
+        self.pyramid: List[np.ndarray] = []
+        self.scale = 1.0
+        self.overlays: List[tuple] = []
+        self.max_cached_tiles = max_cached_tiles
+        self._tiles: 'OrderedDict[Tuple[int, int, int], Tuple[np.ndarray, QImage]]' = OrderedDict()
+        self.buffers = DisplayBufferPool()
+        self.redraws = 0
+        self.last_redraw_bytes_copied = 0
+        self._copied_at_last_redraw = 0
+
+    def set_frame(self, frame: Optional[np.ndarray]):
+        if frame is self.frame:
+            return
+        # Drop the tile views before the buffers they point into can be recycled.
+        self._tiles.clear()
+        self.frame = frame
+        self.pyramid = self.buffers.pyramid(frame) if frame is not None else []
+        self._update_size()
+        self.update()
+
+    def set_scale(self, scale: float):
+        self.scale = scale
+        self._update_size()
+        self.update()
+
+    def set_overlays(self, overlays: List[tuple]):
+        self.overlays = overlays
+        self.update()
+
+    def clear(self):
+        self.set_frame(None)
+        self.set_overlays([])
+
+    def _update_size(self):
+        if self.frame is None:
+            self.setMinimumSize(0, 0)
+        else:
+            height, width = self.frame.shape[:2]
+            self.setMinimumSize(int(np.ceil(width * self.scale)), int(np.ceil(height * self.scale)))
+        self.updateGeometry()
+
+    def image_origin(self) -> Tuple[float, float]:
+        if self.frame is None:
+            return 0.0, 0.0
+        height, width = self.frame.shape[:2]
+        return max(0.0, (self.width() - width * self.scale) / 2), max(0.0, (self.height() - height * self.scale) / 2)
+
+    def widget_to_image(self, x: float, y: float) -> Optional[Tuple[float, float]]:
+        if self.frame is None or self.scale <= 0:
+            return None
+        ox, oy = self.image_origin()
+        return (x - ox) / self.scale, (y - oy) / self.scale
+
+    def _choose_level(self) -> int:
+        # Use the smallest pyramid level that still has at least one source pixel per screen pixel.
+        level = 0
+        while level + 1 < len(self.pyramid) and self.scale * 2 ** (level + 1) <= 1.0:
+            level += 1
+        return level
+
+    def _tile(self, level: int, tx: int, ty: int) -> QImage:
+        key = (level, tx, ty)
+        cached = self._tiles.get(key)
+        if cached is not None:
+            self._tiles.move_to_end(key)
+            return cached[1]
+        source = self.pyramid[level]
+        y0, x0 = ty * self.TILE_SIZE, tx * self.TILE_SIZE
+        tile = source[y0:y0 + self.TILE_SIZE, x0:x0 + self.TILE_SIZE]
+        # The tile is a strided view into the level buffer and the QImage borrows that memory,
+        # so the view is cached alongside the QImage to keep the buffer alive.
+        q_img = qimage_view(tile)
+        self._tiles[key] = (tile, q_img)
+        while len(self._tiles) > self.max_cached_tiles:
+            self._tiles.popitem(last=False)
+        return q_img
+
+    def paintEvent(self, event):
+        if self.frame is None or qimage_format(self.frame) is None:
+            return
+        painter = QPainter(self)
+        height, width = self.frame.shape[:2]
+        ox, oy = self.image_origin()
+        image_rect = QRect(int(ox), int(oy), int(np.ceil(width * self.scale)), int(np.ceil(height * self.scale)))
+        exposed = event.rect().intersected(image_rect)
+
+        if not exposed.isEmpty():
+            level = self._choose_level()
+            source = self.pyramid[level]
+            level_height, level_width = source.shape[:2]
+            # Screen pixels per level pixel along each axis.
+            sx = self.scale * width / level_width
+            sy = self.scale * height / level_height
+
+            tx0 = max(0, int((exposed.left() - ox) / sx) // self.TILE_SIZE)
+            tx1 = min((level_width - 1) // self.TILE_SIZE, int((exposed.right() + 1 - ox) / sx) // self.TILE_SIZE)
+            ty0 = max(0, int((exposed.top() - oy) / sy) // self.TILE_SIZE)
+            ty1 = min((level_height - 1) // self.TILE_SIZE, int((exposed.bottom() + 1 - oy) / sy) // self.TILE_SIZE)
+
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, abs(sx - 1.0) > 1e-6)
+            for ty in range(ty0, ty1 + 1):
+                for tx in range(tx0, tx1 + 1):
+                    q_img = self._tile(level, tx, ty)
+                    target = QRectF(ox + tx * self.TILE_SIZE * sx, oy + ty * self.TILE_SIZE * sy,
+                                    q_img.width() * sx, q_img.height() * sy)
+                    painter.drawImage(target, q_img)
+
+        self._draw_overlays(painter, ox, oy)
+        painter.end()
+
+        self.redraws += 1
+        self.last_redraw_bytes_copied = self.buffers.bytes_copied - self._copied_at_last_redraw
+        self._copied_at_last_redraw = self.buffers.bytes_copied
+        logger.debug("Redraw %d copied %d bytes", self.redraws, self.last_redraw_bytes_copied)
+
+    def display_stats(self) -> Dict[str, Any]:
+        stats = self.buffers.stats()
+        stats.update({
+            'redraws': self.redraws,
+            'last_redraw_bytes_copied': self.last_redraw_bytes_copied,
+            'cached_tiles': len(self._tiles),
+        })
+        return stats
+
+    def _draw_overlays(self, painter: QPainter, ox: float, oy: float):
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for kind, x, y, radius, color in self.overlays:
+            center = QPointF(ox + (x + 0.5) * self.scale, oy + (y + 0.5) * self.scale)
+            if kind == 'point':
+                # Markers keep a constant on-screen size regardless of zoom.
+                painter.setPen(Qt.PenStyle.NoPen)
+                painter.setBrush(QColor(*color))
+                painter.drawEllipse(center, radius, radius)
+            else:
+                painter.setPen(QPen(QColor(*color), 1))
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawEllipse(center, radius * self.scale, radius * self.scale)
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+import time
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from typing import Dict, List, Optional
+from src.util.image_store import ImageStore
+
+logger = logging.getLogger(__name__)
+
+IMAGE_SUFFIXES = ('.png', '.jpg', '.jpeg', '.bmp')
+
+def list_image_files(folder: str) -> List[str]:
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_SUFFIXES))
+    return [os.path.join(folder, name) for name in names]
+
+class _DecodeSignals(QObject):
+    decoded = pyqtSignal(int, int, object, object)  # batch id, position, image, thumbnail
+    failed = pyqtSignal(int, int, str)
+
+class _DecodeTask(QRunnable):
+    def __init__(self, batch_id: int, position: int, path: str, thumbnail_size: int,
+                 signals: _DecodeSignals, cancelled: threading.Event):
+        super().__init__()
+        self.batch_id = batch_id
+        self.position = position
+        self.path = path
+        self.thumbnail_size = thumbnail_size
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        try:
+            # cv2 releases the GIL while decoding, so several of these run truly in parallel.
+            image = ImageStore.decode_file(self.path)
+            thumbnail = ImageStore.make_thumbnail(image, self.thumbnail_size)
+        except Exception as e:
+            self.signals.failed.emit(self.batch_id, self.position, str(e))
+            return
+        if not self.cancelled.is_set():
+            self.signals.decoded.emit(self.batch_id, self.position, image, thumbnail)
+
+class ImageLoader(QObject):
+    image_added = pyqtSignal(int)            # index in the image store
+    progress = pyqtSignal(int, int)          # completed, total
+    finished = pyqtSignal(int, int, bool)    # loaded, failed, cancelled
+
+    def __init__(self, store: ImageStore, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.store = store
+        self.pool = QThreadPool()
+        self._signals = _DecodeSignals()
+        self._signals.decoded.connect(self._on_decoded)
+        self._signals.failed.connect(self._on_failed)
+        self._batch_id = 0
+        self._cancelled = threading.Event()
+        self._reset_batch([])
+
+    def _reset_batch(self, paths: List[str]):
+        self._paths = paths
+        self._ready: Dict[int, Optional[tuple]] = {}
+        self._next_position = 0
+        self._completed = 0
+        self._loaded = 0
+        self._failed = 0
+        self._bytes = 0
+        self._started = time.perf_counter()
+
+    def is_loading(self) -> bool:
+        return self._completed < len(self._paths)
+
+    def load_files(self, paths: List[str]):
+        if self.is_loading():
+            self.cancel()
+        self._batch_id += 1
+        self._cancelled = threading.Event()
+        self._reset_batch(list(paths))
+        for position, path in enumerate(self._paths):
+            self.pool.start(_DecodeTask(self._batch_id, position, path, self.store.thumbnail_size,
+                                        self._signals, self._cancelled))
+
+    def cancel(self):
+        if not self.is_loading():
+            return
+        self._cancelled.set()
+        self.pool.clear()
+        self._finish(cancelled=True)
+
+    def _on_decoded(self, batch_id: int, position: int, image, thumbnail):
+        if batch_id != self._batch_id or self._cancelled.is_set():
+            return
+        self._ready[position] = (image, thumbnail)
+        self._bytes += image.nbytes
+        self._advance()
+
+    def _on_failed(self, batch_id: int, position: int, message: str):
+        if batch_id != self._batch_id or self._cancelled.is_set():
+            return
+        logger.warning("Failed to load %s: %s", self._paths[position], message)
+        self._ready[position] = None
+        self._advance()
+
+    def _advance(self):
+        # Frames finish in any order but are appended in selection order so a sweep stays sorted.
+        while self._next_position in self._ready:
+            decoded = self._ready.pop(self._next_position)
+            if decoded is None:
+                self._failed += 1
+            else:
+                image, thumbnail = decoded
+                self.store.add_decoded(self._paths[self._next_position], image, thumbnail)
+                self._loaded += 1
+                self.image_added.emit(len(self.store) - 1)
+            self._next_position += 1
+            self._completed += 1
+            self.progress.emit(self._completed, len(self._paths))
+
+        if self._completed == len(self._paths):
+            self._finish(cancelled=False)
+
+    def _finish(self, cancelled: bool):
+        elapsed = time.perf_counter() - self._started
+        rate = self._loaded / elapsed if elapsed > 0 else 0.0
+        logger.info("Loaded %d image(s) (%d failed%s) in %.2f s: %.1f images/s, %.1f MB/s decoded",
+                    self._loaded, self._failed, ", cancelled" if cancelled else "", elapsed, rate,
+                    self._bytes / 1e6 / elapsed if elapsed > 0 else 0.0)
+        loaded, failed = self._loaded, self._failed
+        self._reset_batch([])
+        self.finished.emit(loaded, failed, cancelled)
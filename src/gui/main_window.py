@@ -1,24 +1,42 @@
-import csv
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QFileDialog, QMessageBox, QInputDialog, QDoubleSpinBox, QApplication, QTableWidgetItem
+    QLabel, QFileDialog, QMessageBox, QInputDialog, QDoubleSpinBox, QApplication,
+    QProgressDialog
 )
-from PyQt6.QtCore import Qt, QPoint, QSize
-from PyQt6.QtGui import QImage, QPixmap, QShortcut, QKeySequence, QScreen
+from PyQt6.QtCore import QPoint, QSize, QStandardPaths, QTimer
+from PyQt6.QtGui import QImage, QPixmap, QShortcut, QKeySequence, QScreen, QIcon
 from typing import Optional, Dict
+import logging
+import sqlite3
 import cv2
 import numpy as np
 from pathlib import Path
-from src.physics.zeeman import ZeemanMeasurement, process_measurement, calculate_bohr_magneton
+from src.physics.zeeman import ZeemanMeasurement, MeasurementSet, process_measurement
+from src.physics.regression import ZeemanRegression, bohr_magneton_from_fits, fit_zeeman
+from src.physics.zeeman_calculator import ZeemanCalculator, UncertaintyModel
 import matplotlib.pyplot as plt
 from src.gui.plot_window import PlotWindow
 from src.gui.table_window import TableWindow
 from src.gui.results_window import ResultsWindow
 from src.gui.calibration_window import CalibrationWindow
 from src.processing.image_processor import ImageProcessor
+from src.processing.result_cache import DetectionResultCache
+from src.processing.profiling import profiler
 from src.gui.image_display_manager import ImageDisplayManager
 from src.gui.measurement_controller import MeasurementController
+from src.gui.measurement_model import MeasurementTableModel
 from src.gui.ui_manager import UIManager
+from src.util.image_store import ImageStore
+from src.util.export import export_measurements
+from src.util.session import PROJECT_SUFFIX, load_project, save_project
+from src.gui.image_loader import ImageLoader, list_image_files
+from src.gui.video_worker import VideoRunner
+from src.batch.analysis import BatchSettings
+from src.batch.video import CurrentLog, VideoAnalysis, VideoSettings
+
+logger = logging.getLogger(__name__)
+
+VIDEO_REFIT_INTERVAL_MS = 500
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -41,15 +59,21 @@ class MainWindow(QMainWindow):
         self.shortcut_test = QShortcut(QKeySequence('Ctrl+T'), self)
         self.shortcut_test.activated.connect(self.fill_test_data)
         
-        self.images = []  # List of loaded images with their measurements
+        self.images = ImageStore()  # Loaded images with their measurements; pixels are decoded on demand
         self.current_image_index = -1
+        self.project_path = None
         
-        self.image_processor = ImageProcessor()
+        self.image_processor = ImageProcessor(result_cache=self._open_result_cache())
 
         self.mm_per_pixel = None
         self.calibration_distance_mm = 2.0  
 
-        self.measurements = []  
+        self.measurements = MeasurementSet()  
+        self.measurement_model = MeasurementTableModel(self.measurements, self)
+        self.regression = ZeemanRegression()
+        self.zeeman_calculator = ZeemanCalculator()
+        self.uncertainty_draws = 10000
+        self.uncertainty_seed = 0
         
         self.ui_manager = UIManager(self)
         self.ui_manager.setup_layout() 
@@ -59,41 +83,174 @@ class MainWindow(QMainWindow):
         
         self.measurement_controller = MeasurementController(self, self.ui_manager)
 
+        self.image_loader = ImageLoader(self.images, self)
+        self.image_loader.image_added.connect(self._on_image_loaded)
+        self.image_loader.finished.connect(self._on_loading_finished)
+        self.load_progress_dialog = None
+        self._show_next_loaded_image = False
+
+        self.video_runner = VideoRunner(self)
+        self.video_runner.result.connect(self._on_video_frame_analyzed)
+        self.video_runner.failed.connect(self._on_video_failed)
+        self.video_runner.finished.connect(self._on_video_finished)
+        self.video_progress_dialog = None
+        self._video_frames = 0
+        self._video_failures = 0
+        # Refitting after every frame is quadratic over a long video; frames arriving within
+        # the interval share one refit, and the run ends with a full one.
+        self._video_refit_timer = QTimer(self)
+        self._video_refit_timer.setSingleShot(True)
+        self._video_refit_timer.setInterval(VIDEO_REFIT_INTERVAL_MS)
+        self._video_refit_timer.timeout.connect(self.update_live_results)
+
         self.update_navigation()
+        self.update_detection_cache_display()
+    
+    def _open_result_cache(self) -> Optional[DetectionResultCache]:
+        cache_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+        try:
+            return DetectionResultCache(Path(cache_dir) / 'detection_results.sqlite')
+        except (sqlite3.Error, OSError) as e:
+            # Detection still works, it just is not remembered between sessions.
+            logger.warning("Detection result cache unavailable: %s", e)
+            return None
     
     def update_display(self):
         self.image_display_manager.redraw_image_with_overlays()
     
     def load_image(self):
-        file_path, _ = QFileDialog.getOpenFileName(
+        file_paths, _ = QFileDialog.getOpenFileNames(
             self,
-            'Open Image',
+            'Open Images',
             '',
             'Image Files (*.png *.jpg *.jpeg *.bmp)'
         )
         
-        if file_path:
-            image = cv2.imread(file_path)
-            if image is None:
-                QMessageBox.critical(self, 'Error', 'Failed to load image')
-                return
-            
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            self.images.append({
-                'image': image,
-                'calibration_points': [],
-                'mm_per_pixel': None,
-                'measurement': None
-            })
-            
-            self.current_image_index = len(self.images) - 1
+        if file_paths:
+            self.start_loading(file_paths)
+
+    def import_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, 'Import Image Folder')
+        if not folder:
+            return
+        file_paths = list_image_files(folder)
+        if not file_paths:
+            QMessageBox.warning(self, 'Warning', 'No images found in the selected folder')
+            return
+        self.start_loading(file_paths)
+
+    def analyze_video(self):
+        if self.video_runner.is_running():
+            return
+        if self.calibration_window.calibration_params is None:
+            QMessageBox.warning(self, 'Warning', 'Please calibrate the magnetic field first')
+            return
+        video_path, _ = QFileDialog.getOpenFileName(self, 'Open Video', '',
+                                                    'Video Files (*.avi *.mp4 *.mov *.mkv);;All Files (*)')
+        if not video_path:
+            return
+        log_path, _ = QFileDialog.getOpenFileName(self, 'Open Current Log (time,current)', '', 'CSV Files (*.csv)')
+        if not log_path:
+            return
+        try:
+            current_log = CurrentLog.load(Path(log_path))
+        except (ValueError, KeyError, OSError) as e:
+            QMessageBox.critical(self, 'Error', f'Could not read the current log: {str(e)}')
+            return
+        
+        # Frames are analyzed and dropped, so the scale cannot be calibrated on them one by one.
+        scale = None
+        if self.images and self.current_image_index >= 0:
+            scale = self.images[self.current_image_index].get('mm_per_pixel')
+        scale, ok = QInputDialog.getDouble(self, 'Video Scale', 'Scale (mm/pixel):', scale or 0.01, 1e-6, 100.0, 6)
+        if not ok:
+            return
+        step, ok = QInputDialog.getInt(self, 'Frame Step', 'Analyze every n-th frame:', 1, 1, 10000)
+        if not ok:
+            return
+        
+        settings = BatchSettings(calibration_params=tuple(self.calibration_window.calibration_params),
+                                 wavelength_nm=self.wavelength_input.value(), mm_per_pixel=scale,
+                                 center_search=self.center_search_combo.currentData())
+        # A processor of its own: manual detection can run while the video is analyzed.
+        processor = ImageProcessor(result_cache=self.image_processor.result_cache)
+        self.video_runner.start(VideoAnalysis(Path(video_path), current_log, settings,
+                                              VideoSettings(step=step), processor))
+        
+        self.video_progress_dialog = QProgressDialog(f'Analyzing {Path(video_path).name}...', 'Stop', 0, 0, self)
+        self.video_progress_dialog.setWindowTitle('Video Analysis')
+        self.video_progress_dialog.setMinimumDuration(0)
+        self.video_progress_dialog.canceled.connect(self.video_runner.cancel)
+        self._video_frames = 0
+        self._video_failures = 0
+
+    def _on_video_frame_analyzed(self, result):
+        self._video_frames += 1
+        if result.measurement is None:
+            self._video_failures += 1
+        else:
+            self.measurement_model.append(result.measurement)
+            self.regression.add(result.measurement)
+            if not self._video_refit_timer.isActive():
+                self._video_refit_timer.start()
+        if self.video_progress_dialog is not None:
+            self.video_progress_dialog.setLabelText(f'{self._video_frames} frame(s) analyzed, '
+                                                    f'{self._video_failures} without rings or current')
+
+    def _on_video_failed(self, message):
+        QMessageBox.critical(self, 'Error', f'Video analysis failed: {message}')
+
+    def _close_video_progress(self):
+        self._video_refit_timer.stop()
+        if self.video_progress_dialog is not None:
+            self.video_progress_dialog.canceled.disconnect(self.video_runner.cancel)
+            self.video_progress_dialog.close()
+            self.video_progress_dialog = None
+
+    def _on_video_finished(self, report, cancelled):
+        self._close_video_progress()
+        self.update_live_results(replot=True)
+        QMessageBox.information(self, 'Video Analysis',
+                                f"{'Stopped' if cancelled else 'Finished'}: {report['measurements']} measurement(s) "
+                                f"from {report['frames_analyzed']} frame(s), {report['failures']} failed\n"
+                                f"{report['frames_per_s']:.2f} frames/s analyzed, "
+                                f"{report['realtime_factor']:.2f}x real time")
+
+    def start_loading(self, file_paths):
+        # Finish the running load first; its finished signal tears down the old progress dialog.
+        self.image_loader.cancel()
+        self.image_loader.store = self.images
+        self._show_next_loaded_image = True
+        
+        self.load_progress_dialog = QProgressDialog(f'Loading {len(file_paths)} image(s)...', 'Cancel', 0, len(file_paths), self)
+        self.load_progress_dialog.setWindowTitle('Loading Images')
+        self.load_progress_dialog.setMinimumDuration(500)
+        self.load_progress_dialog.canceled.connect(self.image_loader.cancel)
+        self.image_loader.progress.connect(self.load_progress_dialog.setValue)
+        
+        self.image_loader.load_files(file_paths)
+
+    def _on_image_loaded(self, index):
+        if self._show_next_loaded_image:
+            # Show the first frame as soon as it arrives; the rest stream in behind it.
+            self._show_next_loaded_image = False
+            self.current_image_index = index
             self.initialize_measurement()
             if hasattr(self, 'image_display_manager'): 
                 self.image_display_manager.scale_factor = 1.0 
             self.update_display()
-            self.update_navigation()
             self.update_measurements_display()
+        self.update_navigation()
+
+    def _on_loading_finished(self, loaded, failed, cancelled):
+        if self.load_progress_dialog is not None:
+            self.image_loader.progress.disconnect(self.load_progress_dialog.setValue)
+            self.load_progress_dialog.canceled.disconnect(self.image_loader.cancel)
+            self.load_progress_dialog.close()
+            self.load_progress_dialog = None
+        self._show_next_loaded_image = False
+        if failed:
+            QMessageBox.warning(self, 'Warning', f'{failed} image(s) could not be loaded')
     
     def reset_measurements(self):
         if self.current_image_index >= 0:
@@ -102,6 +259,50 @@ class MainWindow(QMainWindow):
             self.update_display()
             self.update_measurements_display()
     
+    def set_profiling_enabled(self, enabled: bool):
+        if enabled:
+            profiler.reset()
+            profiler.enable()
+        else:
+            profiler.disable()
+        self.profile_summary_label.setVisible(enabled and bool(profiler.stats))
+
+    def show_profile_summary(self):
+        if not profiler.enabled:
+            return
+        self.profile_summary_label.setText(profiler.summary_text())
+        self.profile_summary_label.setVisible(True)
+        self.export_trace_btn.setEnabled(bool(profiler.events))
+
+    def update_detection_cache_display(self):
+        cache = self.image_processor.result_cache
+        if cache is None:
+            self.detection_cache_label.setText("Detection cache: unavailable")
+            self.clear_cache_btn.setEnabled(False)
+            return
+        stats = cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        self.detection_cache_label.setText(f"Detection cache: {stats['hits']}/{lookups} hits ({stats['hit_rate']:.0%}), "
+                                           f"{stats['entries']} stored")
+    
+    def clear_detection_cache(self):
+        if self.image_processor.result_cache is not None:
+            self.image_processor.result_cache.clear()
+        self.update_detection_cache_display()
+
+    def export_profile_trace(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Export Profile Trace', 'detection_trace.json',
+                                                   'Chrome Trace Files (*.json)')
+        if not file_path:
+            return
+        try:
+            profiler.export_chrome_trace(file_path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Warning', f'Could not write trace: {e}')
+            return
+        QMessageBox.information(self, 'Success', f'Profile trace exported to {file_path}\n'
+                                                 'Open it in chrome://tracing or https://ui.perfetto.dev')
+    
     def get_image_coordinates(self, event_pos: QPoint) -> Optional[QPoint]:
         return self.image_display_manager.get_image_coordinates(event_pos)
     
@@ -156,14 +357,17 @@ class MainWindow(QMainWindow):
             R_center=current_m['radii']['middle'] * current_data['mm_per_pixel'] if current_m['radii']['middle'] is not None else None,
             R_inner=current_m['radii']['inner'] * current_data['mm_per_pixel'] if current_m['radii']['inner'] is not None else None,
             R_outer=current_m['radii']['outer'] * current_data['mm_per_pixel'] if current_m['radii']['outer'] is not None else None,
-            wavelength=self.wavelength_input.value() * 1e-9  # Convert nm to m
+            wavelength=self.wavelength_input.value() * 1e-9,  # Convert nm to m
+            current=current,
+            mm_per_pixel=current_data['mm_per_pixel']
         )
         
         measurement = process_measurement(measurement)
         
-        self.measurements.append(measurement)
+        self.measurement_model.append(measurement)
+        self.regression.add(measurement)
         
-        self.table_window.update_table(self.measurements)
+        self.update_live_results()
         
         # Reset the measurement state in the controller
         self.measurement_controller.initialize_for_new_measurement() # Or a more specific reset method
@@ -206,6 +410,12 @@ class MainWindow(QMainWindow):
             self.update_navigation()
             self.update_measurements_display()
     
+    def closeEvent(self, event):
+        self.image_loader.cancel()
+        self.video_runner.cancel()
+        self.measurement_controller.cancel_detection()
+        super().closeEvent(event)
+    
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if hasattr(self, 'control_scroll'):
@@ -217,11 +427,23 @@ class MainWindow(QMainWindow):
         self.prev_image_btn.setEnabled(self.current_image_index > 0)
         self.next_image_btn.setEnabled(self.current_image_index < len(self.images) - 1)
         
+        self.prev_image_btn.setIcon(self._thumbnail_icon(self.current_image_index - 1))
+        self.next_image_btn.setIcon(self._thumbnail_icon(self.current_image_index + 1))
+        
         if self.images and self.current_image_index >= 0:
-            self.image_label.setText(f"Image {self.current_image_index + 1} of {len(self.images)}")
+            text = f"Image {self.current_image_index + 1} of {len(self.images)}"
+            if self.images[self.current_image_index].content_changed:
+                text += " (file changed since the project was saved)"
+            self.image_label.setText(text)
         else:
             self.image_label.setText("No image loaded")
     
+    def _thumbnail_icon(self, index: int) -> QIcon:
+        if not (0 <= index < len(self.images)) or self.images[index]['thumbnail'] is None:
+            return QIcon()
+        q_img = self.image_display_manager.convert_cv_to_qimage(self.images[index]['thumbnail'])
+        return QIcon(QPixmap.fromImage(q_img))
+    
     def initialize_measurement(self):
         self.measurement_controller.initialize_for_new_measurement()
     
@@ -246,130 +468,205 @@ class MainWindow(QMainWindow):
             self.calibration_label.setText("Scale: Not calibrated")
     
     def update_measurements_display(self):
-        self.measurements_table.setRowCount(len(self.measurements))
-        
-        for i, measurement in enumerate(self.measurements):
-            try:
-                slope, intercept = self.calibration_window.calibration_params
-                current = (measurement.B_field * 1e4 - intercept) / slope
-            except (AttributeError, TypeError):
-                current = 0
-            
-            current_item = QTableWidgetItem(f"{current:.3f}")
-            current_item.setFlags(current_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.measurements_table.setItem(i, 0, current_item)
-            
-            field_item = QTableWidgetItem(f"{measurement.B_field:.6f}")
-            field_item.setFlags(field_item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-            self.measurements_table.setItem(i, 1, field_item)
-            
-            delete_btn = QPushButton('Delete')
-            delete_btn.clicked.connect(lambda checked, row=i: self.delete_measurement(row))
-            self.measurements_table.setCellWidget(i, 2, delete_btn)
-        
-        self.measurements_table.resizeColumnsToContents()
+        # Rows are added and removed through the model; only the derived current column can go stale.
+        self.measurement_model.set_calibration_params(self.calibration_window.calibration_params)
         
     def delete_measurement(self, index):
         if 0 <= index < len(self.measurements):
-            self.measurements.pop(index)
+            self.regression.remove(self.measurement_model.remove_row(index))
             
-            self.update_measurements_display()
-            self.table_window.update_table(self.measurements)
-            
-            if self.measurements:
-                self.plot_window.plot_data(self.measurements)
+            self.update_live_results(replot=True)
             
             QMessageBox.information(self, 'Success', f'Measurement {index + 1} deleted')
     
+    def delete_selected_measurements(self):
+        rows = sorted({index.row() for index in self.measurements_table.selectionModel().selectedRows()}, reverse=True)
+        if not rows:
+            return
+        if len(rows) == 1:
+            self.delete_measurement(rows[0])
+            return
+        for row in rows:
+            self.regression.remove(self.measurement_model.remove_row(row))
+        self.update_live_results(replot=True)
+        QMessageBox.information(self, 'Success', f'{len(rows)} measurements deleted')
+    
+    def fit_measurements(self, live: bool = False):
+        # Returns ((inner_fit, outer_fit), outlier_rows). Live OLS updates read the running regression
+        # and skip the outlier pass; every other case refits with the selected method.
+        method = self.fit_method_combo.currentData()
+        if live and method == 'ols':
+            return self.regression.fits(), None
+        sigma_B, sigma_E_i, sigma_E_o = self.zeeman_calculator.point_uncertainties(self.measurements,
+                                                                                   self.uncertainty_model())
+        inner_fit, outer_fit, outliers = fit_zeeman(self.measurements, method, sigma_B, sigma_E_i, sigma_E_o,
+                                                    seed=self.uncertainty_seed)
+        return (inner_fit, outer_fit), outliers
+    
+    def update_live_results(self, replot: bool = False):
+        if len(self.measurements) == 0:
+            self.measurement_model.set_outliers(None)
+            self.results_window.clear_results()
+            return
+        try:
+            fits, outliers = self.fit_measurements(live=True)
+        except ValueError:
+            # e.g. weighted fits with all uncertainties set to zero; fall back to the running fit.
+            fits, outliers = self.regression.fits(), None
+        self.measurement_model.set_outliers(outliers)
+        self.results_window.update_results(bohr_magneton_from_fits(*fits), fits)
+        if replot or self.plot_window.live:
+            self.plot_window.plot_data(self.measurements, fits, outliers)
+    
+    def uncertainty_model(self) -> UncertaintyModel:
+        return UncertaintyModel(
+            radius_px_sigma=self.radius_sigma_input.value(),
+            mm_per_pixel_rel_sigma=self.scale_sigma_input.value() / 100,
+            current_sigma=self.current_sigma_input.value(),
+            calibration_params=self.calibration_window.calibration_params,
+            calibration_covariance=self.calibration_window.calibration_covariance
+        )
+    
+    def estimate_uncertainties(self):
+        seed = self.uncertainty_seed if self.fixed_seed_checkbox.isChecked() else None
+        try:
+            return self.zeeman_calculator.calculate_uncertainties(self.measurements, self.uncertainty_model(),
+                                                                  draws=self.uncertainty_draws, seed=seed)
+        except ValueError:
+            # Too few measurements for a slope; the results are shown without error bars.
+            return None
+    
     def calculate_results(self):
         if not self.measurements:
             QMessageBox.warning(self, 'Warning', 'No measurements available')
             return
         
-        results = calculate_bohr_magneton(self.measurements)
+        try:
+            fits, outliers = self.fit_measurements()
+        except ValueError as e:
+            QMessageBox.warning(self, 'Warning', f'Fit failed: {str(e)}')
+            return
         
-        self.plot_window.plot_data(self.measurements)
-        self.table_window.update_table(self.measurements)
-        self.results_window.update_results(results)
+        self.plot_window.plot_data(self.measurements, fits, outliers)
+        self.measurement_model.set_outliers(outliers)
+        self.results_window.update_results(bohr_magneton_from_fits(*fits), fits, self.estimate_uncertainties())
         
         self.show_plot()
         self.show_table()
         self.show_results()
     
-    def export_to_csv(self):
+    def export_data(self):
         if not self.measurements:
             QMessageBox.warning(self, 'Warning', 'No measurements to export')
             return
             
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             'Save Measurements',
             '',
-            'CSV Files (*.csv)'
+            'CSV Files (*.csv);;Parquet Files (*.parquet);;HDF5 Files (*.h5);;NumPy Archives (*.npz)'
         )
         
         if not file_path:
             return
+        if not Path(file_path).suffix:
+            file_path += selected_filter[selected_filter.index('*') + 1:-1]
+        
+        metadata = {
+            'calibration_params': [float(v) for v in self.calibration_window.calibration_params]
+            if self.calibration_window.calibration_params is not None else None,
+            'rows': len(self.measurements),
+        }
+        try:
+            export_measurements(self.measurements, Path(file_path),
+                                calibration_params=self.calibration_window.calibration_params, metadata=metadata)
+        except ImportError as e:
+            QMessageBox.warning(self, 'Warning', f'This format needs an optional package: {str(e)}')
+            return
+        except (ValueError, OSError) as e:
+            QMessageBox.critical(self, 'Error', f'Export failed: {str(e)}')
+            return
+            
+        QMessageBox.information(self, 'Success', f'Measurements exported to {file_path}')
 
-        L = 150  
-        n = 1.46 
-        
-        with open(file_path, 'w', newline='') as f:
-            writer = csv.writer(f, delimiter='\t')
+    def save_project(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, 'Save Project', self.project_path or f'session{PROJECT_SUFFIX}',
+                                                   f'Zeeman Projects (*{PROJECT_SUFFIX})')
+        if not file_path:
+            return
+        if not file_path.endswith(PROJECT_SUFFIX):
+            file_path += PROJECT_SUFFIX
             
-            writer.writerow([
-                'I(A)', 'B(G)', 
-                'R_i(mm)', 'R_c(mm)', 'R_o(mm)',
-                'α_i(deg)', 'α_c(deg)', 'α_o(deg)',
-                'β_i(deg)', 'β_c(deg)', 'β_o(deg)',
-                'Δλ_i(nm)', 'Δλ_o(nm)',
-                'ΔE_i(eV)', 'ΔE_o(eV)'
-            ])
+        settings = {
+            'wavelength_nm': self.wavelength_input.value(),
+            'current': self.current_input.value(),
+            'fit_method': self.fit_method_combo.currentData(),
+            'current_image_index': self.current_image_index,
+        }
+        enhancement_params = self.image_processor.enhancement_params() if self.embed_enhanced_checkbox.isChecked() else None
+        try:
+            save_project(Path(file_path), self.images, self.measurements,
+                         self.calibration_window.calibration_points, self.calibration_window.calibration_params,
+                         settings, enhancement_cache=self.image_processor.enhancement_cache,
+                         enhancement_params=enhancement_params)
+        except (ValueError, OSError) as e:
+            QMessageBox.critical(self, 'Error', f'Could not save project: {str(e)}')
+            return
             
-            for m in self.measurements:
-                B_field = m.B_field * 1e4 
-                
-                try:
-                    slope, intercept = self.calibration_window.calibration_params
-                    current = (B_field - intercept) / slope  
-                except (AttributeError, TypeError):
-                    QMessageBox.warning(self, 'Warning', 'Please calibrate the magnetic field first')
-                    return
-                
-                def calc_angles(r_mm):
-                    if r_mm is None:
-                        return None, None
-                    alpha = np.arctan(r_mm / L)
-                    beta = np.arcsin(np.sin(alpha) / n)
-                    return alpha, beta
-                
-                alpha_i, beta_i = calc_angles(m.R_inner)
-                alpha_c, beta_c = calc_angles(m.R_center)
-                alpha_o, beta_o = calc_angles(m.R_outer)
-                
-                def format_val(val, precision=6):
-                    return f"{val:.{precision}f}" if val is not None else ""
-                
-                row = [
-                    format_val(current, 2),  
-                    format_val(B_field, 2),  
-                    format_val(m.R_inner, 3) if m.R_inner else "",
-                    format_val(m.R_center, 3) if m.R_center else "",
-                    format_val(m.R_outer, 3) if m.R_outer else "",
-                    format_val(np.degrees(alpha_i), 4) if alpha_i is not None else "",
-                    format_val(np.degrees(alpha_c), 4) if alpha_c is not None else "",
-                    format_val(np.degrees(alpha_o), 4) if alpha_o is not None else "",
-                    format_val(np.degrees(beta_i), 4) if beta_i is not None else "",
-                    format_val(np.degrees(beta_c), 4) if beta_c is not None else "",
-                    format_val(np.degrees(beta_o), 4) if beta_o is not None else "",
-                    format_val(m.delta_lambda_i * 1e9, 3) if m.delta_lambda_i else "",  # nm
-                    format_val(m.delta_lambda_o * 1e9, 3) if m.delta_lambda_o else "",  # nm
-                    format_val(m.delta_E_i / 1.602176634e-19, 6) if m.delta_E_i else "",  # eV
-                    format_val(m.delta_E_o / 1.602176634e-19, 6) if m.delta_E_o else ""   # eV
-                ]
-                writer.writerow(row)
-                
-            QMessageBox.information(self, 'Success', f'Measurements exported to {file_path}')
+        self.project_path = file_path
+        QMessageBox.information(self, 'Success', f'Project saved to {file_path}')
+
+    def open_project(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, 'Open Project', '', f'Zeeman Projects (*{PROJECT_SUFFIX})')
+        if not file_path:
+            return
+        try:
+            project = load_project(Path(file_path))
+        except (ValueError, OSError) as e:
+            QMessageBox.critical(self, 'Error', f'Could not open project: {str(e)}')
+            return
+        
+        self.image_loader.cancel()
+        # Frames still being analyzed belong to the old session's measurements.
+        self.video_runner.abandon()
+        self._close_video_progress()
+        self.measurement_controller.reset_all_measurement_states()
+        self.images = project.images
+        self.image_loader.store = self.images
+        for record in self.images:
+            measurement = record['measurement']
+            if measurement and measurement.get('center') is not None:
+                measurement['center'] = QPoint(*measurement['center'])
+        
+        self.measurements = project.measurements
+        self.measurement_model.reset(self.measurements)
+        self.regression.reset()
+        self.regression.add_set(self.measurements)
+        self.calibration_window.set_points(project.calibration_points, project.calibration_params)
+        
+        settings = project.settings
+        if 'wavelength_nm' in settings:
+            self.wavelength_input.setValue(settings['wavelength_nm'])
+        if 'current' in settings:
+            self.current_input.setValue(settings['current'])
+        if self.fit_method_combo.findData(settings.get('fit_method')) >= 0:
+            self.fit_method_combo.setCurrentIndex(self.fit_method_combo.findData(settings['fit_method']))
+        if self.images:
+            self.current_image_index = min(max(settings.get('current_image_index', 0), 0), len(self.images) - 1)
+        else:
+            self.current_image_index = -1
+        
+        self.project_path = file_path
+        self.image_display_manager.scale_factor = 1.0
+        self.update_display()
+        self.update_navigation()
+        self.update_scale_display()
+        self.update_measurements_display()
+        self.update_live_results(replot=True)
+        
+        if project.missing:
+            QMessageBox.warning(self, 'Warning', f'{len(project.missing)} image(s) could not be found and were skipped:\n'
+                                + '\n'.join(project.missing[:10]))
 
     def fill_test_data(self):
         calibration_points = [
@@ -414,10 +711,7 @@ class MainWindow(QMainWindow):
             for radius in case['radii']:
                 cv2.circle(test_img, (center_x, center_y), radius, (255, 255, 255), 2)
             
-            self.images.append({
-                'image': test_img,
-                'mm_per_pixel': 0.1
-            })
+            self.images.add_array(test_img, mm_per_pixel=0.1)
         
         self.current_image_index = 0
         self.update_display()
@@ -443,6 +737,6 @@ class MainWindow(QMainWindow):
                 self.next_image()
         
         if self.measurements:
-            self.plot_window.plot_data(self.measurements)
+            self.update_live_results(replot=True)
         
         QMessageBox.information(self, 'Success', 'Test data has been loaded. Press Ctrl+S to save measurements.')
\ No newline at end of file
@@ -1,7 +1,9 @@
 from PyQt6.QtCore import QPoint
-from PyQt6.QtWidgets import QMessageBox, QInputDialog
+from PyQt6.QtWidgets import QMessageBox, QInputDialog, QProgressDialog
 from typing import Optional, Dict, List, Any
 import numpy as np
+from src.gui.detection_worker import DetectionJob, DetectionRunner
+from src.processing.profiling import profiler
 
 class MeasurementController:
     def __init__(self, main_window_instance, ui_manager): 
@@ -17,7 +19,16 @@ class MeasurementController:
         self.auto_detect_limits: Dict[str, Optional[float]] = {'lower': None, 'upper': None}
         self.is_defining_annulus: bool = False
 
+        self.detection_runner = DetectionRunner(self.mw.image_processor, self.mw)
+        self.detection_runner.progress.connect(self._on_detection_progress)
+        self.detection_runner.succeeded.connect(self._on_detection_succeeded)
+        self.detection_runner.failed.connect(self._on_detection_failed)
+        self.detection_runner.cancelled.connect(self._on_detection_cancelled)
+        self.pending_detection: Optional[DetectionJob] = None
+        self.detection_progress_dialog: Optional[QProgressDialog] = None
+
     def reset_all_measurement_states(self):
+        self.cancel_detection()
         self.current_mode = None
         self.calibration_points = []
         self.current_measurement = {
@@ -27,6 +38,8 @@ class MeasurementController:
         self.is_defining_annulus = False
 
     def initialize_for_new_measurement(self):
+        # Results of a detection started on another image or measurement must not land here.
+        self.cancel_detection()
         current_center = self.current_measurement.get('center') 
         self.current_measurement = {
             'center': current_center, 'type': None, 'radii': {'inner': None, 'middle': None, 'outer': None}
@@ -36,6 +49,7 @@ class MeasurementController:
         self.is_defining_annulus = False
 
     def set_mode(self, mode: Optional[str]):
+        self.cancel_detection()
         intended_mode = mode 
 
         if intended_mode == 'center':
@@ -91,60 +105,17 @@ class MeasurementController:
                 self.mw.update_display() 
 
                 ring_type_to_update = self.current_mode.split('_')[1]
+                center_search_window_size = 10  
                 
-                try:
-                    raw_rgb_image = current_image_data['image']
-                    self.mw.image_processor.image = raw_rgb_image 
-                    enhanced_image = self.mw.image_processor.enhance_image() 
-                    
-                    initial_center_x = center_point.x()
-                    initial_center_y = center_point.y()
-                    lower_rad = int(self.auto_detect_limits['lower'])
-                    upper_rad = int(self.auto_detect_limits['upper'])
-
-                    center_search_window_size = 10  
-                    
-                    detected_info_dict = self.mw.image_processor.auto_detect_radius_refined(
-                        enhanced_image, initial_center_x, initial_center_y, 
-                        lower_rad, upper_rad, center_search_window_half_size=center_search_window_size)
-
-                    if detected_info_dict:
-                        det_x = detected_info_dict['center_x']
-                        det_y = detected_info_dict['center_y']
-                        det_r_centerline = detected_info_dict['radius_centerline']
-                        det_r = det_r_centerline 
-                        
-                        original_center_qpoint = center_point
-                        new_center_qpoint = QPoint(det_x, det_y)
-                        
-                        center_shift_distance = np.sqrt((det_x - original_center_qpoint.x())**2 + 
-                                                     (det_y - original_center_qpoint.y())**2)
-                        
-                        self.current_measurement['center'] = new_center_qpoint
-                        self.current_measurement['radii'][ring_type_to_update] = det_r
-                        self.current_measurement['type'] = ring_type_to_update
-                        
-                        msg = f"Auto-detection for {ring_type_to_update} ring successful:\n"
-                        msg += f"• Detected radius: {det_r:.2f} pixels\n"
-                        
-                        if center_shift_distance > 0.5: 
-                            msg += f"• Center point adjusted by {center_shift_distance:.2f} pixels\n"
-                            msg += f"• Original center: ({original_center_qpoint.x()}, {original_center_qpoint.y()})\n"
-                            msg += f"• Optimized center: ({det_x}, {det_y})\n"
-                            msg += "\nThe center was automatically adjusted to better match the spectral ring pattern."
-                        else:
-                            msg += f"• Center point remained at ({det_x}, {det_y})\n"
-                            msg += "\nThe manually specified center point was optimal."
-                            
-                        QMessageBox.information(self.mw, 'Auto-Detection Success', msg)
-                    else:
-                        self.current_measurement['radii'][ring_type_to_update] = None
-                        QMessageBox.warning(self.mw, 'Failure', f"Auto-detection failed for {ring_type_to_update} ring.")
-                except Exception as e:
-                    if ring_type_to_update: self.current_measurement['radii'][ring_type_to_update] = None
-                    QMessageBox.critical(self.mw, "Processing Error", f"Error during {ring_type_to_update} ring detection: {str(e)}")
-                finally:
-                    self._reset_auto_detect_state_and_update_ui()
+                center_search = self.mw.center_search_combo.currentData() if hasattr(self.mw, 'center_search_combo') else 'grid'
+
+                job = DetectionJob(current_image_data, current_image_data['image'], ring_type_to_update,
+                                   center_point.x(), center_point.y(),
+                                   int(self.auto_detect_limits['lower']), int(self.auto_detect_limits['upper']),
+                                   center_search=center_search,
+                                   center_search_window_half_size=center_search_window_size)
+                self._start_detection(job)
+                return
             
             self.mw.update_display() 
 
@@ -202,6 +173,139 @@ class MeasurementController:
         else:
             pass
 
+    def _start_detection(self, job: DetectionJob):
+        self.pending_detection = job
+        self.is_defining_annulus = False
+        self.current_mode = None
+
+        self.detection_progress_dialog = QProgressDialog(f'Detecting {job.ring_type} ring(s)...', 'Cancel', 0, 0, self.mw)
+        self.detection_progress_dialog.setWindowTitle('Auto-Detection')
+        self.detection_progress_dialog.setMinimumDuration(500)
+        self.detection_progress_dialog.canceled.connect(self.cancel_detection)
+
+        # Each detection gets its own profile so the summary and trace describe just this run.
+        if profiler.enabled:
+            profiler.reset()
+        self.detection_runner.start(job)
+        self.mw.update_display()
+
+    def cancel_detection(self):
+        if self.pending_detection is None:
+            return
+        self.pending_detection = None
+        self.detection_runner.cancel()
+        self._close_detection_progress()
+        self._reset_auto_detect_state_and_update_ui()
+
+    def _close_detection_progress(self):
+        if self.detection_progress_dialog is not None:
+            self.detection_progress_dialog.canceled.disconnect(self.cancel_detection)
+            self.detection_progress_dialog.close()
+            self.detection_progress_dialog = None
+
+    def _finish_detection(self, job: DetectionJob) -> bool:
+        if job is not self.pending_detection:
+            return False
+        self.pending_detection = None
+        self._close_detection_progress()
+        self.mw.show_profile_summary()
+        self.mw.update_detection_cache_display()
+        return True
+
+    def _store_measurement(self, job: DetectionJob):
+        current_image_data = self.mw.images[self.mw.current_image_index] if self.mw.current_image_index >= 0 else None
+        if current_image_data is job.record:
+            job.record['measurement'] = self.current_measurement.copy()
+
+    def _on_detection_progress(self, evaluated: int, total: int):
+        if self.detection_progress_dialog is not None:
+            self.detection_progress_dialog.setMaximum(total)
+            self.detection_progress_dialog.setLabelText(f'Detecting {self.pending_detection.ring_type} ring(s)...\n'
+                                                        f'Candidate centers evaluated: {evaluated} of {total}')
+            self.detection_progress_dialog.setValue(evaluated)
+
+    def _on_detection_succeeded(self, job: DetectionJob, result):
+        if not self._finish_detection(job):
+            return
+        try:
+            if job.ring_type == 'all':
+                self._apply_multi_ring_detection(result)
+            else:
+                self._apply_ring_detection(job, result)
+            self._store_measurement(job)
+        finally:
+            self._reset_auto_detect_state_and_update_ui()
+
+    def _on_detection_failed(self, job: DetectionJob, message: str):
+        if not self._finish_detection(job):
+            return
+        if job.ring_type in self.current_measurement['radii']:
+            self.current_measurement['radii'][job.ring_type] = None
+        self._store_measurement(job)
+        QMessageBox.critical(self.mw, "Processing Error", f"Error during {job.ring_type} ring detection: {message}")
+        self._reset_auto_detect_state_and_update_ui()
+
+    def _on_detection_cancelled(self, job: DetectionJob):
+        if self._finish_detection(job):
+            self._reset_auto_detect_state_and_update_ui()
+
+    def _apply_ring_detection(self, job: DetectionJob, detected_info_dict: Optional[dict]):
+        ring_type_to_update = job.ring_type
+        if not detected_info_dict:
+            self.current_measurement['radii'][ring_type_to_update] = None
+            QMessageBox.warning(self.mw, 'Failure', f"Auto-detection failed for {ring_type_to_update} ring.")
+            return
+
+        det_x = detected_info_dict['center_x']
+        det_y = detected_info_dict['center_y']
+        det_r_centerline = detected_info_dict['radius_centerline']
+        det_r = det_r_centerline 
+        
+        original_center_qpoint = QPoint(job.center_x, job.center_y)
+        new_center_qpoint = QPoint(det_x, det_y)
+        
+        center_shift_distance = np.sqrt((det_x - original_center_qpoint.x())**2 + 
+                                     (det_y - original_center_qpoint.y())**2)
+        
+        self.current_measurement['center'] = new_center_qpoint
+        self.current_measurement['radii'][ring_type_to_update] = det_r
+        self.current_measurement['type'] = ring_type_to_update
+        
+        msg = f"Auto-detection for {ring_type_to_update} ring successful:\n"
+        msg += f"• Detected radius: {det_r:.2f} pixels\n"
+        
+        if center_shift_distance > 0.5: 
+            msg += f"• Center point adjusted by {center_shift_distance:.2f} pixels\n"
+            msg += f"• Original center: ({original_center_qpoint.x()}, {original_center_qpoint.y()})\n"
+            msg += f"• Optimized center: ({det_x}, {det_y})\n"
+            msg += "\nThe center was automatically adjusted to better match the spectral ring pattern."
+        else:
+            msg += f"• Center point remained at ({det_x}, {det_y})\n"
+            msg += "\nThe manually specified center point was optimal."
+        msg += f"\n\nCandidate centers evaluated: {detected_info_dict['evaluations']}"
+            
+        QMessageBox.information(self.mw, 'Auto-Detection Success', msg)
+
+    def _apply_multi_ring_detection(self, detected: Optional[dict]):
+        if not detected:
+            QMessageBox.warning(self.mw, 'Failure', "Auto-detection found no rings in the annulus.")
+            return
+
+        first_order = detected['orders'][0]
+        for ring_type, radius in first_order.items():
+            if radius is not None:
+                self.current_measurement['radii'][ring_type] = radius
+        self.current_measurement['type'] = 'all'
+
+        msg = f"Detected {len(detected['rings'])} rings in {len(detected['orders'])} order(s):\n"
+        for i, order in enumerate(detected['orders'], start=1):
+            radii_text = ", ".join(f"{name} {r:.2f}" if r is not None else f"{name} -" for name, r in order.items())
+            msg += f"• Order {i}: {radii_text} pixels\n"
+        missing = [name for name, r in first_order.items() if r is None]
+        if missing:
+            msg += f"\nNot found in the first order: {', '.join(missing)}. Measure these manually."
+        QMessageBox.information(self.mw, 'Auto-Detection Success', msg)
+
     def _reset_auto_detect_state_and_update_ui(self):
         self.current_mode = None 
         self.auto_detect_limits = {'lower': None, 'upper': None}
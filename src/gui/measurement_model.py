@@ -0,0 +1,126 @@
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+from typing import Optional, Tuple
+from src.physics.zeeman import EV_TO_JOULE, MeasurementSet, ZeemanMeasurement
+
+OUTLIER_COLOR = QColor(255, 205, 205)
+
+# Header, MeasurementSet column, display scale, format. The current falls back to the
+# calibration line for measurements saved without one.
+COLUMNS = [
+    ('Current (A)', 'current', 1.0, '.3f'),
+    ('B (T)', 'B_field', 1.0, '.6f'),
+    ('Ri (mm)', 'R_inner', 1.0, '.3f'),
+    ('Rc (mm)', 'R_center', 1.0, '.3f'),
+    ('Ro (mm)', 'R_outer', 1.0, '.3f'),
+    ('Δλi (nm)', 'delta_lambda_i', 1e9, '.3f'),
+    ('Δλo (nm)', 'delta_lambda_o', 1e9, '.3f'),
+    ('ΔEi (eV)', 'delta_E_i', 1 / EV_TO_JOULE, '.3e'),
+    ('ΔEo (eV)', 'delta_E_o', 1 / EV_TO_JOULE, '.3e'),
+]
+CURRENT_COLUMN = 0
+
+class MeasurementTableModel(QAbstractTableModel):
+    def __init__(self, measurements: MeasurementSet, parent=None):
+        super().__init__(parent)
+        self._measurements = measurements
+        self._outliers = np.zeros(0, dtype=bool)
+        self.calibration_params: Optional[Tuple[float, float]] = None
+
+    @property
+    def measurements(self) -> MeasurementSet:
+        return self._measurements
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._measurements)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section][0]
+        return str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def _value(self, row: int, column: int) -> float:
+        _, name, scale, _ = COLUMNS[column]
+        value = float(self._measurements.column(name)[row])
+        if value != value and column == CURRENT_COLUMN and self.calibration_params is not None:
+            slope, intercept = self.calibration_params
+            value = (float(self._measurements.column('B_field')[row]) * 1e4 - intercept) / slope
+        return value * scale
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        # Cells are formatted only when a view asks for them, i.e. for the visible rows.
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self._value(row, index.column())
+            return format(value, COLUMNS[index.column()][3]) if value == value else None
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        if row < len(self._outliers) and self._outliers[row]:
+            if role == Qt.ItemDataRole.BackgroundRole:
+                return OUTLIER_COLOR
+            if role == Qt.ItemDataRole.ToolTipRole:
+                return 'Flagged as an outlier by the fit'
+        return None
+
+    def append(self, measurement: ZeemanMeasurement):
+        row = len(self._measurements)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._measurements.append(measurement)
+        if len(self._outliers):
+            self._outliers = np.append(self._outliers, False)
+        self.endInsertRows()
+
+    def remove_row(self, row: int) -> ZeemanMeasurement:
+        self.beginRemoveRows(QModelIndex(), row, row)
+        measurement = self._measurements.pop(row)
+        if row < len(self._outliers):
+            self._outliers = np.delete(self._outliers, row)
+        self.endRemoveRows()
+        return measurement
+
+    def reset(self, measurements: Optional[MeasurementSet] = None):
+        self.beginResetModel()
+        if measurements is not None:
+            self._measurements = measurements
+        self._outliers = np.zeros(0, dtype=bool)
+        self.endResetModel()
+
+    def _emit_rows_changed(self, rows: np.ndarray):
+        # One dataChanged per run of consecutive rows.
+        if len(rows) == 0:
+            return
+        breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        last_column = len(COLUMNS) - 1
+        for run in np.split(rows, breaks):
+            self.dataChanged.emit(self.index(int(run[0]), 0), self.index(int(run[-1]), last_column),
+                                  [Qt.ItemDataRole.BackgroundRole, Qt.ItemDataRole.ToolTipRole])
+
+    def set_outliers(self, outliers: Optional[np.ndarray]):
+        n = len(self._measurements)
+        new = np.zeros(n, dtype=bool)
+        if outliers is not None:
+            new[:min(n, len(outliers))] = outliers[:n]
+        old = np.zeros(n, dtype=bool)
+        old[:min(n, len(self._outliers))] = self._outliers[:n]
+        self._outliers = new
+        self._emit_rows_changed(np.flatnonzero(old != new))
+
+    def set_calibration_params(self, calibration_params: Optional[Tuple[float, float]]):
+        if calibration_params == self.calibration_params:
+            return
+        self.calibration_params = calibration_params
+        if len(self._measurements):
+            self.dataChanged.emit(self.index(0, CURRENT_COLUMN),
+                                  self.index(len(self._measurements) - 1, CURRENT_COLUMN),
+                                  [Qt.ItemDataRole.DisplayRole])
@@ -1,65 +1,254 @@
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton, QFileDialog, QHBoxLayout
+from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QPushButton, QFileDialog, QHBoxLayout, QCheckBox, QLabel
+from PyQt6.QtCore import QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+import time
 import numpy as np
+from typing import List, Optional, Tuple
+from src.physics.zeeman import MeasurementSet
+from src.physics.regression import LinearFit, ZeemanRegression
+
+EMPTY_OFFSETS = np.empty((0, 2))
+
+def decimate(x: np.ndarray, ys: List[np.ndarray], xlim: Tuple[float, float], ylim: Tuple[float, float],
+             grid: Tuple[int, int]) -> List[np.ndarray]:
+    # For each y series sharing x, the indices of one point per occupied grid cell. Dense regions
+    # collapse to a point per cell while isolated points (e.g. outliers) are all kept, and the result
+    # never exceeds the cell count.
+    nx, ny = grid
+    cx = ((x - xlim[0]) * (nx / (xlim[1] - xlim[0]))).astype(np.intp)
+    np.clip(cx, 0, nx - 1, out=cx)
+    order = np.arange(len(x))
+    kept = []
+    for y in ys:
+        cell = ((y - ylim[0]) * (ny / (ylim[1] - ylim[0]))).astype(np.intp)
+        np.clip(cell, 0, ny - 1, out=cell)
+        cell *= nx
+        cell += cx
+        owner = np.full(nx * ny, -1, dtype=np.intp)
+        owner[cell] = order
+        kept.append(owner[owner >= 0])
+    return kept
+
+def _padded(low: float, high: float, fraction: float = 0.05) -> Tuple[float, float]:
+    span = high - low
+    pad = span * fraction if span > 0 else (abs(high) * fraction or 1.0)
+    return low - pad, high + pad
 
 class PlotWindow(QMainWindow):
-    def __init__(self, ui_manager):
+    def __init__(self, ui_manager, decimation_threshold: int = 5000, max_fps: float = 10.0):
         super().__init__()
         self.setWindowTitle('Energy Shift vs Magnetic Field')
         self.setGeometry(200, 200, 800, 600)
         self.ui_manager = ui_manager
-        
+
+        # Series longer than this are decimated to one point per cell of decimation_grid.
+        self.decimation_threshold = decimation_threshold
+        self.decimation_grid = (480, 360)
+        self.max_fps = max_fps
+        self.live = False
+
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
-        
+
         self.figure = Figure()
         self.ax = self.figure.add_subplot(111)
         self.canvas = FigureCanvas(self.figure)
         layout.addWidget(self.canvas)
-        
+
         button_layout = QHBoxLayout()
+        self.live_checkbox = QCheckBox('Live updates')
+        self.live_checkbox.toggled.connect(self.set_live)
+        button_layout.addWidget(self.live_checkbox)
+        self.status_label = QLabel()
+        button_layout.addWidget(self.status_label)
         save_button = QPushButton('Save Plot')
         save_button.clicked.connect(self.save_plot)
         button_layout.addStretch()
         button_layout.addWidget(save_button)
         layout.addLayout(button_layout)
-    
-    def plot_data(self, measurements):
-        self.ax.clear()
-        valid_measurements = [m for m in measurements if m.delta_E_i is not None and m.delta_E_o is not None]
-        
-        if valid_measurements:
-            B_values = [m.B_field for m in valid_measurements]
-            E_i_values = [abs(m.delta_E_i) for m in valid_measurements]  
-            E_o_values = [abs(m.delta_E_o) for m in valid_measurements]  
-            
-            self.ax.scatter(B_values, E_i_values, color='blue', marker='o', s=100, label='Inner shifts', zorder=3)
-            self.ax.scatter(B_values, E_o_values, color='red', marker='o', s=100, label='Outer shifts', zorder=3)
-            
-            if len(B_values) > 1:
-                B_line = np.linspace(min(B_values), max(B_values), 100)
-                
-                B_array = np.array(B_values)
-                E_i_array = np.array(E_i_values)
-                E_o_array = np.array(E_o_values)
-                
-                z_i = np.polyfit(B_array, E_i_array, 1)
-                p_i = np.poly1d(z_i)
-                self.ax.plot(B_line, p_i(B_line), 'b-', linewidth=2, label=f'Inner fit: {z_i[0]:.3e} J/T', alpha=0.7, zorder=2)
-                
-                z_o = np.polyfit(B_array, E_o_array, 1)
-                p_o = np.poly1d(z_o)
-                self.ax.plot(B_line, p_o(B_line), 'r-', linewidth=2, label=f'Outer fit: {z_o[0]:.3e} J/T', alpha=0.7, zorder=2)
-            
-            self.ax.set_xlabel('Magnetic Field (T)')
-            self.ax.set_ylabel('|Energy Shift| (J)')
-            self.ax.set_title('Energy Shift vs Magnetic Field')
-            self.ax.grid(True)
-            self.ax.legend()
+
+        self._pending = None
+        self._background = None
+        self._last_render = 0.0
+        self.render_count = 0
+        self.full_draw_count = 0
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.timeout.connect(self._render_pending)
+
+        self._setup_axes()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _setup_axes(self):
+        # The data artists are created once and marked animated: full draws cache everything else
+        # as a background and updates blit only these on top of it.
+        self.ax.set_xlabel('Magnetic Field (T)')
+        self.ax.set_ylabel('|Energy Shift| (J)')
+        self.ax.set_title('Energy Shift vs Magnetic Field')
+        self.ax.grid(True)
+        self.inner_points = self.ax.scatter([], [], color='blue', marker='o', s=100, label='Inner shifts',
+                                            zorder=3, animated=True)
+        self.outer_points = self.ax.scatter([], [], color='red', marker='o', s=100, label='Outer shifts',
+                                            zorder=3, animated=True)
+        self.outlier_points = self.ax.scatter([], [], color='black', marker='x', s=150, label='Outliers',
+                                              zorder=4, animated=True)
+        self.inner_line, = self.ax.plot([], [], 'b-', linewidth=2, alpha=0.7, zorder=2, animated=True)
+        self.outer_line, = self.ax.plot([], [], 'r-', linewidth=2, alpha=0.7, zorder=2, animated=True)
+        self.legend = None
+        self._legend_labels = None
+
+    def _animated_artists(self):
+        artists = [self.inner_line, self.outer_line, self.inner_points, self.outer_points, self.outlier_points]
+        if self.legend is not None:
+            artists.append(self.legend)
+        return artists
+
+    def set_live(self, enabled: bool):
+        self.live = enabled
+        if not enabled and self._pending is not None:
+            self._render_timer.stop()
+            self._render_pending()
+
+    def plot_data(self, measurements, fits: Optional[Tuple[Optional[LinearFit], Optional[LinearFit]]] = None,
+                  outliers: Optional[np.ndarray] = None):
+        if not isinstance(measurements, MeasurementSet):
+            measurements = MeasurementSet.from_measurements(measurements)
+        if fits is None:
+            regression = ZeemanRegression()
+            regression.add_set(measurements)
+            fits = regression.fits()
+        self._pending = (measurements, fits, None if outliers is None else np.array(outliers, dtype=bool))
+
+        # A hidden window renders when it is shown; in live mode bursts are coalesced to max_fps.
+        if not self.isVisible():
+            return
+        if self.live:
+            wait_ms = (self._last_render + 1.0 / self.max_fps - time.perf_counter()) * 1000
+            if wait_ms > 0:
+                if not self._render_timer.isActive():
+                    self._render_timer.start(int(wait_ms) + 1)
+                return
+        self._render_pending()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._pending is not None:
+            self._render_pending()
+
+    def _render_pending(self):
+        if self._pending is None:
+            return
+        measurements, fits, outliers = self._pending
+        self._pending = None
+        self._last_render = time.perf_counter()
+        self.render_count += 1
+
+        valid = measurements.valid()
+        # Skip the masked copies in the common case where every row is complete.
+        select = slice(None) if valid.all() else valid
+        B_values = measurements.column('B_field')[select]
+        E_i_values = np.abs(measurements.column('delta_E_i')[select])
+        E_o_values = np.abs(measurements.column('delta_E_o')[select])
+        flagged = outliers[valid] if outliers is not None and len(outliers) == len(valid) else None
+        fit_i, fit_o = fits
+
+        if len(B_values) == 0:
+            for points in (self.inner_points, self.outer_points, self.outlier_points):
+                points.set_offsets(EMPTY_OFFSETS)
+            self.inner_line.set_data([], [])
+            self.outer_line.set_data([], [])
+            self._set_legend(None)
+            self.status_label.setText('')
+            self._refresh(None, None)
+            return
+
+        xlim = _padded(B_values.min(), B_values.max())
+        ylim = _padded(min(E_i_values.min(), E_o_values.min()), max(E_i_values.max(), E_o_values.max()))
+        decimated = len(B_values) > self.decimation_threshold
+        if decimated:
+            kept = decimate(B_values, [E_i_values, E_o_values], xlim, ylim, self.decimation_grid)
+        for i, (points, E_values) in enumerate(((self.inner_points, E_i_values), (self.outer_points, E_o_values))):
+            if decimated:
+                points.set_offsets(np.column_stack([B_values[kept[i]], E_values[kept[i]]]))
+            else:
+                points.set_offsets(np.column_stack([B_values, E_values]))
+            points.set_sizes([16 if decimated else 100])
+
+        if flagged is not None and flagged.any():
+            self.outlier_points.set_offsets(np.column_stack([np.concatenate([B_values[flagged], B_values[flagged]]),
+                                                             np.concatenate([E_i_values[flagged], E_o_values[flagged]])]))
+        else:
+            self.outlier_points.set_offsets(EMPTY_OFFSETS)
+
+        # A straight line only needs its end points.
+        B_line = np.array([B_values.min(), B_values.max()])
+        handles = [self.inner_points, self.outer_points]
+        labels = ['Inner shifts', 'Outer shifts']
+        for line, fit, name in ((self.inner_line, fit_i, 'Inner'), (self.outer_line, fit_o, 'Outer')):
+            if fit is not None:
+                line.set_data(B_line, fit.slope * B_line + fit.intercept)
+                handles.append(line)
+                labels.append(f'{name} fit: {fit.slope:.3e} J/T (R² = {fit.r_squared:.3f})')
+            else:
+                line.set_data([], [])
+        if flagged is not None and flagged.any():
+            handles.append(self.outlier_points)
+            labels.append('Outliers')
+        self._set_legend((handles, labels))
+
+        if decimated:
+            self.status_label.setText(f'{len(B_values)} points, {len(self.inner_points.get_offsets())} '
+                                      f'+ {len(self.outer_points.get_offsets())} drawn')
+        else:
+            self.status_label.setText(f'{len(B_values)} points')
+        self._refresh(xlim, ylim)
+
+    def _set_legend(self, entries):
+        labels = None if entries is None else tuple(entries[1])
+        if labels == self._legend_labels:
+            return
+        if self.legend is not None:
+            self.legend.remove()
+            self.legend = None
+        if entries is not None:
+            # A fixed location: 'best' would scan every data point on each draw.
+            self.legend = self.ax.legend(*entries, loc='upper left')
+            self.legend.set_animated(True)
+        self._legend_labels = labels
+
+    def _refresh(self, xlim, ylim):
+        # Full redraw only when the axes must change: data outside the view, or the data
+        # occupying much less than it after deletions. Everything else is a blit.
+        needs_full_draw = self._background is None
+        if xlim is not None:
+            for (low, high), (view_low, view_high) in ((xlim, self.ax.get_xlim()), (ylim, self.ax.get_ylim())):
+                view_span = view_high - view_low
+                if low < view_low or high > view_high or (high - low) < 0.5 * view_span:
+                    needs_full_draw = True
+            if needs_full_draw:
+                self.ax.set_xlim(*xlim)
+                self.ax.set_ylim(*ylim)
+        if needs_full_draw:
+            self.full_draw_count += 1
             self.canvas.draw()
-            
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.figure.bbox)
+
+    def _on_draw(self, event):
+        if self.canvas.is_saving():
+            # savefig already includes animated artists.
+            return
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        for artist in self._animated_artists():
+            self.figure.draw_artist(artist)
+
     def save_plot(self):
         file_name, _ = QFileDialog.getSaveFileName(
             self,
@@ -69,5 +258,5 @@ class PlotWindow(QMainWindow):
         )
         if file_name:
             self.figure.savefig(file_name, dpi=300, bbox_inches='tight')
-            
-        self.canvas.draw()
\ No newline at end of file
+
+        self.canvas.draw()
@@ -1,6 +1,9 @@
 from PyQt6.QtWidgets import (QMainWindow, QLabel, QVBoxLayout, QWidget, QScrollArea,
                              QPushButton, QHBoxLayout, QApplication)
 from PyQt6.QtCore import Qt
+from typing import Optional, Tuple
+from src.physics.regression import LinearFit
+from src.physics.zeeman_calculator import UncertaintyResult
 
 class ResultsWindow(QMainWindow):
     def __init__(self, ui_manager):
@@ -33,7 +36,39 @@ class ResultsWindow(QMainWindow):
         button_layout.addWidget(copy_button)
         layout.addLayout(button_layout)
     
-    def update_results(self, results):
+        self._current_text = ''
+    
+    @staticmethod
+    def _format_fit(name: str, fit: Optional[LinearFit]) -> str:
+        if fit is None:
+            return f"{name} fit: not enough points\n"
+        text = f"{name} fit ({fit.method}, n = {fit.n}): slope {fit.slope:.3e} ± {fit.slope_stderr:.1e} J/T, "
+        text += f"intercept {fit.intercept:.3e} ± {fit.intercept_stderr:.1e} J, R² = {fit.r_squared:.4f}\n"
+        if fit.outliers is not None and fit.outliers.any():
+            text += f"  {int(fit.outliers.sum())} outlier(s) flagged\n"
+        return text
+    
+    def clear_results(self):
+        self.results_label.setText('')
+        self._current_text = ''
+    
+    @staticmethod
+    def _format_uncertainties(uncertainties: UncertaintyResult) -> str:
+        text = f"\n\nMonte Carlo uncertainties ({uncertainties.draws} draws, "
+        text += f"{uncertainties.confidence * 100:.0f}% intervals, seed {uncertainties.seed}):\n"
+        for name, label, unit in (('bohr_magneton_inner', 'Inner Bohr magneton', 'J/T'),
+                                  ('bohr_magneton_outer', 'Outer Bohr magneton', 'J/T'),
+                                  ('bohr_magneton_avg', 'Average Bohr magneton', 'J/T'),
+                                  ('specific_charge_inner', 'Inner specific charge', 'C/kg'),
+                                  ('specific_charge_outer', 'Outer specific charge', 'C/kg'),
+                                  ('specific_charge_avg', 'Average specific charge', 'C/kg')):
+            interval = uncertainties.intervals[name]
+            text += f"{label}: {abs(interval.value):.3e} ± {interval.std:.1e} {unit} "
+            text += f"[{interval.lower:.3e}, {interval.upper:.3e}]\n"
+        return text
+    
+    def update_results(self, results, fits: Optional[Tuple[Optional[LinearFit], Optional[LinearFit]]] = None,
+                       uncertainties: Optional[UncertaintyResult] = None):
         bohr_magneton_inner, bohr_magneton_outer, bohr_magneton_avg, \
         specific_charge_inner, specific_charge_outer, specific_charge_avg = results
         
@@ -51,6 +86,14 @@ class ResultsWindow(QMainWindow):
         text += f"Bohr magneton: {abs(bohr_magneton_avg - 9.274e-24)/9.274e-24*100:.1f}%\n"
         text += f"Specific charge: {abs(specific_charge_avg - 1.758e11)/1.758e11*100:.1f}%"
         
+        if fits is not None:
+            text += "\n\nFit statistics:\n"
+            text += self._format_fit('Inner', fits[0])
+            text += self._format_fit('Outer', fits[1])
+        
+        if uncertainties is not None:
+            text += self._format_uncertainties(uncertainties)
+        
         self.results_label.setText(text)
         self._current_text = text  
         
@@ -1,11 +1,13 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
-    QScrollArea, QGroupBox, QDoubleSpinBox, QTableWidget
+    QScrollArea, QGroupBox, QDoubleSpinBox, QTableView, QComboBox, QCheckBox, QHeaderView
 )
 from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFontDatabase, QAction, QKeySequence
 from src.gui.plot_window import PlotWindow
 from src.gui.table_window import TableWindow
 from src.gui.results_window import ResultsWindow
+from src.gui.image_canvas import ImageCanvas
 
 class UIManager:
     def __init__(self, main_window_ref):
@@ -15,9 +17,30 @@ class UIManager:
         image_group = QGroupBox('Image Controls')
         image_layout = QVBoxLayout()
 
-        load_btn = QPushButton('Load Image')
+        load_layout = QHBoxLayout()
+        load_btn = QPushButton('Load Images')
         load_btn.clicked.connect(self.mw.load_image)
-        image_layout.addWidget(load_btn)
+        import_folder_btn = QPushButton('Import Folder')
+        import_folder_btn.clicked.connect(self.mw.import_folder)
+        analyze_video_btn = QPushButton('Analyze Video')
+        analyze_video_btn.clicked.connect(self.mw.analyze_video)
+        load_layout.addWidget(load_btn)
+        load_layout.addWidget(import_folder_btn)
+        load_layout.addWidget(analyze_video_btn)
+        image_layout.addLayout(load_layout)
+
+        project_layout = QHBoxLayout()
+        open_project_btn = QPushButton('Open Project')
+        open_project_btn.clicked.connect(self.mw.open_project)
+        save_project_btn = QPushButton('Save Project')
+        save_project_btn.clicked.connect(self.mw.save_project)
+        project_layout.addWidget(open_project_btn)
+        project_layout.addWidget(save_project_btn)
+        image_layout.addLayout(project_layout)
+        self.mw.embed_enhanced_checkbox = QCheckBox('Store enhanced images in project')
+        self.mw.embed_enhanced_checkbox.setToolTip('Enhanced images already computed this session are saved '
+                                                   'with the project, so detection can skip that step after reopening')
+        image_layout.addWidget(self.mw.embed_enhanced_checkbox)
 
         zoom_layout = QHBoxLayout()
         zoom_in_btn = QPushButton('Zoom In')
@@ -83,6 +106,41 @@ class UIManager:
         auto_radius_layout.addWidget(auto_middle_btn)
         auto_radius_layout.addWidget(auto_outer_btn)
         measurement_layout.addLayout(auto_radius_layout)
+
+        center_search_layout = QHBoxLayout()
+        center_search_layout.addWidget(QLabel("Center search:"))
+        self.mw.center_search_combo = QComboBox()
+        self.mw.center_search_combo.addItem("Exhaustive grid", 'grid')
+        self.mw.center_search_combo.addItem("Coarse-to-fine", 'coarse_to_fine')
+        center_search_layout.addWidget(self.mw.center_search_combo)
+        measurement_layout.addLayout(center_search_layout)
+
+        auto_all_btn = QPushButton("Auto Detect All Rings")
+        auto_all_btn.clicked.connect(lambda: self.mw.set_measurement_mode('auto_all'))
+        measurement_layout.addWidget(auto_all_btn)
+
+        profile_layout = QHBoxLayout()
+        self.mw.profile_checkbox = QCheckBox("Profile detection stages")
+        self.mw.profile_checkbox.toggled.connect(self.mw.set_profiling_enabled)
+        profile_layout.addWidget(self.mw.profile_checkbox)
+        self.mw.export_trace_btn = QPushButton("Export Trace")
+        self.mw.export_trace_btn.setEnabled(False)
+        self.mw.export_trace_btn.clicked.connect(self.mw.export_profile_trace)
+        profile_layout.addWidget(self.mw.export_trace_btn)
+        measurement_layout.addLayout(profile_layout)
+
+        self.mw.profile_summary_label = QLabel()
+        self.mw.profile_summary_label.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.mw.profile_summary_label.setVisible(False)
+        measurement_layout.addWidget(self.mw.profile_summary_label)
+
+        cache_layout = QHBoxLayout()
+        self.mw.detection_cache_label = QLabel()
+        cache_layout.addWidget(self.mw.detection_cache_label)
+        self.mw.clear_cache_btn = QPushButton("Clear Cache")
+        self.mw.clear_cache_btn.clicked.connect(self.mw.clear_detection_cache)
+        cache_layout.addWidget(self.mw.clear_cache_btn)
+        measurement_layout.addLayout(cache_layout)
         
         reset_btn = QPushButton("Reset Measurements")
         reset_btn.clicked.connect(self.mw.reset_measurements)
@@ -94,14 +152,49 @@ class UIManager:
         measurements_group = QGroupBox("Measurements")
         measurements_layout = QVBoxLayout(measurements_group)
         
-        self.mw.measurements_table = QTableWidget()
-        self.mw.measurements_table.setColumnCount(3)
-        self.mw.measurements_table.setHorizontalHeaderLabels(['Current (A)', 'B Field (T)', 'Actions'])
-        self.mw.measurements_table.horizontalHeader().setStretchLastSection(True)
+        self.mw.measurements_table = QTableView()
+        self.mw.measurements_table.setModel(self.mw.measurement_model)
+        for column in range(2, self.mw.measurement_model.columnCount()):
+            self.mw.measurements_table.setColumnHidden(column, True)
+        self.mw.measurements_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.mw.measurements_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        
+        delete_action = QAction('Delete Measurement', self.mw.measurements_table)
+        delete_action.setShortcut(QKeySequence.StandardKey.Delete)
+        delete_action.setShortcutContext(Qt.ShortcutContext.WidgetShortcut)
+        delete_action.triggered.connect(self.mw.delete_selected_measurements)
+        self.mw.measurements_table.addAction(delete_action)
+        self.mw.measurements_table.setContextMenuPolicy(Qt.ContextMenuPolicy.ActionsContextMenu)
         measurements_layout.addWidget(self.mw.measurements_table)
         
         return measurements_group
 
+    def _create_uncertainty_group(self) -> QGroupBox:
+        uncertainty_group = QGroupBox('Uncertainties (Monte Carlo)')
+        uncertainty_layout = QVBoxLayout(uncertainty_group)
+        
+        def add_spin_box(label, maximum, decimals, step, value):
+            row_layout = QHBoxLayout()
+            row_layout.addWidget(QLabel(label))
+            spin_box = QDoubleSpinBox()
+            spin_box.setRange(0, maximum)
+            spin_box.setDecimals(decimals)
+            spin_box.setSingleStep(step)
+            spin_box.setValue(value)
+            row_layout.addWidget(spin_box)
+            uncertainty_layout.addLayout(row_layout)
+            return spin_box
+        
+        self.mw.radius_sigma_input = add_spin_box('Radius σ (px):', 50, 2, 0.1, 1.0)
+        self.mw.scale_sigma_input = add_spin_box('Scale σ (%):', 50, 2, 0.1, 1.0)
+        self.mw.current_sigma_input = add_spin_box('Current σ (A):', 10, 3, 0.001, 0.01)
+        
+        self.mw.fixed_seed_checkbox = QCheckBox('Reproducible (fixed seed)')
+        self.mw.fixed_seed_checkbox.setChecked(True)
+        uncertainty_layout.addWidget(self.mw.fixed_seed_checkbox)
+        
+        return uncertainty_group
+
     def _create_results_group(self) -> QGroupBox:
         results_group = QGroupBox("Results")
         results_layout = QVBoxLayout(results_group)
@@ -140,6 +233,19 @@ class UIManager:
         
         results_layout.addLayout(params_layout)
         
+        results_layout.addWidget(self._create_uncertainty_group())
+        
+        fit_method_layout = QHBoxLayout()
+        fit_method_layout.addWidget(QLabel('Fit method:'))
+        self.mw.fit_method_combo = QComboBox()
+        self.mw.fit_method_combo.addItem('Least squares', 'ols')
+        self.mw.fit_method_combo.addItem('Weighted least squares', 'wls')
+        self.mw.fit_method_combo.addItem('Orthogonal distance (errors in B)', 'odr')
+        self.mw.fit_method_combo.addItem('Robust (Huber)', 'huber')
+        self.mw.fit_method_combo.addItem('Robust (RANSAC)', 'ransac')
+        fit_method_layout.addWidget(self.mw.fit_method_combo)
+        results_layout.addLayout(fit_method_layout)
+        
         self.mw.save_measurement_btn = QPushButton('Save Measurement')
         self.mw.save_measurement_btn.clicked.connect(self.mw.save_measurement)
         results_layout.addWidget(self.mw.save_measurement_btn)
@@ -162,8 +268,8 @@ class UIManager:
         buttons_layout.addWidget(self.mw.show_results_btn)
         results_layout.addLayout(buttons_layout)
         
-        self.mw.export_btn = QPushButton('Export to CSV')
-        self.mw.export_btn.clicked.connect(self.mw.export_to_csv)
+        self.mw.export_btn = QPushButton('Export Data')
+        self.mw.export_btn.clicked.connect(self.mw.export_data)
         results_layout.addWidget(self.mw.export_btn)
         
         return results_group
@@ -191,11 +297,9 @@ class UIManager:
         image_scroll.setWidgetResizable(True)
         image_container = QWidget()
         image_container_layout = QVBoxLayout(image_container)
-        self.mw.image_display = QLabel()
-        self.mw.image_display.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.mw.image_display = ImageCanvas()
         self.mw.image_display.mousePressEvent = self.mw.image_clicked
         image_container_layout.addWidget(self.mw.image_display)
-        image_container_layout.addStretch()
         image_scroll.setWidget(image_container)
         content_layout.addWidget(image_scroll, 80) 
         
@@ -0,0 +1,90 @@
+import logging
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from typing import Optional
+from src.batch.video import VideoAnalysis
+
+logger = logging.getLogger(__name__)
+
+class _VideoSignals(QObject):
+    result = pyqtSignal(int, object)          # run id, BatchResult
+    failed = pyqtSignal(int, str)
+    finished = pyqtSignal(int)
+
+class _VideoTask(QRunnable):
+    def __init__(self, run_id: int, analysis: VideoAnalysis, signals: _VideoSignals):
+        super().__init__()
+        self.run_id = run_id
+        self.analysis = analysis
+        self.signals = signals
+
+    def run(self):
+        try:
+            # Each result is handed to the GUI thread as soon as its frame is done.
+            for result in self.analysis:
+                self.signals.result.emit(self.run_id, result)
+        except Exception as e:
+            self.signals.failed.emit(self.run_id, str(e))
+        finally:
+            self.signals.finished.emit(self.run_id)
+
+class VideoRunner(QObject):
+    result = pyqtSignal(object)                  # BatchResult, one per analyzed frame
+    failed = pyqtSignal(str)
+    finished = pyqtSignal(object, bool)          # throughput report, cancelled
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self._signals = _VideoSignals()
+        self._signals.result.connect(self._on_result)
+        self._signals.failed.connect(self._on_failed)
+        self._signals.finished.connect(self._on_finished)
+        self._run_id = 0
+        self.analysis: Optional[VideoAnalysis] = None
+
+    def is_running(self) -> bool:
+        return self.analysis is not None
+
+    def start(self, analysis: VideoAnalysis):
+        self.cancel()
+        self._run_id += 1
+        self.analysis = analysis
+        self.pool.start(_VideoTask(self._run_id, analysis, self._signals))
+
+    def cancel(self):
+        # The analysis stops after the frame in progress.
+        if self.analysis is not None:
+            self.analysis.cancelled.set()
+
+    def wait(self, msecs: int = -1) -> bool:
+        return self.pool.waitForDone(msecs)
+
+    def abandon(self):
+        # Stops the analysis and drops everything it has not delivered yet, including the
+        # finished signal, e.g. before the measurements it was adding to are replaced.
+        if self.analysis is None:
+            return
+        self.cancel()
+        self.wait()
+        self._run_id += 1
+        self.analysis = None
+
+    def _on_result(self, run_id: int, result):
+        # A frame finished after Stop was pressed is still a valid measurement and is kept.
+        if run_id == self._run_id:
+            self.result.emit(result)
+
+    def _on_failed(self, run_id: int, message: str):
+        if run_id == self._run_id:
+            self.failed.emit(message)
+
+    def _on_finished(self, run_id: int):
+        if run_id != self._run_id:
+            return
+        analysis, self.analysis = self.analysis, None
+        report = analysis.report()
+        logger.info("Video analysis: %d frame(s) in %.2f s, %.2f frames/s (%.2fx real time)",
+                    report['frames_analyzed'], report['wall_time_s'], report['frames_per_s'],
+                    report['realtime_factor'])
+        self.finished.emit(report, analysis.cancelled.is_set())
@@ -0,0 +1,421 @@
+"""
+Streaming least-squares fits of the Zeeman energy shift against the magnetic field.
+"""
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from src.physics.zeeman import PLANCK, MeasurementSet, ZeemanMeasurement
+
+FIT_METHODS = ('ols', 'wls', 'odr', 'huber', 'ransac')
+
+@dataclass
+class LinearFit:
+    slope: float
+    intercept: float
+    r_squared: float
+    slope_stderr: float
+    intercept_stderr: float
+    n: int
+    method: str = 'ols'
+    outliers: Optional[np.ndarray] = None   # boolean mask over the fitted points
+
+class RunningLinearRegression:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # Welford-style running means and centered (co)moments: sxx = sum((x - mean_x)^2), etc.
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+
+    def add(self, x: float, y: float):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.sxx += dx * (x - self.mean_x)
+        self.syy += dy * (y - self.mean_y)
+        self.sxy += dx * (y - self.mean_y)
+
+    def remove(self, x: float, y: float):
+        if self.n <= 1:
+            self.reset()
+            return
+        # Exact inverse of add(): recover the previous means, then take back the same products.
+        n = self.n - 1
+        mean_x = (self.n * self.mean_x - x) / n
+        mean_y = (self.n * self.mean_y - y) / n
+        self.sxx = max(0.0, self.sxx - (x - mean_x) * (x - self.mean_x))
+        self.syy = max(0.0, self.syy - (y - mean_y) * (y - self.mean_y))
+        self.sxy -= (x - mean_x) * (y - self.mean_y)
+        self.n, self.mean_x, self.mean_y = n, mean_x, mean_y
+
+    def add_many(self, x: np.ndarray, y: np.ndarray):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        m = len(x)
+        if m == 0:
+            return
+        # Chan et al. pairwise merge of the batch statistics into the running ones.
+        batch_mean_x, batch_mean_y = x.mean(), y.mean()
+        batch_sxx = float(np.sum((x - batch_mean_x) ** 2))
+        batch_syy = float(np.sum((y - batch_mean_y) ** 2))
+        batch_sxy = float(np.sum((x - batch_mean_x) * (y - batch_mean_y)))
+        n = self.n + m
+        dx = batch_mean_x - self.mean_x
+        dy = batch_mean_y - self.mean_y
+        weight = self.n * m / n
+        self.sxx += batch_sxx + dx * dx * weight
+        self.syy += batch_syy + dy * dy * weight
+        self.sxy += batch_sxy + dx * dy * weight
+        self.mean_x += dx * m / n
+        self.mean_y += dy * m / n
+        self.n = n
+
+    def fit(self) -> Optional[LinearFit]:
+        if self.n < 2 or self.sxx <= 0:
+            return None
+        slope = self.sxy / self.sxx
+        intercept = self.mean_y - slope * self.mean_x
+        r_squared = self.sxy ** 2 / (self.sxx * self.syy) if self.syy > 0 else 1.0
+        if self.n > 2:
+            residual_variance = max(0.0, self.syy - slope * self.sxy) / (self.n - 2)
+            slope_stderr = np.sqrt(residual_variance / self.sxx)
+            intercept_stderr = np.sqrt(residual_variance * (1.0 / self.n + self.mean_x ** 2 / self.sxx))
+        else:
+            slope_stderr = intercept_stderr = float('nan')
+        return LinearFit(slope=slope, intercept=intercept, r_squared=r_squared, slope_stderr=float(slope_stderr),
+                         intercept_stderr=float(intercept_stderr), n=self.n)
+
+class ZeemanRegression:
+    def __init__(self):
+        self.inner = RunningLinearRegression()
+        self.outer = RunningLinearRegression()
+
+    @staticmethod
+    def _is_valid(measurement: ZeemanMeasurement) -> bool:
+        return (measurement.delta_E_i is not None and measurement.delta_E_o is not None
+                and np.isfinite(measurement.delta_E_i) and np.isfinite(measurement.delta_E_o))
+
+    def reset(self):
+        self.inner.reset()
+        self.outer.reset()
+
+    def add(self, measurement: ZeemanMeasurement):
+        if self._is_valid(measurement):
+            self.inner.add(measurement.B_field, abs(measurement.delta_E_i))
+            self.outer.add(measurement.B_field, abs(measurement.delta_E_o))
+
+    def remove(self, measurement: ZeemanMeasurement):
+        if self._is_valid(measurement):
+            self.inner.remove(measurement.B_field, abs(measurement.delta_E_i))
+            self.outer.remove(measurement.B_field, abs(measurement.delta_E_o))
+
+    def add_set(self, measurements: MeasurementSet):
+        valid = measurements.valid()
+        B_values = measurements.column('B_field')[valid]
+        self.inner.add_many(B_values, np.abs(measurements.column('delta_E_i')[valid]))
+        self.outer.add_many(B_values, np.abs(measurements.column('delta_E_o')[valid]))
+
+    def fits(self) -> Tuple[Optional[LinearFit], Optional[LinearFit]]:
+        return self.inner.fit(), self.outer.fit()
+
+    def bohr_magneton(self) -> tuple:
+        # Same tuple as calculate_bohr_magneton, without refitting.
+        return bohr_magneton_from_fits(*self.fits())
+
+def bohr_magneton_from_fits(inner_fit: Optional[LinearFit], outer_fit: Optional[LinearFit]) -> tuple:
+    bohr_magneton_inner = inner_fit.slope if inner_fit else 0.0
+    bohr_magneton_outer = outer_fit.slope if outer_fit else 0.0
+    bohr_magneton_avg = (abs(bohr_magneton_inner) + abs(bohr_magneton_outer)) / 2
+
+    h_bar = PLANCK / (2 * np.pi)
+    return (bohr_magneton_inner, bohr_magneton_outer, bohr_magneton_avg,
+            2 * abs(bohr_magneton_inner) / h_bar, 2 * abs(bohr_magneton_outer) / h_bar,
+            2 * bohr_magneton_avg / h_bar)
+
+# Batch fitters: x, y (and sigmas) are (..., n) arrays and every leading index is an independent
+# fit, so a bootstrap runs as one array computation instead of a Python loop.
+
+def _weighted_line(x: np.ndarray, y: np.ndarray, w: np.ndarray) -> dict:
+    sw = w.sum(axis=-1)
+    mean_x = (w * x).sum(axis=-1) / sw
+    mean_y = (w * y).sum(axis=-1) / sw
+    dx = x - mean_x[..., None]
+    dy = y - mean_y[..., None]
+    sxx = (w * dx * dx).sum(axis=-1)
+    sxy = (w * dx * dy).sum(axis=-1)
+    syy = (w * dy * dy).sum(axis=-1)
+    slope = sxy / sxx
+    return {'slope': slope, 'intercept': mean_y - slope * mean_x, 'sw': sw, 'mean_x': mean_x,
+            'sxx': sxx, 'sxy': sxy, 'syy': syy}
+
+def _robust_scale(residuals: np.ndarray) -> np.ndarray:
+    # Normal-consistent median absolute deviation.
+    median = np.median(residuals, axis=-1, keepdims=True)
+    return 1.4826 * np.median(np.abs(residuals - median), axis=-1)
+
+def _residuals(line: dict, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    return y - (line['slope'][..., None] * x + line['intercept'][..., None])
+
+def _huber_batch(x: np.ndarray, y: np.ndarray, base_weights: np.ndarray, k: float = 1.345,
+                 max_iter: int = 50, tol: float = 1e-8) -> Tuple[dict, np.ndarray, np.ndarray]:
+    # Iteratively reweighted least squares with Huber weights on MAD-scaled residuals.
+    weights = np.ones_like(y)
+    for _ in range(max_iter):
+        line = _weighted_line(x, y, base_weights * weights)
+        residuals = _residuals(line, x, y)
+        scale = _robust_scale(residuals)
+        scale = np.where(scale > 0, scale, np.finfo(float).tiny)[..., None]
+        u = np.abs(residuals) / (k * scale)
+        new_weights = np.where(u <= 1, 1.0, 1.0 / np.maximum(u, 1.0))
+        converged = np.max(np.abs(new_weights - weights)) < tol
+        weights = new_weights
+        if converged:
+            break
+    line = _weighted_line(x, y, base_weights * weights)
+    return line, weights, _robust_scale(_residuals(line, x, y))
+
+def _york_batch(x: np.ndarray, y: np.ndarray, sigma_x: np.ndarray, sigma_y: np.ndarray,
+                max_iter: int = 100, tol: float = 1e-12) -> dict:
+    # York et al. (2004) straight-line fit with errors in both coordinates; for a line this is the
+    # maximum-likelihood orthogonal distance regression. Starts from the weighted y-only fit.
+    var_x = sigma_x ** 2
+    var_y = sigma_y ** 2
+    slope = _weighted_line(x, y, 1.0 / var_y)['slope']
+    for _ in range(max_iter):
+        W = 1.0 / (var_y + slope[..., None] ** 2 * var_x)
+        sw = W.sum(axis=-1)
+        X_bar = (W * x).sum(axis=-1) / sw
+        Y_bar = (W * y).sum(axis=-1) / sw
+        U = x - X_bar[..., None]
+        V = y - Y_bar[..., None]
+        beta = W * (U * var_y + slope[..., None] * V * var_x)
+        new_slope = (W * beta * V).sum(axis=-1) / (W * beta * U).sum(axis=-1)
+        converged = np.all(np.abs(new_slope - slope) <= tol * np.abs(new_slope))
+        slope = new_slope
+        if converged:
+            break
+    W = 1.0 / (var_y + slope[..., None] ** 2 * var_x)
+    sw = W.sum(axis=-1)
+    X_bar = (W * x).sum(axis=-1) / sw
+    Y_bar = (W * y).sum(axis=-1) / sw
+    U = x - X_bar[..., None]
+    V = y - Y_bar[..., None]
+    beta = W * (U * var_y + slope[..., None] * V * var_x)
+    adjusted_x = X_bar[..., None] + beta
+    adjusted_mean = (W * adjusted_x).sum(axis=-1) / sw
+    u = adjusted_x - adjusted_mean[..., None]
+    slope_var = 1.0 / (W * u * u).sum(axis=-1)
+    return {'slope': slope, 'intercept': Y_bar - slope * X_bar, 'W': W,
+            'slope_stderr': np.sqrt(slope_var),
+            'intercept_stderr': np.sqrt(1.0 / sw + adjusted_mean ** 2 * slope_var)}
+
+def _batch_slopes(method: str, x: np.ndarray, y: np.ndarray, sigma_x: Optional[np.ndarray],
+                  sigma_y: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    if method == 'ols':
+        line = _weighted_line(x, y, np.ones_like(y))
+    elif method == 'wls':
+        line = _weighted_line(x, y, 1.0 / sigma_y ** 2)
+    elif method == 'odr':
+        line = _york_batch(x, y, sigma_x, sigma_y)
+    elif method == 'huber':
+        weights = np.ones_like(y) if sigma_y is None else 1.0 / sigma_y ** 2
+        line = _huber_batch(x, y, weights)[0]
+    else:
+        raise ValueError(f"Method {method!r} has no batch form.")
+    return line['slope'], line['intercept']
+
+def _check_inputs(method: str, x, y, sigma_x, sigma_y):
+    if method not in FIT_METHODS:
+        raise ValueError(f"Unknown fit method {method!r}; expected one of {', '.join(FIT_METHODS)}.")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if x.shape != y.shape or x.ndim != 1:
+        raise ValueError("x and y must be 1-D arrays of the same length.")
+    if len(x) < 2 or np.ptp(x) == 0:
+        raise ValueError("Need at least two points at different x values.")
+    if sigma_x is not None:
+        sigma_x = np.broadcast_to(np.asarray(sigma_x, dtype=np.float64), x.shape)
+    if sigma_y is not None:
+        sigma_y = np.broadcast_to(np.asarray(sigma_y, dtype=np.float64), y.shape)
+    # A NaN sigma fails every comparison below, so finiteness is checked separately.
+    if method == 'wls' and (sigma_y is None or not np.all(np.isfinite(sigma_y)) or np.any(sigma_y <= 0)):
+        raise ValueError("Weighted least squares needs finite, positive y uncertainties.")
+    if method == 'huber' and sigma_y is not None and (not np.all(np.isfinite(sigma_y)) or np.any(sigma_y <= 0)):
+        raise ValueError("Huber regression needs finite, positive y uncertainties when they are given.")
+    if method == 'odr':
+        if sigma_y is None:
+            raise ValueError("Orthogonal distance regression needs y uncertainties.")
+        if sigma_x is None:
+            sigma_x = np.zeros_like(x)
+        if (not np.all(np.isfinite(sigma_x)) or not np.all(np.isfinite(sigma_y))
+                or np.any(sigma_x < 0) or np.any(sigma_x ** 2 + sigma_y ** 2 <= 0)):
+            raise ValueError("Orthogonal distance regression needs finite, positive uncertainties.")
+    return x, y, sigma_x, sigma_y
+
+def _ransac_inliers(x: np.ndarray, y: np.ndarray, threshold: float, trials: int,
+                    rng: np.random.Generator, max_chunk_bytes: int) -> np.ndarray:
+    # Candidate lines through random point pairs, scored in (trials x n) blocks.
+    n = len(x)
+    first = rng.integers(0, n, trials)
+    second = rng.integers(0, n - 1, trials)
+    second += second >= first
+    dx = x[second] - x[first]
+    keep = dx != 0
+    slopes = (y[second] - y[first])[keep] / dx[keep]
+    intercepts = y[first][keep] - slopes * x[first][keep]
+    if len(slopes) == 0:
+        return np.ones(n, dtype=bool)
+    chunk = int(max(1, max_chunk_bytes // (8 * n)))
+    best_count, best_error, best = -1, np.inf, 0
+    for start in range(0, len(slopes), chunk):
+        residuals = np.abs(y - (slopes[start:start + chunk, None] * x + intercepts[start:start + chunk, None]))
+        inlier = residuals < threshold
+        counts = inlier.sum(axis=1)
+        errors = np.where(inlier, residuals, 0.0).sum(axis=1)
+        # Most inliers wins; ties go to the tighter line.
+        order = np.lexsort((errors, -counts))[0]
+        if counts[order] > best_count or (counts[order] == best_count and errors[order] < best_error):
+            best_count, best_error, best = counts[order], errors[order], start + order
+    return np.abs(y - (slopes[best] * x + intercepts[best])) < threshold
+
+def _studentized_outliers(residuals: np.ndarray, sigma: Optional[np.ndarray], threshold: float) -> np.ndarray:
+    # Residuals in units of each point's sigma, inflated by the reduced chi-square, so a poor fit
+    # flags only the points that stand out from the rest rather than every point. Without sigmas
+    # the scale is the residual standard deviation.
+    z = residuals if sigma is None else residuals / sigma
+    reduced_chi = np.sqrt(np.sum(z * z) / max(len(z) - 2, 1))
+    if sigma is not None:
+        reduced_chi = max(reduced_chi, 1.0)
+    return np.abs(z) > threshold * max(reduced_chi, np.finfo(float).tiny)
+
+def fit_line(x, y, method: str = 'ols', sigma_x=None, sigma_y=None, outlier_threshold: float = 3.0,
+             huber_k: float = 1.345, residual_threshold: Optional[float] = None, ransac_trials: int = 500,
+             seed: Optional[int] = None, max_chunk_bytes: int = 64 * 1024 * 1024) -> LinearFit:
+    """
+    Fit y = slope * x + intercept and flag outliers.
+
+    'ols' and 'huber' need no uncertainties, 'wls' needs sigma_y and 'odr' needs sigma_y (sigma_x
+    defaults to zero). Outliers are points whose residual exceeds outlier_threshold times the
+    residual scale (the point's sigma times the reduced chi-square for 'ols'/'wls'/'odr', the MAD
+    for 'huber');
+    for 'ransac' they are the points outside the consensus set.
+    """
+    x, y, sigma_x, sigma_y = _check_inputs(method, x, y, sigma_x, sigma_y)
+    n = len(x)
+
+    if method == 'ransac':
+        ols_scale = float(_robust_scale(_residuals(_weighted_line(x, y, np.ones_like(y)), x, y)))
+        threshold = residual_threshold if residual_threshold is not None else outlier_threshold * ols_scale
+        threshold = max(threshold, np.finfo(float).tiny)
+        inliers = _ransac_inliers(x, y, threshold, ransac_trials, np.random.default_rng(seed), max_chunk_bytes)
+        if inliers.sum() < 2 or np.ptp(x[inliers]) == 0:
+            inliers = np.ones(n, dtype=bool)
+        # Refit on the consensus set, then take the inliers of the refined line.
+        regression = RunningLinearRegression()
+        regression.add_many(x[inliers], y[inliers])
+        refined = regression.fit()
+        inliers = np.abs(y - (refined.slope * x + refined.intercept)) < threshold
+        if inliers.sum() >= 2 and np.ptp(x[inliers]) > 0:
+            regression.reset()
+            regression.add_many(x[inliers], y[inliers])
+            refined = regression.fit()
+        refined.n = n
+        refined.method = method
+        refined.outliers = ~inliers
+        return refined
+
+    if method == 'odr':
+        line = _york_batch(x, y, sigma_x, sigma_y)
+        residuals = _residuals(line, x, y)
+        outliers = _studentized_outliers(residuals, 1.0 / np.sqrt(line['W']), outlier_threshold)
+        weighted = _weighted_line(x, y, line['W'])
+        r_squared = weighted['sxy'] ** 2 / (weighted['sxx'] * weighted['syy']) if weighted['syy'] > 0 else 1.0
+        return LinearFit(slope=float(line['slope']), intercept=float(line['intercept']), r_squared=float(r_squared),
+                         slope_stderr=float(line['slope_stderr']), intercept_stderr=float(line['intercept_stderr']),
+                         n=n, method=method, outliers=outliers)
+
+    if method == 'huber':
+        base_weights = np.ones_like(y) if sigma_y is None else 1.0 / sigma_y ** 2
+        line, weights, scale = _huber_batch(x, y, base_weights, k=huber_k)
+        residuals = _residuals(line, x, y)
+        outliers = np.abs(residuals) > outlier_threshold * max(float(scale), np.finfo(float).tiny)
+        weights = base_weights * weights
+    else:
+        weights = np.ones_like(y) if method == 'ols' else 1.0 / sigma_y ** 2
+        line = _weighted_line(x, y, weights)
+        residuals = _residuals(line, x, y)
+        outliers = _studentized_outliers(residuals, sigma_y if method == 'wls' else None, outlier_threshold)
+
+    r_squared = line['sxy'] ** 2 / (line['sxx'] * line['syy']) if line['syy'] > 0 else 1.0
+    if method == 'wls':
+        # Absolute weights: the sigmas are measurement uncertainties, not relative weights.
+        slope_var = 1.0 / line['sxx']
+        intercept_var = 1.0 / line['sw'] + line['mean_x'] ** 2 * slope_var
+    elif n > 2:
+        # Relative weights: normalize them to mean one and estimate the residual variance from the fit.
+        weight_scale = line['sw'] / n
+        sxx = line['sxx'] / weight_scale
+        residual_variance = (weights * residuals ** 2).sum() / weight_scale / (n - 2)
+        slope_var = residual_variance / sxx
+        intercept_var = residual_variance * (1.0 / n + line['mean_x'] ** 2 / sxx)
+    else:
+        slope_var = intercept_var = float('nan')
+    return LinearFit(slope=float(line['slope']), intercept=float(line['intercept']), r_squared=float(r_squared),
+                     slope_stderr=float(np.sqrt(slope_var)), intercept_stderr=float(np.sqrt(intercept_var)),
+                     n=n, method=method, outliers=outliers)
+
+def bootstrap_slopes(x, y, method: str = 'ols', resamples: int = 1000, sigma_x=None, sigma_y=None,
+                     seed: Optional[int] = None, max_chunk_bytes: int = 64 * 1024 * 1024, **options) -> np.ndarray:
+    # Case-resampling bootstrap; resamples are fitted as (chunk x n) batches. RANSAC resamples
+    # each run their own (vectorized) consensus search.
+    x, y, sigma_x, sigma_y = _check_inputs(method, x, y, sigma_x, sigma_y)
+    n = len(x)
+    rng = np.random.default_rng(seed)
+    slopes = np.empty(resamples)
+    chunk = int(max(1, min(resamples, max_chunk_bytes // (12 * 8 * n))))
+    for start in range(0, resamples, chunk):
+        size = min(chunk, resamples - start)
+        index = rng.integers(0, n, (size, n))
+        if method == 'ransac':
+            for row, sample in enumerate(index):
+                try:
+                    slopes[start + row] = fit_line(x[sample], y[sample], method, seed=rng.integers(2 ** 32),
+                                                   max_chunk_bytes=max_chunk_bytes, **options).slope
+                except ValueError:
+                    slopes[start + row] = np.nan
+            continue
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # A resample that drew a single x value has no slope and comes back NaN.
+            slopes[start:start + size] = _batch_slopes(
+                method, x[index], y[index],
+                None if sigma_x is None else sigma_x[index],
+                None if sigma_y is None else sigma_y[index])[0]
+    return slopes
+
+def fit_zeeman(measurements: MeasurementSet, method: str = 'ols', sigma_B=None, sigma_E_i=None, sigma_E_o=None,
+               **options) -> Tuple[Optional[LinearFit], Optional[LinearFit], np.ndarray]:
+    # Inner and outer |ΔE| vs B fits; the sigmas are per-row arrays. The returned mask marks rows
+    # flagged as outliers in either fit.
+    valid = measurements.valid()
+    outlier_rows = np.zeros(len(measurements), dtype=bool)
+    B_values = measurements.column('B_field')[valid]
+    if len(B_values) < 2 or np.ptp(B_values) == 0:
+        return None, None, outlier_rows
+
+    def select(values):
+        return None if values is None else np.broadcast_to(np.asarray(values, dtype=np.float64), valid.shape)[valid]
+
+    fits = []
+    for column, sigma_E in (('delta_E_i', sigma_E_i), ('delta_E_o', sigma_E_o)):
+        fit = fit_line(B_values, np.abs(measurements.column(column)[valid]), method,
+                       sigma_x=select(sigma_B), sigma_y=select(sigma_E), **options)
+        outlier_rows[np.flatnonzero(valid)[fit.outliers]] = True
+        fits.append(fit)
+    return fits[0], fits[1], outlier_rows
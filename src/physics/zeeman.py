@@ -2,8 +2,8 @@
 Physics calculations for Zeeman effect analysis.
 """
 import numpy as np
-from dataclasses import dataclass
-from typing import List, Optional
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
 # Constants
 PLANCK = 6.62607015e-34  
@@ -20,6 +20,9 @@ class ZeemanMeasurement:
     R_inner: Optional[float] = None   
     R_outer: Optional[float] = None   
     
+    current: Optional[float] = None       
+    mm_per_pixel: Optional[float] = None  
+    
     alpha_c: Optional[float] = None  
     alpha_i: Optional[float] = None  
     alpha_o: Optional[float] = None  
@@ -69,14 +72,130 @@ def process_measurement(measurement: ZeemanMeasurement) -> ZeemanMeasurement:
     
     return measurement
 
-def calculate_bohr_magneton(measurements: List[ZeemanMeasurement]) -> tuple[float, float, float, float, float, float]:
-    valid_measurements = [m for m in measurements if m.delta_E_i is not None and m.delta_E_o is not None]
-    if not valid_measurements:
+class MeasurementSet:
+    COLUMNS = tuple(f.name for f in fields(ZeemanMeasurement))
+
+    def __init__(self, capacity: int = 16):
+        # One row per field, one column per measurement; missing values are NaN.
+        self._data = np.full((len(self.COLUMNS), max(1, capacity)), np.nan)
+        self._size = 0
+
+    @classmethod
+    def from_measurements(cls, measurements: Iterable[ZeemanMeasurement]) -> 'MeasurementSet':
+        rows = [[getattr(m, name) for name in cls.COLUMNS] for m in measurements]
+        measurement_set = cls(capacity=len(rows))
+        if rows:
+            measurement_set._data[:, :len(rows)] = np.array(rows, dtype=np.float64).T
+            measurement_set._size = len(rows)
+        return measurement_set
+
+    @classmethod
+    def from_arrays(cls, B_field, wavelength, R_center=None, R_inner=None, R_outer=None) -> 'MeasurementSet':
+        B_field = np.asarray(B_field, dtype=np.float64)
+        measurement_set = cls(capacity=len(B_field))
+        measurement_set._size = len(B_field)
+        for name, values in (('B_field', B_field), ('wavelength', wavelength), ('R_center', R_center),
+                             ('R_inner', R_inner), ('R_outer', R_outer)):
+            if values is not None:
+                measurement_set._data[cls.COLUMNS.index(name), :len(B_field)] = values
+        return measurement_set
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> 'MeasurementSet':
+        # Columns not given, or not known to this version, are left as NaN.
+        size = len(next(iter(columns.values()))) if columns else 0
+        measurement_set = cls(capacity=size)
+        measurement_set._size = size
+        for name, values in columns.items():
+            if name in cls.COLUMNS:
+                measurement_set._data[cls.COLUMNS.index(name), :size] = values
+        return measurement_set
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[ZeemanMeasurement]:
+        return iter(self.to_measurements())
+
+    def __getitem__(self, index: int) -> ZeemanMeasurement:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Measurement index out of range.")
+        return self._row_to_measurement(self._data[:, index].tolist())
+
+    def column(self, name: str) -> np.ndarray:
+        view = self._data[self.COLUMNS.index(name), :self._size]
+        view.flags.writeable = False
+        return view
+
+    def append(self, measurement: ZeemanMeasurement):
+        if self._size == self._data.shape[1]:
+            grown = np.full((len(self.COLUMNS), 2 * self._data.shape[1]), np.nan)
+            grown[:, :self._size] = self._data[:, :self._size]
+            self._data = grown
+        self._data[:, self._size] = [np.nan if (value := getattr(measurement, name)) is None else value
+                                     for name in self.COLUMNS]
+        self._size += 1
+
+    def extend(self, measurements: Iterable[ZeemanMeasurement]):
+        for measurement in measurements:
+            self.append(measurement)
+
+    def pop(self, index: int = -1) -> ZeemanMeasurement:
+        measurement = self[index]
+        if index < 0:
+            index += self._size
+        self._data[:, index:self._size - 1] = self._data[:, index + 1:self._size]
+        self._data[:, self._size - 1] = np.nan
+        self._size -= 1
+        return measurement
+
+    def clear(self):
+        self._data[:, :self._size] = np.nan
+        self._size = 0
+
+    def to_measurements(self) -> List[ZeemanMeasurement]:
+        return [self._row_to_measurement(row) for row in self._data[:, :self._size].T.tolist()]
+
+    def _row_to_measurement(self, row: List[float]) -> ZeemanMeasurement:
+        return ZeemanMeasurement(**{name: None if value != value else value for name, value in zip(self.COLUMNS, row)})
+
+    def valid(self) -> np.ndarray:
+        return np.isfinite(self.column('delta_E_i')) & np.isfinite(self.column('delta_E_o'))
+
+    def process(self) -> 'MeasurementSet':
+        # Same formulas as process_measurement, applied to every complete row in one pass.
+        n = self._size
+        col = {name: self._data[i, :n] for i, name in enumerate(self.COLUMNS)}
+        complete = np.isfinite(col['R_center']) & np.isfinite(col['R_inner']) & np.isfinite(col['R_outer'])
+        if not complete.any():
+            return self
+        wavelength = col['wavelength'][complete]
+
+        derived = {}
+        for suffix, radius in (('c', 'R_center'), ('i', 'R_inner'), ('o', 'R_outer')):
+            derived[f'alpha_{suffix}'] = calculate_incident_angle(col[radius][complete])
+            derived[f'beta_{suffix}'] = calculate_refracted_angle(derived[f'alpha_{suffix}'])
+        for suffix in ('i', 'o'):
+            derived[f'delta_lambda_{suffix}'] = calculate_wavelength_shift(derived[f'beta_{suffix}'], derived['beta_c'], wavelength)
+            derived[f'delta_E_{suffix}'] = calculate_energy_shift(derived[f'delta_lambda_{suffix}'], wavelength)
+        derived['delta_E_avg'] = (np.abs(derived['delta_E_i']) + np.abs(derived['delta_E_o'])) / 2
+
+        for name, values in derived.items():
+            col[name][complete] = values
+        return self
+
+def calculate_bohr_magneton(measurements: Union[MeasurementSet, List[ZeemanMeasurement]]) -> tuple[float, float, float, float, float, float]:
+    if not isinstance(measurements, MeasurementSet):
+        measurements = MeasurementSet.from_measurements(measurements)
+    valid = measurements.valid()
+    if not valid.any():
         return 0.0, 0.0, 0.0, 0.0, 0.0, 0.0
         
-    B_values = np.array([m.B_field for m in valid_measurements])
-    E_i_values = np.array([abs(m.delta_E_i) for m in valid_measurements])
-    E_o_values = np.array([abs(m.delta_E_o) for m in valid_measurements])
+    B_values = measurements.column('B_field')[valid]
+    E_i_values = np.abs(measurements.column('delta_E_i')[valid])
+    E_o_values = np.abs(measurements.column('delta_E_o')[valid])
     
     B_mean = np.mean(B_values)
     B_std = np.std(B_values) if len(B_values) > 1 else 1.0
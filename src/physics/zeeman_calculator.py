@@ -1,4 +1,36 @@
 import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple, Union, List
+from src.physics.zeeman import (MeasurementSet, calculate_incident_angle, calculate_refracted_angle,
+                                calculate_wavelength_shift, calculate_energy_shift)
+
+@dataclass
+class UncertaintyModel:
+    radius_px_sigma: float = 1.0              # per ring radius, pixels
+    mm_per_pixel_rel_sigma: float = 0.0       # relative error of each image's scale calibration
+    current_sigma: float = 0.0                # A
+    magnetic_field_sigma: float = 0.0         # T, independent of the calibration
+    calibration_params: Optional[Tuple[float, float]] = None      # slope (G/A), intercept (G)
+    calibration_covariance: Optional[np.ndarray] = None           # 2x2, of (slope, intercept)
+    mm_per_pixel: Optional[float] = None      # used for measurements that do not carry their own scale
+
+@dataclass
+class ConfidenceInterval:
+    value: float
+    mean: float
+    std: float
+    lower: float
+    upper: float
+
+@dataclass
+class UncertaintyResult:
+    draws: int
+    confidence: float
+    seed: Union[int, List[int], None]
+    intervals: Dict[str, ConfidenceInterval] = field(default_factory=dict)
+
+QUANTITIES = ('bohr_magneton_inner', 'bohr_magneton_outer', 'bohr_magneton_avg',
+              'specific_charge_inner', 'specific_charge_outer', 'specific_charge_avg')
 
 class ZeemanCalculator:
     def __init__(self):
@@ -6,16 +38,151 @@ class ZeemanCalculator:
         self.PLANCKS_CONSTANT = 6.62607015e-34  # in J⋅s
         self.ELECTRON_CHARGE = 1.602176634e-19   # in C
         self.ELECTRON_MASS = 9.1093837015e-31    # in kg
-    
+
     def calculate_bohr_magneton(self, delta_lambda, wavelength, magnetic_field):
         c = 2.99792458e8  # speed of light in m/s
         bohr_magneton = (self.PLANCKS_CONSTANT * c * delta_lambda) / (2 * wavelength**2 * magnetic_field)
         return bohr_magneton
-    
+
     def calculate_specific_charge(self, bohr_magneton):
         h_bar = self.PLANCKS_CONSTANT / (2 * np.pi)
         specific_charge = 2 * bohr_magneton / h_bar
         return specific_charge
-    
-    def calculate_uncertainties(self, measurements, magnetic_field_uncertainty):
-        pass
+
+    def _shift_slopes(self, B_values: np.ndarray, radii: Dict[str, np.ndarray], wavelength: np.ndarray) -> np.ndarray:
+        # Radius -> angle -> Δλ -> ΔE -> least-squares slope, along the last axis (one row per draw).
+        beta_c = calculate_refracted_angle(calculate_incident_angle(radii['c']))
+        B_centered = B_values - B_values.mean(axis=-1, keepdims=True)
+        sxx = np.sum(B_centered * B_centered, axis=-1)
+        slopes = []
+        for suffix in ('i', 'o'):
+            beta = calculate_refracted_angle(calculate_incident_angle(radii[suffix]))
+            delta_E = np.abs(calculate_energy_shift(calculate_wavelength_shift(beta, beta_c, wavelength), wavelength))
+            slopes.append(np.sum(B_centered * delta_E, axis=-1) / sxx)
+        return np.stack(slopes)
+
+    def _quantities(self, slopes: np.ndarray) -> np.ndarray:
+        avg = (np.abs(slopes[0]) + np.abs(slopes[1])) / 2
+        return np.stack([slopes[0], slopes[1], avg,
+                         self.calculate_specific_charge(np.abs(slopes[0])),
+                         self.calculate_specific_charge(np.abs(slopes[1])),
+                         self.calculate_specific_charge(avg)])
+
+    def point_uncertainties(self, measurements, model: UncertaintyModel) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # First-order (sigma_B, sigma_E_inner, sigma_E_outer) per row, for weighting fits. The
+        # calibration covariance is left out: it shifts every point together and so is a
+        # systematic error, which calculate_uncertainties accounts for.
+        if not isinstance(measurements, MeasurementSet):
+            measurements = MeasurementSet.from_measurements(measurements)
+        wavelength = measurements.column('wavelength')
+        radii = {suffix: measurements.column(name)
+                 for suffix, name in (('c', 'R_center'), ('i', 'R_inner'), ('o', 'R_outer'))}
+        mm_per_pixel = measurements.column('mm_per_pixel').copy()
+        if model.mm_per_pixel is not None:
+            mm_per_pixel[~np.isfinite(mm_per_pixel)] = model.mm_per_pixel
+        radius_sigma = model.radius_px_sigma * mm_per_pixel
+
+        def shift(R_c, R_ring):
+            beta_c = calculate_refracted_angle(calculate_incident_angle(R_c))
+            beta = calculate_refracted_angle(calculate_incident_angle(R_ring))
+            return np.abs(calculate_energy_shift(calculate_wavelength_shift(beta, beta_c, wavelength), wavelength))
+
+        sigmas_E = []
+        for suffix in ('i', 'o'):
+            R_c, R_ring = radii['c'], radii[suffix]
+            step_c = 1e-6 * np.abs(R_c)
+            step_ring = 1e-6 * np.abs(R_ring)
+            d_center = (shift(R_c + step_c, R_ring) - shift(R_c - step_c, R_ring)) / (2 * step_c)
+            d_ring = (shift(R_c, R_ring + step_ring) - shift(R_c, R_ring - step_ring)) / (2 * step_ring)
+            # A scale error stretches both radii by the same factor.
+            d_scale = d_center * R_c + d_ring * R_ring
+            sigmas_E.append(np.sqrt((d_center * radius_sigma) ** 2 + (d_ring * radius_sigma) ** 2
+                                    + (d_scale * model.mm_per_pixel_rel_sigma) ** 2))
+
+        sigma_B = np.full(len(measurements), float(model.magnetic_field_sigma))
+        if model.calibration_params is not None:
+            sigma_B = np.hypot(sigma_B, model.calibration_params[0] * model.current_sigma * 1e-4)
+        return sigma_B, sigmas_E[0], sigmas_E[1]
+
+    def calculate_uncertainties(self, measurements, model: UncertaintyModel, draws: int = 10000,
+                                confidence: float = 0.95, seed: Optional[int] = None,
+                                max_chunk_bytes: int = 64 * 1024 * 1024) -> UncertaintyResult:
+        if not isinstance(measurements, MeasurementSet):
+            measurements = MeasurementSet.from_measurements(measurements)
+        if draws < 2:
+            raise ValueError("At least two Monte Carlo draws are needed.")
+        if not 0 < confidence < 1:
+            raise ValueError("Confidence level must be between 0 and 1.")
+
+        columns = {name: measurements.column(name) for name in
+                   ('B_field', 'wavelength', 'R_center', 'R_inner', 'R_outer', 'current', 'mm_per_pixel')}
+        valid = np.isfinite(columns['B_field']) & np.isfinite(columns['wavelength'])
+        for name in ('R_center', 'R_inner', 'R_outer'):
+            valid &= np.isfinite(columns[name])
+        B_values = columns['B_field'][valid]
+        if len(B_values) < 2 or np.ptp(B_values) == 0:
+            raise ValueError("Need at least two complete measurements at different magnetic fields.")
+
+        wavelength = columns['wavelength'][valid]
+        mm_per_pixel = columns['mm_per_pixel'][valid].copy()
+        if model.mm_per_pixel is not None:
+            mm_per_pixel[~np.isfinite(mm_per_pixel)] = model.mm_per_pixel
+        if not np.isfinite(mm_per_pixel).all():
+            raise ValueError("No mm/pixel scale available for some measurements.")
+        radii_px = {suffix: columns[name][valid] / mm_per_pixel
+                    for suffix, name in (('c', 'R_center'), ('i', 'R_inner'), ('o', 'R_outer'))}
+
+        calibration = None
+        if model.calibration_params is not None:
+            slope, intercept = model.calibration_params
+            if slope == 0:
+                raise ValueError("Calibration slope must be non-zero.")
+            calibration = np.array([slope, intercept], dtype=np.float64)
+            # Measurements saved before the current was recorded get it back from the calibration line.
+            current = columns['current'][valid].copy()
+            missing = ~np.isfinite(current)
+            current[missing] = (B_values[missing] * 1e4 - intercept) / slope
+
+        nominal = self._quantities(self._shift_slopes(
+            B_values, {suffix: radii_px[suffix] * mm_per_pixel for suffix in radii_px}, wavelength))
+
+        # Each chunk holds (chunk x n) arrays for the B field, three radii and a few intermediates;
+        # the chunk plan depends only on draws, n and the budget, so a seed reproduces the same draws.
+        n = len(B_values)
+        chunk_size = int(max(1, min(draws, max_chunk_bytes // (16 * 8 * n))))
+        n_chunks = -(-draws // chunk_size)
+        seed_sequence = np.random.SeedSequence(seed)
+        samples = np.empty((len(QUANTITIES), draws))
+
+        for chunk_index, chunk_seed in enumerate(seed_sequence.spawn(n_chunks)):
+            rng = np.random.default_rng(chunk_seed)
+            start = chunk_index * chunk_size
+            size = min(chunk_size, draws - start)
+
+            if calibration is not None:
+                if model.calibration_covariance is not None:
+                    params = rng.multivariate_normal(calibration, model.calibration_covariance, size=size)
+                else:
+                    params = np.broadcast_to(calibration, (size, 2))
+                current_draws = current + model.current_sigma * rng.standard_normal((size, n))
+                B_draws = (params[:, :1] * current_draws + params[:, 1:]) * 1e-4
+            else:
+                B_draws = np.broadcast_to(B_values, (size, n))
+            if model.magnetic_field_sigma:
+                B_draws = B_draws + model.magnetic_field_sigma * rng.standard_normal((size, n))
+
+            # One scale error per image, shared by its three radii.
+            scale = mm_per_pixel * (1 + model.mm_per_pixel_rel_sigma * rng.standard_normal((size, n)))
+            radii = {suffix: (radius + model.radius_px_sigma * rng.standard_normal((size, n))) * scale
+                     for suffix, radius in radii_px.items()}
+
+            samples[:, start:start + size] = self._quantities(self._shift_slopes(B_draws, radii, wavelength))
+
+        tail = (1 - confidence) / 2 * 100
+        lower, upper = np.nanpercentile(samples, [tail, 100 - tail], axis=1)
+        result = UncertaintyResult(draws=draws, confidence=confidence, seed=seed_sequence.entropy)
+        for i, name in enumerate(QUANTITIES):
+            result.intervals[name] = ConfidenceInterval(value=float(nominal[i]), mean=float(np.nanmean(samples[i])),
+                                                        std=float(np.nanstd(samples[i], ddof=1)),
+                                                        lower=float(lower[i]), upper=float(upper[i]))
+        return result
@@ -0,0 +1,71 @@
+"""
+Batched scoring of Hough circle candidates by sampling along their perimeters.
+"""
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Tuple
+
+class CircleScorer:
+    def __init__(self, thickness: int = 2, max_cached_radii: int = 1024):
+        self.thickness = thickness
+        self.max_cached_radii = max_cached_radii
+        self._offsets: 'OrderedDict[int, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+
+    def perimeter_offsets(self, radius: int) -> Tuple[np.ndarray, np.ndarray]:
+        offsets = self._offsets.get(radius)
+        if offsets is not None:
+            self._offsets.move_to_end(radius)
+            return offsets
+
+        # Rasterize once with cv2.circle so the sampled pixels are exactly the ones the drawn outline covers.
+        pad = radius + self.thickness + 1
+        stamp = np.zeros((2 * pad + 1, 2 * pad + 1), dtype=np.uint8)
+        cv2.circle(stamp, (pad, pad), radius, 255, self.thickness)
+        dy, dx = np.nonzero(stamp)
+        offsets = ((dy - pad).astype(np.int32), (dx - pad).astype(np.int32))
+
+        self._offsets[radius] = offsets
+        while len(self._offsets) > self.max_cached_radii:
+            self._offsets.popitem(last=False)
+        return offsets
+
+    def score(self, image: np.ndarray, circles: np.ndarray, initial_center_x: float, initial_center_y: float,
+              center_x: float, center_y: float, scale: float = 1.0) -> np.ndarray:
+        if len(circles) == 0:
+            return np.empty(0)
+        height, width = image.shape
+        x, y, r = circles[:, 0].astype(np.float64), circles[:, 1].astype(np.float64), circles[:, 2].astype(np.float64)
+        xi, yi, ri = np.rint(x).astype(np.int32), np.rint(y).astype(np.int32), np.rint(r).astype(np.int32)
+
+        offsets = [self.perimeter_offsets(int(radius)) for radius in ri]
+        lengths = np.array([len(dy) for dy, _ in offsets])
+        owner = np.repeat(np.arange(len(circles)), lengths)
+        rows = np.concatenate([dy for dy, _ in offsets]) + np.repeat(yi, lengths)
+        cols = np.concatenate([dx for _, dx in offsets]) + np.repeat(xi, lengths)
+
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+        values = image[rows[inside], cols[inside]]
+        lit = values > 0
+        owner = owner[inside][lit]
+
+        n = len(circles)
+        lit_counts = np.bincount(owner, minlength=n)
+        lit_sums = np.bincount(owner, weights=values[lit], minlength=n)
+
+        # Distances are weighted in full-resolution pixels so pyramid levels score consistently.
+        distance_from_initial = np.hypot(x - initial_center_x, y - initial_center_y) * scale
+        distance_weight = 1.0 / (1.0 + 0.1 * distance_from_initial)
+
+        edge_weight = np.divide(lit_sums, lit_counts * 255.0, out=np.zeros(n), where=lit_counts > 0)
+        completeness_weight = np.minimum(1.0, lit_counts / np.maximum(1, 2 * np.pi * r))
+
+        center_proximity = np.hypot(x - center_x, y - center_y) * scale
+        center_weight = 1.0 / (1.0 + center_proximity)
+
+        return (
+            0.2 * distance_weight +
+            0.5 * edge_weight +
+            0.2 * completeness_weight +
+            0.1 * center_weight
+        )
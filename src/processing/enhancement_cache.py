@@ -0,0 +1,75 @@
+"""
+Memory-bounded LRU cache of enhanced (grayscale, blurred, CLAHE) images.
+"""
+import weakref
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class EnhancementCache:
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Tuple, Tuple[weakref.ref, np.ndarray]]' = OrderedDict()
+
+    def _key(self, image: np.ndarray, params: Hashable) -> Tuple:
+        return (id(image), image.shape, image.dtype.str, params)
+
+    def get(self, image: np.ndarray, params: Hashable) -> Optional[np.ndarray]:
+        key = self._key(image, params)
+        entry = self._entries.get(key)
+        # id() values are recycled once an image is freed, so confirm the entry still refers to this array.
+        if entry is not None and entry[0]() is image:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def peek(self, image: np.ndarray, params: Hashable) -> Optional[np.ndarray]:
+        # Like get, but leaves the statistics and the LRU order alone.
+        entry = self._entries.get(self._key(image, params))
+        return entry[1] if entry is not None and entry[0]() is image else None
+
+    def put(self, image: np.ndarray, params: Hashable, enhanced: np.ndarray) -> np.ndarray:
+        if enhanced.nbytes > self.max_bytes:
+            return enhanced
+        key = self._key(image, params)
+        if key in self._entries:
+            self._remove(key)
+        enhanced.flags.writeable = False
+        self._entries[key] = (weakref.ref(image, lambda _ref, key=key: self._discard(key)), enhanced)
+        self.current_bytes += enhanced.nbytes
+        while self.current_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return enhanced
+
+    def _discard(self, key: Tuple):
+        if key in self._entries:
+            self._remove(key)
+
+    def _remove(self, key: Tuple):
+        _, enhanced = self._entries.pop(key)
+        self.current_bytes -= enhanced.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+        }
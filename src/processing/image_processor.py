@@ -1,29 +1,73 @@
 import cv2
 import numpy as np
-from typing import Optional, Tuple
+from typing import Callable, List, Optional, Tuple
+from src.processing.radial_profile import oversampled_radii, sample_radial_profile, half_maximum_bounds
+from src.processing.azimuthal_integrator import AzimuthalIntegrator
+from src.processing.circle_scorer import CircleScorer
+from src.processing.enhancement_cache import EnhancementCache
+from src.processing.result_cache import MISS, DetectionResultCache
+from src.processing.polar_rings import unwrap_radial_profile, find_ring_peaks, group_ring_orders, estimate_order_spacing
+from src.processing.profiling import stage
+
+class DetectionCancelled(Exception):
+    pass
+
+# Called as progress(evaluated, total) after each candidate center; returning False cancels the search.
+ProgressCallback = Callable[[int, int], bool]
 
 class ImageProcessor:
-    def __init__(self):
+    def __init__(self, enhancement_cache_bytes: int = 256 * 1024 * 1024,
+                 result_cache: Optional[DetectionResultCache] = None):
         self.image = None
         self.processed_image = None
+        self.blur_kernel_size = 5
+        self.clahe_clip_limit = 2.0
+        self.clahe_tile_grid_size = (8, 8)
+        self.enhancement_cache = EnhancementCache(max_bytes=enhancement_cache_bytes)
+        self.azimuthal_integrator = AzimuthalIntegrator()
+        self.circle_scorer = CircleScorer()
+        self.last_search_evaluations = 0
+        # Optional persistent store of auto_detect_radius_refined results; last_detection_cached is
+        # None when the last detection did not consult it.
+        self.result_cache = result_cache
+        self.last_detection_cached: Optional[bool] = None
     
+    def enhancement_params(self) -> tuple:
+        return (self.blur_kernel_size, self.clahe_clip_limit, tuple(self.clahe_tile_grid_size))
+
     def enhance_image(self):
         if self.image is None:
             raise ValueError("No image loaded.")
+
+        params = self.enhancement_params()
+        cached = self.enhancement_cache.get(self.image, params)
+        if cached is not None:
+            self.processed_image = cached
+            return self.processed_image
         
-        gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        with stage('grayscale'):
+            gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
         
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        with stage('blur'):
+            blurred = cv2.GaussianBlur(gray, (self.blur_kernel_size, self.blur_kernel_size), 0)
         
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        self.processed_image = clahe.apply(blurred)
+        with stage('clahe'):
+            clahe = cv2.createCLAHE(clipLimit=self.clahe_clip_limit, tileGridSize=tuple(self.clahe_tile_grid_size))
+            enhanced = clahe.apply(blurred)
+        self.processed_image = self.enhancement_cache.put(self.image, params, enhanced)
         
         return self.processed_image
     
-    def analyze_ring_boundaries(self, processed_image: np.ndarray, center_x: int, center_y: int, r_center_estimate: float,
-                                radial_search_width: int = 20, num_angles: int = 360) -> Optional[Tuple[float, float]]:
+    def analyze_ring_boundaries(self, processed_image: np.ndarray, center_x: float, center_y: float, r_center_estimate: float,
+                                radial_search_width: int = 20, num_angles: int = 360,
+                                radial_oversampling: int = 1, interpolation: str = 'linear',
+                                profile_method: str = 'sampled') -> Optional[Tuple[float, float]]:
         if processed_image is None or processed_image.ndim != 2:
             return None
+        if profile_method not in ('sampled', 'integrated'):
+            raise ValueError(f"Unknown profile method '{profile_method}'.")
+        if radial_oversampling < 1:
+            raise ValueError("Radial oversampling must be at least 1.")
 
         height, width = processed_image.shape
         
@@ -33,60 +77,26 @@ class ImageProcessor:
 
         if r_scan_start >= r_scan_end: 
             return None 
-            
-        sampled_radii = np.arange(np.floor(r_scan_start), np.ceil(r_scan_end))
-        if len(sampled_radii) == 0:
-            return None
 
-        radial_profile = np.zeros(len(sampled_radii))
-        
-        for i_angle in range(num_angles):
-            angle = 2 * np.pi * i_angle / num_angles
-            cos_a = np.cos(angle)
-            sin_a = np.sin(angle)
+        if profile_method == 'integrated':
+            with stage('azimuthal_integration'):
+                profile = self.azimuthal_integrator.integrate(processed_image, center_x, center_y, r_scan_start, r_scan_end,
+                                                              bin_width=1.0 / radial_oversampling)
+            return profile.boundaries()
             
-            for i, r_val in enumerate(sampled_radii):
-                x = int(round(center_x + r_val * cos_a))
-                y = int(round(center_y + r_val * sin_a))
-                
-                if 0 <= x < width and 0 <= y < height:
-                    radial_profile[i] += processed_image[y, x]
-        
-        if num_angles > 0:
-            radial_profile /= num_angles
-        else:
-            return None
-
-        if not radial_profile.any():
+        sampled_radii = oversampled_radii(r_scan_start, r_scan_end, radial_oversampling)
+        if len(sampled_radii) == 0 or num_angles <= 0:
             return None
 
-        peak_idx_local = np.argmax(radial_profile)
-        
-        profile_min_val = np.min(radial_profile)
-        peak_value = radial_profile[peak_idx_local]
-        
-        if peak_value <= profile_min_val:
-            return None
+        with stage('radial_profile'):
+            radial_profile = sample_radial_profile(processed_image, center_x, center_y, sampled_radii,
+                                                   num_angles=num_angles, interpolation=interpolation)
 
-        threshold = profile_min_val + (peak_value - profile_min_val) * 0.5 
+        return half_maximum_bounds(sampled_radii, radial_profile)
 
-        r_inner_local_idx = peak_idx_local
-        while r_inner_local_idx > 0 and radial_profile[r_inner_local_idx - 1] > threshold:
-            r_inner_local_idx -= 1
-        
-        r_outer_local_idx = peak_idx_local
-        while r_outer_local_idx < len(radial_profile) - 1 and radial_profile[r_outer_local_idx + 1] > threshold:
-            r_outer_local_idx += 1
-            
-        r_inner_abs = sampled_radii[r_inner_local_idx]
-        r_outer_abs = sampled_radii[r_outer_local_idx]
-
-        if r_inner_abs > r_outer_abs:
-            return None 
-
-        return float(r_inner_abs), float(r_outer_abs)
-
-    def auto_detect_radius_refined(self, processed_image: np.ndarray, initial_center_x: int, initial_center_y: int, radius_lower_limit: int, radius_upper_limit: int, center_search_window_half_size: int = 5) -> Optional[dict]:
+    def auto_detect_radius_refined(self, processed_image: np.ndarray, initial_center_x: int, initial_center_y: int, radius_lower_limit: int, radius_upper_limit: int, center_search_window_half_size: int = 5,
+                                   profile_method: str = 'sampled', center_search: str = 'grid',
+                                   progress: Optional[ProgressCallback] = None) -> Optional[dict]:
         if not (0 <= radius_lower_limit < radius_upper_limit):
             raise ValueError("Radius limits are invalid.")
         if processed_image is None:
@@ -96,6 +106,80 @@ class ImageProcessor:
         if center_search_window_half_size < 0:
             raise ValueError("Center search window half size must be non-negative.")
 
+        if center_search not in ('grid', 'coarse_to_fine'):
+            raise ValueError(f"Unknown center search strategy '{center_search}'.")
+
+        self.last_detection_cached = None
+        key = None
+        if self.result_cache is not None:
+            # The enhanced pixels already reflect the enhancement parameters.
+            with stage('result_cache'):
+                key = self.result_cache.key(processed_image, (
+                    'auto_detect_radius_refined', initial_center_x, initial_center_y, radius_lower_limit,
+                    radius_upper_limit, center_search_window_half_size, profile_method, center_search,
+                    self.circle_scorer.thickness))
+                cached = self.result_cache.get(key)
+            self.last_detection_cached = cached is not MISS
+            if self.last_detection_cached:
+                self.last_search_evaluations = 0
+                return cached
+        result = self._refine_radius(processed_image, initial_center_x, initial_center_y, radius_lower_limit,
+                                     radius_upper_limit, center_search_window_half_size, profile_method,
+                                     center_search, progress)
+        if key is not None:
+            self.result_cache.put(key, result)
+        return result
+
+    def _refine_radius(self, processed_image: np.ndarray, initial_center_x: int, initial_center_y: int,
+                       radius_lower_limit: int, radius_upper_limit: int, center_search_window_half_size: int,
+                       profile_method: str, center_search: str, progress: Optional[ProgressCallback]) -> Optional[dict]:
+        search = self._grid_center_search if center_search == 'grid' else self._coarse_to_fine_center_search
+        with stage('center_search', strategy=center_search):
+            weighted_circles, evaluations = search(
+                processed_image, initial_center_x, initial_center_y,
+                radius_lower_limit, radius_upper_limit, center_search_window_half_size, progress=progress)
+        self.last_search_evaluations = evaluations
+        
+        if weighted_circles:
+            sorted_circles = sorted(weighted_circles, key=lambda item: item[0], reverse=True)
+            best_circle_weight, best_circle_x, best_circle_y, best_circle_r = sorted_circles[0]
+ 
+            final_center_x = best_circle_x
+            final_center_y = best_circle_y
+            
+            with stage('ring_boundaries'):
+                ring_boundaries = self.analyze_ring_boundaries(
+                    processed_image, 
+                    int(round(best_circle_x)),
+                    int(round(best_circle_y)),
+                    best_circle_r,
+                    profile_method=profile_method
+                )
+
+            r_inner, r_outer = None, None
+            if ring_boundaries:
+                r_inner, r_outer = ring_boundaries
+
+            return {
+                'center_x': final_center_x,
+                'center_y': final_center_y,
+                'radius_centerline': best_circle_r, # Radius from Houg
+                'radius_inner': r_inner,          
+                'radius_outer': r_outer,          
+                'weight': best_circle_weight,
+                'evaluations': evaluations
+            }
+         
+        return None
+
+    @staticmethod
+    def _report_progress(progress: Optional[ProgressCallback], evaluated: int, total: int):
+        if progress is not None and progress(evaluated, total) is False:
+            raise DetectionCancelled("Auto-detection was cancelled.")
+
+    def _grid_center_search(self, processed_image: np.ndarray, initial_center_x: int, initial_center_y: int,
+                            radius_lower_limit: int, radius_upper_limit: int, center_search_window_half_size: int,
+                            progress: Optional[ProgressCallback] = None):
         search_grid_size = center_search_window_half_size * 2
         
         candidate_centers = []
@@ -108,85 +192,180 @@ class ImageProcessor:
         
         weighted_circles = []
         
-        for center_x, center_y in candidate_centers:
-            mask = np.zeros(processed_image.shape, dtype=np.uint8)
+        for evaluated, (center_x, center_y) in enumerate(candidate_centers, start=1):
+            with stage('center_candidate', x=center_x, y=center_y):
+                circles = self._find_circles_in_annulus(processed_image, center_x, center_y,
+                                                        radius_lower_limit, radius_upper_limit)
+                scored = self._score_circles(processed_image, circles, initial_center_x, initial_center_y, center_x, center_y)
+            weighted_circles.extend((w, int(round(x)), int(round(y)), int(round(r))) for w, x, y, r in scored)
+            self._report_progress(progress, evaluated, len(candidate_centers))
+
+        return weighted_circles, len(candidate_centers)
+
+    def _coarse_to_fine_center_search(self, processed_image: np.ndarray, initial_center_x: int, initial_center_y: int,
+                                      radius_lower_limit: int, radius_upper_limit: int, center_search_window_half_size: int,
+                                      max_levels: int = 3, min_coarse_radius: int = 16,
+                                      progress: Optional[ProgressCallback] = None):
+        height, width = processed_image.shape
+        # Same extent as the exhaustive grid, which steps by 2 pixels over +/- 2 * half size.
+        search_extent = center_search_window_half_size * 2
+        margin = search_extent + 4
+        x0 = max(0, initial_center_x - radius_upper_limit - margin)
+        y0 = max(0, initial_center_y - radius_upper_limit - margin)
+        x1 = min(width, initial_center_x + radius_upper_limit + margin + 1)
+        y1 = min(height, initial_center_y + radius_upper_limit + margin + 1)
+        roi = processed_image[y0:y1, x0:x1]
+
+        levels = 0
+        while (levels < max_levels and (radius_lower_limit >> (levels + 1)) >= min_coarse_radius
+               and (search_extent >> levels) > 2):
+            levels += 1
+        pyramid = [roi]
+        with stage('pyramid', levels=levels):
+            for _ in range(levels):
+                pyramid.append(cv2.pyrDown(pyramid[-1]))
+
+        # The pass sequence only depends on the window sizes, so the total is known up front.
+        passes = [self._search_passes(int(np.ceil(search_extent / 2 ** levels)))]
+        passes.extend(self._search_passes(1) for _ in range(levels))
+        total = sum(len(offsets) ** 2 for level_passes in passes for offsets in level_passes)
+
+        evaluations = 0
+        best = None
+        center_x = (initial_center_x - x0) / 2 ** levels
+        center_y = (initial_center_y - y0) / 2 ** levels
+        final_circles = []
+
+        for level, level_passes in zip(range(levels, -1, -1), passes):
+            scale = 2 ** level
+            image = pyramid[level]
+            initial_x, initial_y = (initial_center_x - x0) / scale, (initial_center_y - y0) / scale
+            lower, upper = int(radius_lower_limit / scale), int(np.ceil(radius_upper_limit / scale))
+
+            for offsets in level_passes:
+                level_circles = []
+                for dx in offsets:
+                    for dy in offsets:
+                        cx, cy = int(round(center_x + dx)), int(round(center_y + dy))
+                        with stage('center_candidate', x=cx * scale + x0, y=cy * scale + y0, level=level):
+                            circles = self._find_circles_in_annulus(image, cx, cy, lower, upper, scale=scale)
+                            level_circles.extend(self._score_circles(image, circles, initial_x, initial_y, cx, cy, scale=scale))
+                        evaluations += 1
+                        self._report_progress(progress, evaluations, total)
+
+                if level_circles:
+                    best = max(level_circles, key=lambda item: item[0])
+                    center_x, center_y = best[1], best[2]
+                    if level == 0:
+                        final_circles.extend(level_circles)
+
+            if level > 0:
+                # One coarse pixel spans two finer ones, so a +/- 1 window covers the rounding.
+                center_x, center_y = center_x * 2, center_y * 2
+
+        weighted_circles = [(w, int(round(x + x0)), int(round(y + y0)), int(round(r))) for w, x, y, r in final_circles]
+        return weighted_circles, evaluations
+
+    @staticmethod
+    def _search_passes(window: int) -> List[range]:
+        # Halve the window until the step reaches one pixel, re-centering on the best candidate each pass.
+        passes = []
+        while True:
+            step = max(1, int(np.ceil(window / 2)))
+            passes.append(range(-window, window + 1, step) if window > 0 else range(1))
+            if step == 1:
+                return passes
+            window = step
+
+    def _find_circles_in_annulus(self, image: np.ndarray, center_x: int, center_y: int,
+                                 radius_lower_limit: int, radius_upper_limit: int, scale: float = 1.0) -> np.ndarray:
+        with stage('annulus_mask'):
+            mask = np.zeros(image.shape, dtype=np.uint8)
             cv2.circle(mask, (center_x, center_y), radius_upper_limit, 255, -1)
             cv2.circle(mask, (center_x, center_y), radius_lower_limit, 0, -1)
             
-            roi_image = cv2.bitwise_and(processed_image, processed_image, mask=mask)
-            
+            roi_image = cv2.bitwise_and(image, image, mask=mask)
+        
+        with stage('hough_circles'):
             circles = cv2.HoughCircles(
                 roi_image,
                 cv2.HOUGH_GRADIENT,
                 dp=1,
                 minDist=max(1, int(radius_lower_limit / 2)), 
                 param1=100,
-                param2=10, 
+                param2=max(3, int(10 / scale)), 
                 minRadius=radius_lower_limit,
                 maxRadius=radius_upper_limit
             )
-            
-            if circles is not None:
-                detected_circles = circles[0, :]
-                
-                for circle in detected_circles:
-                    x, y, r = circle[0], circle[1], circle[2]
-                    
-                    distance_from_initial = np.sqrt((x - initial_center_x)**2 + (y - initial_center_y)**2)
-                    distance_weight = 1.0 / (1.0 + 0.1 * distance_from_initial)  # Inverse distance weight
-                    
-                    circle_mask = np.zeros(processed_image.shape, dtype=np.uint8)
-                    cv2.circle(circle_mask, (int(round(x)), int(round(y))), int(round(r)), 255, 2) # Thickness changed to 2
-                    
-                    edge_pixels = cv2.bitwise_and(processed_image, processed_image, mask=circle_mask)
-                    non_zero_pixels = edge_pixels[edge_pixels > 0]
-                    
-                    if len(non_zero_pixels) > 0:
-                        edge_strength = np.mean(non_zero_pixels)
-                        edge_weight = edge_strength / 255.0  
-                    else:
-                        edge_weight = 0.0
-                    
-                    circle_perimeter = 2 * np.pi * r
-                    completeness_weight = min(1.0, len(non_zero_pixels) / max(1, circle_perimeter))
-                    
-                    center_proximity = np.sqrt((x - center_x)**2 + (y - center_y)**2)
-                    center_weight = 1.0 / (1.0 + center_proximity)
-                    
-                    final_weight = (
-                        0.2 * distance_weight +  
-                        0.5 * edge_weight +      
-                        0.2 * completeness_weight +
-                        0.1 * center_weight      
-                    )
-                    
-                    weighted_circles.append((final_weight, int(round(x)), int(round(y)), int(round(r))))
-        
-        if weighted_circles:
-            sorted_circles = sorted(weighted_circles, key=lambda item: item[0], reverse=True)
-            best_circle_weight, best_circle_x, best_circle_y, best_circle_r = sorted_circles[0]
- 
-            final_center_x = best_circle_x
-            final_center_y = best_circle_y
-            
-            ring_boundaries = self.analyze_ring_boundaries(
-                processed_image, 
-                int(round(best_circle_x)),
-                int(round(best_circle_y)),
-                best_circle_r
-            )
+        if circles is None:
+            return np.empty((0, 3), dtype=np.float32)
+        return circles[0, :]
 
-            r_inner, r_outer = None, None
-            if ring_boundaries:
-                r_inner, r_outer = ring_boundaries
+    def _score_circles(self, image: np.ndarray, circles: np.ndarray, initial_center_x: float, initial_center_y: float,
+                       center_x: float, center_y: float, scale: float = 1.0) -> List[Tuple[float, float, float, float]]:
+        with stage('circle_scoring'):
+            weights = self.circle_scorer.score(image, circles, initial_center_x, initial_center_y, center_x, center_y, scale=scale)
+        return [(float(w), float(c[0]), float(c[1]), float(c[2])) for w, c in zip(weights, circles)]
 
-            return {
-                'center_x': final_center_x,
-                'center_y': final_center_y,
-                'radius_centerline': best_circle_r, # Radius from Houg
-                'radius_inner': r_inner,          
-                'radius_outer': r_outer,          
-                'weight': best_circle_weight
-            }
-         
-        return None
\ No newline at end of file
+    def detect_rings_polar(self, processed_image: np.ndarray, center_x: float, center_y: float, radius_lower_limit: float,
+                           radius_upper_limit: float, num_angles: int = 360, radial_oversampling: int = 2,
+                           min_relative_height: float = 0.3) -> Optional[dict]:
+        if not (0 <= radius_lower_limit < radius_upper_limit):
+            raise ValueError("Radius limits are invalid.")
+        if processed_image is None:
+            raise ValueError("Processed image is not available.")
+        if processed_image.ndim != 2:
+            raise ValueError("Processed image must be grayscale.")
+
+        with stage('polar_unwrap'):
+            radii, profile = unwrap_radial_profile(processed_image, center_x, center_y, radius_upper_limit,
+                                                   num_angles=num_angles, radial_oversampling=radial_oversampling)
+        in_annulus = radii >= radius_lower_limit
+        with stage('ring_peaks'):
+            rings = find_ring_peaks(radii[in_annulus], profile[in_annulus], min_relative_height=min_relative_height,
+                                    smoothing=radial_oversampling + 1)
+        if not rings:
+            return None
+
+        # The order spacing comes from every ring out to the limit, so a narrow annulus
+        # around a single order is still grouped against its neighbours.
+        all_rings = rings
+        if radius_lower_limit > 0:
+            with stage('ring_peaks'):
+                all_rings = find_ring_peaks(radii, profile, min_relative_height=min_relative_height,
+                                            smoothing=radial_oversampling + 1)
+        order_spacing_sq = estimate_order_spacing([ring['radius_peak'] for ring in all_rings])
+        orders = group_ring_orders(rings, order_spacing_sq)
+        return {
+            'center_x': center_x,
+            'center_y': center_y,
+            'rings': rings,
+            'orders': orders,
+            'order_spacing_sq': order_spacing_sq
+        }
+
+    def estimate_ring_center(self, processed_image: np.ndarray, max_dimension: int = 512) -> Optional[Tuple[float, float]]:
+        if processed_image is None or processed_image.ndim != 2:
+            raise ValueError("Processed image must be grayscale.")
+
+        height, width = processed_image.shape
+        scale = max(1.0, max(height, width) / max_dimension)
+        small = cv2.resize(processed_image, (int(round(width / scale)), int(round(height / scale))),
+                           interpolation=cv2.INTER_AREA) if scale > 1.0 else processed_image
+
+        circles = cv2.HoughCircles(
+            small,
+            cv2.HOUGH_GRADIENT,
+            dp=1,
+            minDist=1,
+            param1=100,
+            param2=20,
+            minRadius=5,
+            maxRadius=int(min(small.shape) / 2)
+        )
+        if circles is None:
+            return None
+
+        # Interference rings are concentric, so the median of all detected centers is robust to stray circles.
+        centers = circles[0, :, :2] * scale
+        return float(np.median(centers[:, 0])), float(np.median(centers[:, 1]))
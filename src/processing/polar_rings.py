@@ -0,0 +1,155 @@
+"""
+Multi-ring detection from a single polar unwrap of the ring image.
+"""
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.processing.radial_profile import half_maximum_bounds
+
+RING_NAMES = ('inner', 'middle', 'outer')
+GAP_CLASS_RATIO = 2.0       # jump between sorted r^2 gaps that separates within-order from between-order gaps
+ORDER_SPAN = 0.5            # largest r^2 extent of one order, as a fraction of the order spacing
+TRIPLET_SYMMETRY = 0.35     # allowed difference of the two sigma shifts, relative to their mean
+SPACING_TOLERANCE = 0.05    # relative r^2 mismatch still counted as one order spacing
+
+def unwrap_radial_profile(image: np.ndarray, center_x: float, center_y: float, radius_upper_limit: float,
+                          num_angles: int = 360, radial_oversampling: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    if radial_oversampling < 1:
+        raise ValueError("Radial oversampling must be at least 1.")
+    num_radii = max(2, int(np.ceil(radius_upper_limit)) * radial_oversampling)
+    # warpPolar lays out angle along rows and radius along columns.
+    polar = cv2.warpPolar(image, (num_radii, num_angles), (float(center_x), float(center_y)), float(radius_upper_limit),
+                          cv2.WARP_POLAR_LINEAR | cv2.INTER_LINEAR)
+    radii = np.arange(num_radii) * (radius_upper_limit / num_radii)
+    return radii, polar.mean(axis=0, dtype=np.float64)
+
+def find_ring_peaks(radii: np.ndarray, profile: np.ndarray, min_relative_height: float = 0.3,
+                    smoothing: int = 3) -> List[Dict[str, float]]:
+    if len(profile) < 3:
+        return []
+    if smoothing > 1:
+        kernel = np.ones(smoothing) / smoothing
+        smoothed = np.convolve(profile, kernel, mode='same')
+    else:
+        smoothed = profile
+
+    p_min, p_max = smoothed.min(), smoothed.max()
+    if p_max <= p_min:
+        return []
+    floor = p_min + (p_max - p_min) * min_relative_height
+
+    interior = smoothed[1:-1]
+    is_peak = (interior > smoothed[:-2]) & (interior >= smoothed[2:]) & (interior > floor)
+    peak_idx = np.flatnonzero(is_peak) + 1
+    if len(peak_idx) == 0:
+        return []
+
+    # Each ring owns the stretch of profile between the valleys that separate it from its neighbours.
+    valleys = [0]
+    for a, b in zip(peak_idx[:-1], peak_idx[1:]):
+        valleys.append(a + int(np.argmin(smoothed[a:b + 1])))
+    valleys.append(len(smoothed) - 1)
+
+    rings = []
+    for k, idx in enumerate(peak_idx):
+        lo, hi = valleys[k], valleys[k + 1] + 1
+        bounds = half_maximum_bounds(radii[lo:hi], profile[lo:hi])
+        r_inner, r_outer = bounds if bounds else (None, None)
+        rings.append({
+            'radius_peak': _refine_peak(radii, smoothed, idx),
+            'radius_inner': r_inner,
+            'radius_outer': r_outer,
+            'intensity': float(profile[idx]),
+        })
+    return rings
+
+def estimate_order_spacing(radii: Sequence[float]) -> Optional[float]:
+    """
+    Spacing of the interference orders in r^2, from the ring radii.
+
+    Orders are evenly spaced in r^2, so every component repeats one spacing further out.
+    The spacing is the shift that maps the most peaks onto other peaks. Shifts within the
+    class of small gaps between neighbouring peaks are the Zeeman splitting, not the
+    spacing, and are not considered. When all gaps are alike, the peaks are either
+    unresolved orders or the components of a single order; orders continue inward to the
+    center, so peaks that start further out than two gaps are taken to be one order.
+    None then, and for fewer than two peaks.
+    """
+    squared = np.sort(np.asarray(radii, dtype=np.float64)) ** 2
+    gaps = np.sort(np.diff(squared))
+    gaps = gaps[gaps > 0]
+    if len(gaps) == 0:
+        return None
+    floor = gaps[0]
+    ratios = gaps[1:] / gaps[:-1]
+    if len(ratios) and ratios.max() > GAP_CLASS_RATIO:
+        floor = gaps[int(np.argmax(ratios)) + 1]
+    elif squared[0] > 2 * gaps[-1]:
+        return None
+
+    # One absolute tolerance for every candidate; a relative one would favour large shifts.
+    tolerance = SPACING_TOLERANCE * floor
+    shifts = squared[np.newaxis, :] - squared[:, np.newaxis]
+    candidates = np.unique(shifts[shifts >= floor - tolerance])
+    best, best_score = None, 0
+    for candidate in candidates:
+        # Smallest shift first, so twice the spacing never beats the spacing on a tie.
+        score = int(np.any(np.abs(shifts - candidate) <= tolerance, axis=1).sum())
+        if score > best_score:
+            best, best_score = candidate, score
+    return float(np.median(shifts[np.abs(shifts - best) <= tolerance]))
+
+def _is_triplet(squared: np.ndarray) -> bool:
+    # The sigma components are shifted equally in r^2 to either side of the pi component.
+    below, above = squared[1] - squared[0], squared[2] - squared[1]
+    return abs(above - below) <= TRIPLET_SYMMETRY * 0.5 * (above + below)
+
+def ring_order_is_plausible(order: Dict[str, Optional[float]], order_spacing_sq: Optional[float]) -> bool:
+    # A complete order whose sigma components sit symmetrically about the pi component in
+    # r^2, split by well under the spacing to the neighbouring orders when that is known.
+    if any(order[name] is None for name in RING_NAMES):
+        return False
+    squared = np.array([order[name] for name in RING_NAMES]) ** 2
+    if not _is_triplet(squared):
+        return False
+    return order_spacing_sq is None or squared[2] - squared[0] <= ORDER_SPAN * order_spacing_sq
+
+def group_ring_orders(rings: List[Dict[str, float]],
+                      order_spacing_sq: Optional[float] = None) -> List[Dict[str, Optional[float]]]:
+    if not rings:
+        return []
+    radii = np.array([ring['radius_peak'] for ring in rings])
+    intensities = np.array([ring['intensity'] for ring in rings])
+    squared = radii ** 2
+    if order_spacing_sq is None:
+        order_spacing_sq = estimate_order_spacing(radii)
+
+    # Peaks closer in r^2 than a fraction of the order spacing belong to one order; without
+    # a spacing they all do.
+    groups = [[0]]
+    for k in range(1, len(radii)):
+        if order_spacing_sq is None or squared[k] - squared[groups[-1][0]] <= ORDER_SPAN * order_spacing_sq:
+            groups[-1].append(k)
+        else:
+            groups.append([k])
+
+    orders = []
+    for group in groups:
+        order = dict.fromkeys(RING_NAMES)
+        if len(group) == 3 and _is_triplet(squared[group]):
+            order['inner'], order['middle'], order['outer'] = (float(radii[k]) for k in group)
+        elif len(group) == 2:
+            order['inner'], order['outer'] = float(radii[group[0]]), float(radii[group[1]])
+        else:
+            # A lone peak, or peaks that do not form a triplet: only the brightest is kept.
+            order['middle'] = float(radii[group[int(np.argmax(intensities[group]))]])
+        orders.append(order)
+    return orders
+
+def _refine_peak(radii: np.ndarray, profile: np.ndarray, idx: int) -> float:
+    left, centre, right = profile[idx - 1], profile[idx], profile[idx + 1]
+    curvature = left - 2 * centre + right
+    if curvature >= 0:
+        return float(radii[idx])
+    offset = 0.5 * (left - right) / curvature
+    return float(radii[idx] + offset * (radii[idx + 1] - radii[idx]))
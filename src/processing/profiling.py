@@ -0,0 +1,158 @@
+"""
+Stage-level timing and allocation profiling for the image-processing pipeline.
+"""
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_NULL_STAGE = contextlib.nullcontext()
+
+class _Stage:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'memory_start', 'memory_peak')
+
+    def __init__(self, profiler: 'StageProfiler', name: str, args: Dict[str, Any]):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if self.profiler.track_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # tracemalloc has a single peak counter, so fold it into the enclosing stage before resetting it.
+            if stack:
+                stack[-1].memory_peak = max(stack[-1].memory_peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start = current
+            self.memory_peak = current
+        else:
+            self.memory_start = None
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter_ns()
+        stack = self.profiler._stack()
+        stack.pop()
+        allocated = None
+        if self.memory_start is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            self.memory_peak = max(self.memory_peak, peak)
+            allocated = self.memory_peak - self.memory_start
+            if stack and stack[-1].memory_start is not None:
+                stack[-1].memory_peak = max(stack[-1].memory_peak, self.memory_peak)
+        self.profiler._record(self.name, self.start, end - self.start, allocated, self.args)
+        return False
+
+class StageProfiler:
+    def __init__(self, max_events: int = 200000):
+        self.enabled = False
+        self.track_memory = False
+        self.max_events = max_events
+        self._started_tracing = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        with self._lock:
+            self.origin_ns = time.perf_counter_ns()
+            self.events: List[Dict[str, Any]] = []
+            self.dropped_events = 0
+            self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def stage(self, name: str, **args):
+        return _Stage(self, name, args)
+
+    def _stack(self) -> List[_Stage]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name: str, start_ns: int, duration_ns: int, allocated: Optional[int], args: Dict[str, Any]):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = {'calls': 0, 'total_s': 0.0, 'max_s': 0.0, 'bytes': 0}
+            duration_s = duration_ns / 1e9
+            stats['calls'] += 1
+            stats['total_s'] += duration_s
+            stats['max_s'] = max(stats['max_s'], duration_s)
+            if allocated is not None:
+                # Peak traced memory above the stage's entry, i.e. what the stage allocated at most at once.
+                stats['bytes'] += allocated
+            # Aggregates are always kept; the per-call events that feed the trace are capped.
+            if len(self.events) < self.max_events:
+                self.events.append({'name': name, 'start_ns': start_ns, 'duration_ns': duration_ns,
+                                    'bytes': allocated, 'thread': threading.get_ident(), 'args': args})
+            else:
+                self.dropped_events += 1
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [dict(stats, stage=name, mean_s=stats['total_s'] / stats['calls'])
+                    for name, stats in self.stats.items()]
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def summary_text(self, limit: int = 12) -> str:
+        rows = self.summary()
+        if not rows:
+            return "No stages recorded."
+        lines = [f"{'Stage':<22}{'Calls':>7}{'Total ms':>10}{'Mean ms':>9}{'MB':>8}"]
+        for row in rows[:limit]:
+            lines.append(f"{row['stage']:<22}{row['calls']:>7}{row['total_s'] * 1e3:>10.1f}"
+                         f"{row['mean_s'] * 1e3:>9.2f}{row['bytes'] / 1e6:>8.1f}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+        trace_events = []
+        for event in events:
+            args = {key: value if isinstance(value, (int, float, str, bool)) or value is None else str(value)
+                    for key, value in event['args'].items()}
+            if event['bytes'] is not None:
+                args['bytes'] = event['bytes']
+            trace_events.append({
+                'name': event['name'],
+                'cat': 'processing',
+                'ph': 'X',
+                'ts': (event['start_ns'] - self.origin_ns) / 1e3,
+                'dur': event['duration_ns'] / 1e3,
+                'pid': 1,
+                'tid': event['thread'],
+                'args': args,
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                'otherData': {'dropped_events': self.dropped_events}}
+
+    def export_chrome_trace(self, path: Path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+profiler = StageProfiler()
+
+def stage(name: str, **args):
+    # The disabled path is a flag check returning a shared no-op context manager.
+    if not profiler.enabled:
+        return _NULL_STAGE
+    return profiler.stage(name, **args)
@@ -0,0 +1,73 @@
+"""
+Radial intensity profiles sampled around a ring center.
+"""
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+INTERPOLATION_FLAGS = {
+    'nearest': cv2.INTER_NEAREST,
+    'linear': cv2.INTER_LINEAR,
+    'cubic': cv2.INTER_CUBIC,
+}
+
+def oversampled_radii(r_start: float, r_end: float, radial_oversampling: int = 1) -> np.ndarray:
+    if radial_oversampling < 1:
+        raise ValueError("Radial oversampling must be at least 1.")
+    first = np.floor(r_start)
+    count = int(np.ceil(r_end) - first) * radial_oversampling
+    return first + np.arange(max(0, count)) / radial_oversampling
+
+def sample_radial_profile(image: np.ndarray, center_x: float, center_y: float, radii: np.ndarray,
+                          num_angles: int = 360, interpolation: str = 'linear') -> np.ndarray:
+    if interpolation not in INTERPOLATION_FLAGS:
+        raise ValueError(f"Unknown interpolation '{interpolation}'.")
+    if num_angles <= 0 or len(radii) == 0:
+        return np.zeros(len(radii))
+
+    angles = 2 * np.pi * np.arange(num_angles) / num_angles
+    # One row per angle, one column per radius; remap reads the whole grid in a single call.
+    map_x = (center_x + np.outer(np.cos(angles), radii)).astype(np.float32)
+    map_y = (center_y + np.outer(np.sin(angles), radii)).astype(np.float32)
+
+    samples = cv2.remap(image, map_x, map_y, INTERPOLATION_FLAGS[interpolation],
+                        borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return samples.mean(axis=0, dtype=np.float64)
+
+def half_maximum_bounds(radii: np.ndarray, profile: np.ndarray) -> Optional[Tuple[float, float]]:
+    if len(profile) == 0 or not profile.any():
+        return None
+
+    peak_idx = int(np.argmax(profile))
+    profile_min_val = profile.min()
+    peak_value = profile[peak_idx]
+    if peak_value <= profile_min_val:
+        return None
+
+    threshold = profile_min_val + (peak_value - profile_min_val) * 0.5
+    below = profile <= threshold
+
+    inner_below = np.flatnonzero(below[:peak_idx])
+    outer_below = np.flatnonzero(below[peak_idx + 1:])
+
+    if len(inner_below):
+        i = inner_below[-1]
+        r_inner = _threshold_crossing(radii[i], radii[i + 1], profile[i], profile[i + 1], threshold)
+    else:
+        r_inner = radii[0]
+
+    if len(outer_below):
+        j = peak_idx + 1 + outer_below[0]
+        r_outer = _threshold_crossing(radii[j - 1], radii[j], profile[j - 1], profile[j], threshold)
+    else:
+        r_outer = radii[-1]
+
+    if r_inner > r_outer:
+        return None
+
+    return float(r_inner), float(r_outer)
+
+def _threshold_crossing(r_a: float, r_b: float, p_a: float, p_b: float, threshold: float) -> float:
+    if p_a == p_b:
+        return r_a
+    return r_a + (threshold - p_a) / (p_b - p_a) * (r_b - r_a)
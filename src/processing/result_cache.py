@@ -0,0 +1,117 @@
+"""
+Persistent, size-bounded cache of ring-detection results in an SQLite file.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Bump whenever a change to the detection code can change its results; entries written
+# under another version are dropped when the cache is opened.
+CACHE_VERSION = 5
+
+MISS = object()
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Cannot cache {type(value).__name__}")
+
+class DetectionResultCache:
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024, timeout: float = 30.0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._digests: Dict[int, Tuple[weakref.ref, str]] = {}
+        # One connection shared by the GUI and detection threads; batch worker processes open
+        # their own, and SQLite serializes writers across them.
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), timeout=timeout, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                                     'size INTEGER NOT NULL, last_used REAL NOT NULL)')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+            row = self._connection.execute("SELECT value FROM meta WHERE name = 'version'").fetchone()
+            if row is None or row[0] != str(CACHE_VERSION):
+                self._connection.execute('DELETE FROM results')
+                self._connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_VERSION),))
+
+    def image_digest(self, image: np.ndarray) -> str:
+        # Hashed once per array; detection reuses the same enhanced array from the enhancement cache.
+        entry = self._digests.get(id(image))
+        if entry is not None and entry[0]() is image:
+            return entry[1]
+        digest = hashlib.sha256(f'{image.shape}{image.dtype.str}'.encode())
+        digest.update(memoryview(np.ascontiguousarray(image)).cast('B'))
+        key = id(image)
+        self._digests[key] = (weakref.ref(image, lambda _ref, key=key: self._digests.pop(key, None)),
+                              digest.hexdigest())
+        return self._digests[key][1]
+
+    def key(self, image: np.ndarray, params: Hashable) -> str:
+        text = json.dumps(params, default=_json_default, separators=(',', ':'))
+        return hashlib.sha256(f'{self.image_digest(image)}:{text}'.encode()).hexdigest()
+
+    def get(self, key: str) -> Any:
+        # The cached value, which may be None for a detection that found nothing, or MISS.
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return MISS
+            self._connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (time.time(), key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Optional[Dict[str, Any]]):
+        text = json.dumps(value, default=_json_default, separators=(',', ':'))
+        size = len(key) + len(text)
+        if size > self.max_bytes:
+            return
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                                     (key, text, size, time.time()))
+            excess = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0] - self.max_bytes
+            if excess > 0:
+                stale = []
+                for old_key, old_size in self._connection.execute('SELECT key, size FROM results ORDER BY last_used'):
+                    if excess <= 0:
+                        break
+                    stale.append((old_key,))
+                    excess -= old_size
+                self._connection.executemany('DELETE FROM results WHERE key = ?', stale)
+                self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+        }
@@ -0,0 +1,119 @@
+"""
+Columnar export of measurement tables to CSV, Parquet, HDF5 and NPZ.
+"""
+import json
+import zipfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from src.physics.zeeman import EV_TO_JOULE, MeasurementSet
+
+# Name, CSV label, unit, MeasurementSet column, scale from SI. The angles and shifts are the
+# values process_measurement stored, so the export cannot drift from the physics module.
+EXPORT_COLUMNS = [
+    ('current', 'I', 'A', 'current', 1.0),
+    ('B', 'B', 'G', 'B_field', 1e4),
+    ('R_i', 'R_i', 'mm', 'R_inner', 1.0),
+    ('R_c', 'R_c', 'mm', 'R_center', 1.0),
+    ('R_o', 'R_o', 'mm', 'R_outer', 1.0),
+    ('alpha_i', 'α_i', 'deg', 'alpha_i', 180 / np.pi),
+    ('alpha_c', 'α_c', 'deg', 'alpha_c', 180 / np.pi),
+    ('alpha_o', 'α_o', 'deg', 'alpha_o', 180 / np.pi),
+    ('beta_i', 'β_i', 'deg', 'beta_i', 180 / np.pi),
+    ('beta_c', 'β_c', 'deg', 'beta_c', 180 / np.pi),
+    ('beta_o', 'β_o', 'deg', 'beta_o', 180 / np.pi),
+    ('delta_lambda_i', 'Δλ_i', 'nm', 'delta_lambda_i', 1e9),
+    ('delta_lambda_o', 'Δλ_o', 'nm', 'delta_lambda_o', 1e9),
+    ('delta_E_i', 'ΔE_i', 'eV', 'delta_E_i', 1 / EV_TO_JOULE),
+    ('delta_E_o', 'ΔE_o', 'eV', 'delta_E_o', 1 / EV_TO_JOULE),
+]
+UNITS = {name: unit for name, _, unit, _, _ in EXPORT_COLUMNS}
+FORMATS = {'.csv': 'csv', '.tsv': 'csv', '.parquet': 'parquet', '.h5': 'hdf5', '.hdf5': 'hdf5', '.npz': 'npz'}
+
+def export_format(path: Path) -> str:
+    try:
+        return FORMATS[Path(path).suffix.lower()]
+    except KeyError:
+        raise ValueError(f"Unsupported export format: {Path(path).suffix or path}")
+
+def export_column(measurements: MeasurementSet, name: str, start: int = 0, stop: Optional[int] = None,
+                  calibration_params: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    _, _, _, source, scale = EXPORT_COLUMNS[[column[0] for column in EXPORT_COLUMNS].index(name)]
+    values = measurements.column(source)[start:stop] * scale
+    if source == 'current' and calibration_params is not None:
+        # Measurements saved before the current was recorded get it back from the calibration line.
+        missing = ~np.isfinite(values)
+        if missing.any():
+            slope, intercept = calibration_params
+            values[missing] = (measurements.column('B_field')[start:stop][missing] * 1e4 - intercept) / slope
+    return values
+
+def measurement_frame(measurements: MeasurementSet, start: int = 0, stop: Optional[int] = None,
+                      calibration_params: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+    return pd.DataFrame({name: export_column(measurements, name, start, stop, calibration_params)
+                         for name, _, _, _, _ in EXPORT_COLUMNS})
+
+def _chunks(measurements: MeasurementSet, chunk_rows: int,
+            calibration_params: Optional[Tuple[float, float]]) -> Iterator[pd.DataFrame]:
+    for start in range(0, max(len(measurements), 1), chunk_rows):
+        yield measurement_frame(measurements, start, min(start + chunk_rows, len(measurements)), calibration_params)
+
+def _write_csv(measurements, path, chunk_rows, calibration_params, metadata):
+    # Tab-separated with the unit in each header, as the GUI has always written it; NaN is an empty cell.
+    header = [f'{label}({unit})' for _, label, unit, _, _ in EXPORT_COLUMNS]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for i, frame in enumerate(_chunks(measurements, chunk_rows, calibration_params)):
+            frame.to_csv(f, sep='\t', header=header if i == 0 else False, index=False, na_rep='',
+                         float_format='%.10g')
+
+def _write_parquet(measurements, path, chunk_rows, calibration_params, metadata):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([(name, pa.float64()) for name, _, _, _, _ in EXPORT_COLUMNS],
+                       metadata={'units': json.dumps(UNITS), 'metadata': json.dumps(metadata)})
+    # One row group per chunk.
+    with pq.ParquetWriter(path, schema) as writer:
+        for frame in _chunks(measurements, chunk_rows, calibration_params):
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+
+def _write_hdf5(measurements, path, chunk_rows, calibration_params, metadata):
+    with pd.HDFStore(path, mode='w') as store:
+        for frame in _chunks(measurements, chunk_rows, calibration_params):
+            store.append('measurements', frame, format='table', index=False)
+        attrs = store.get_storer('measurements').attrs
+        attrs.units = UNITS
+        attrs.metadata = metadata
+
+def _write_npz(measurements, path, chunk_rows, calibration_params, metadata):
+    # One .npy member per column written straight into the archive, so only one derived column
+    # is in memory at a time; np.load reads it like any np.savez file.
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, _, _, _, _ in EXPORT_COLUMNS:
+            with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                np.lib.format.write_array(member, export_column(measurements, name,
+                                                                calibration_params=calibration_params),
+                                          allow_pickle=False)
+        with archive.open('units.npy', 'w') as member:
+            np.lib.format.write_array(member, np.array(json.dumps(UNITS)), allow_pickle=False)
+        with archive.open('metadata.npy', 'w') as member:
+            np.lib.format.write_array(member, np.array(json.dumps(metadata)), allow_pickle=False)
+
+WRITERS = {'csv': _write_csv, 'parquet': _write_parquet, 'hdf5': _write_hdf5, 'npz': _write_npz}
+
+def export_measurements(measurements: MeasurementSet, path: Path, fmt: Optional[str] = None,
+                        calibration_params: Optional[Tuple[float, float]] = None,
+                        metadata: Optional[Dict[str, Any]] = None, chunk_rows: int = 100000) -> str:
+    """
+    Write the measurement table to path, in fmt or the format implied by the suffix.
+
+    Rows are converted and written chunk_rows at a time. Parquet needs pyarrow and HDF5 needs
+    PyTables; an ImportError is raised if they are missing.
+    """
+    fmt = fmt or export_format(path)
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be positive.")
+    WRITERS[fmt](measurements, path, chunk_rows, calibration_params, metadata or {})
+    return fmt
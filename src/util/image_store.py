@@ -0,0 +1,224 @@
+"""
+Lazy, memory-bounded storage for the loaded image list.
+"""
+import hashlib
+import logging
+import tempfile
+import zipfile
+import cv2
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ImageRecord:
+    def __init__(self, store: 'ImageStore', path: Optional[str] = None, **metadata):
+        self._store = store
+        self.path = path
+        self.spill_path: Optional[Path] = None
+        self.pinned_image: Optional[np.ndarray] = None
+        self.thumbnail: Optional[np.ndarray] = None
+        self.shape = None
+        # Set for records restored from a project: the SHA-256 of the source file, checked on the
+        # first decode (content_changed stays None until then), the project archive member
+        # holding the pixels when the image had no source file, and an embedded enhanced image.
+        self.content_hash: Optional[str] = None
+        self.content_changed: Optional[bool] = None
+        self.archive_member: Optional[Tuple[str, str]] = None
+        self.enhanced_member: Optional[Tuple[str, str, tuple]] = None   # archive, member, enhancement params
+        self.metadata: Dict[str, Any] = {'calibration_points': [], 'mm_per_pixel': None, 'measurement': None}
+        self.metadata.update(metadata)
+
+    def __getitem__(self, key: str):
+        if key == 'image':
+            return self._store.get_pixels(self)
+        if key == 'thumbnail':
+            return self.thumbnail
+        return self.metadata[key]
+
+    def __setitem__(self, key: str, value):
+        if key == 'image':
+            raise KeyError("Image pixels are managed by the image store.")
+        self.metadata[key] = value
+
+    def __contains__(self, key: str) -> bool:
+        return key in ('image', 'thumbnail') or key in self.metadata
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self else default
+
+class ImageStore:
+    def __init__(self, max_bytes: int = 1024 * 1024 * 1024, spill_to_disk: bool = False,
+                 spill_dir: Optional[str] = None, thumbnail_size: int = 256):
+        self.max_bytes = max_bytes
+        self.spill_to_disk = spill_to_disk
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._temp_dir: Optional[tempfile.TemporaryDirectory] = None
+        self.thumbnail_size = thumbnail_size
+        self.current_bytes = 0
+        self.decodes = 0
+        self._records = []
+        self._resident: 'OrderedDict[int, np.ndarray]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index: int) -> ImageRecord:
+        return self._records[index]
+
+    def __iter__(self) -> Iterator[ImageRecord]:
+        return iter(self._records)
+
+    def add_file(self, path: str, **metadata) -> ImageRecord:
+        record = ImageRecord(self, path=str(path), **metadata)
+        image = self._decode(record)
+        self._register(record, image)
+        return record
+
+    def add_decoded(self, path: str, image: np.ndarray, thumbnail: Optional[np.ndarray] = None, **metadata) -> ImageRecord:
+        record = ImageRecord(self, path=str(path), **metadata)
+        record.thumbnail = thumbnail
+        self.decodes += 1
+        self._register(record, image)
+        return record
+
+    def add_array(self, image: np.ndarray, **metadata) -> ImageRecord:
+        record = ImageRecord(self, **metadata)
+        if self.spill_to_disk:
+            self._spill(record, image)
+        else:
+            # Without a source file or spill file the array is the only copy, so it cannot be evicted.
+            record.pinned_image = image
+        self._register(record, image)
+        return record
+
+    def add_reference(self, path: Optional[str], shape: Tuple[int, ...], thumbnail: Optional[np.ndarray] = None,
+                      content_hash: Optional[str] = None, archive_member: Optional[Tuple[str, str]] = None,
+                      **metadata) -> ImageRecord:
+        # Registers an image without reading it; the pixels are decoded on first access.
+        record = ImageRecord(self, path=None if path is None else str(path), **metadata)
+        record.shape = tuple(shape)
+        record.thumbnail = thumbnail
+        record.content_hash = content_hash
+        record.archive_member = archive_member
+        self._records.append(record)
+        return record
+
+    def get_pixels(self, record: ImageRecord) -> np.ndarray:
+        if record.pinned_image is not None:
+            return record.pinned_image
+        key = id(record)
+        image = self._resident.get(key)
+        if image is not None:
+            self._resident.move_to_end(key)
+            return image
+        if record.spill_path is not None:
+            image = np.load(record.spill_path, mmap_mode='r')
+        else:
+            image = self._decode(record)
+        self._make_resident(record, image)
+        return image
+
+    def resident_pixels(self, record: ImageRecord) -> Optional[np.ndarray]:
+        # The pixels if they are in memory, without decoding or touching the LRU order.
+        if record.pinned_image is not None:
+            return record.pinned_image
+        return self._resident.get(id(record))
+
+    @staticmethod
+    def decode_bytes(data: bytes, name: str = 'image', flags: int = cv2.IMREAD_COLOR) -> np.ndarray:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+        if image is None:
+            raise ValueError(f"Failed to decode {name}")
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGB if image.shape[2] == 4 else cv2.COLOR_BGR2RGB)
+        return image
+
+    @staticmethod
+    def encode_image(image: np.ndarray, extension: str = '.png', params: Tuple[int, ...] = ()) -> bytes:
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        ok, encoded = cv2.imencode(extension, image, list(params))
+        if not ok:
+            raise ValueError("Failed to encode image")
+        return encoded.tobytes()
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def decode_file(path: str) -> np.ndarray:
+        image = cv2.imread(str(path))
+        if image is None:
+            raise ValueError(f"Failed to load image {path}")
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    @staticmethod
+    def make_thumbnail(image: np.ndarray, thumbnail_size: int) -> np.ndarray:
+        height, width = image.shape[:2]
+        scale = thumbnail_size / max(height, width)
+        if scale >= 1.0:
+            return image.copy()
+        size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def _decode(self, record: ImageRecord) -> np.ndarray:
+        if record.path is None and record.archive_member is not None:
+            archive, member = record.archive_member
+            with zipfile.ZipFile(archive) as f:
+                image = self.decode_bytes(f.read(member), f"{member} in {archive}", cv2.IMREAD_UNCHANGED)
+        elif record.content_hash is not None and record.content_changed is None:
+            # Verify against the project's hash from the same bytes that are decoded.
+            with open(record.path, 'rb') as f:
+                data = f.read()
+            record.content_changed = hashlib.sha256(data).hexdigest() != record.content_hash
+            if record.content_changed:
+                logger.warning("%s has changed since the project was saved", record.path)
+            image = self.decode_bytes(data, record.path)
+        else:
+            image = self.decode_file(record.path)
+        self.decodes += 1
+        return image
+
+    def _register(self, record: ImageRecord, image: np.ndarray):
+        record.shape = image.shape
+        if record.thumbnail is None:
+            record.thumbnail = self.make_thumbnail(image, self.thumbnail_size)
+        if self.spill_to_disk and record.spill_path is None:
+            self._spill(record, image)
+        self._records.append(record)
+        if record.pinned_image is None:
+            self._make_resident(record, image)
+
+    def _spill(self, record: ImageRecord, image: np.ndarray):
+        if self._spill_dir is None:
+            self._temp_dir = tempfile.TemporaryDirectory(prefix='zeeman_frames_')
+            self._spill_dir = Path(self._temp_dir.name)
+        self._spill_dir.mkdir(parents=True, exist_ok=True)
+        record.spill_path = self._spill_dir / f"frame_{id(record):x}.npy"
+        np.save(record.spill_path, np.ascontiguousarray(image))
+
+    def _make_resident(self, record: ImageRecord, image: np.ndarray):
+        key = id(record)
+        self._resident[key] = image
+        self.current_bytes += image.nbytes
+        # Always keep the most recent frame, even if it alone exceeds the budget.
+        while self.current_bytes > self.max_bytes and len(self._resident) > 1:
+            _, evicted = self._resident.popitem(last=False)
+            self.current_bytes -= evicted.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'images': len(self._records),
+            'resident': len(self._resident),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'decodes': self.decodes,
+        }
@@ -0,0 +1,219 @@
+"""
+Project files: a saved analysis session in one zip archive.
+
+project.json holds the session metadata and one entry per image, which refers to the source
+file by path and SHA-256. measurements.npy holds the measurement table. Optional members
+hold JPEG thumbnails, PNG copies of images that have no source file, and cached enhanced
+images. Opening a project reads only the metadata and thumbnails.
+"""
+import json
+import os
+import tempfile
+import zipfile
+import cv2
+import numpy as np
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.physics.zeeman import MeasurementSet
+from src.processing.enhancement_cache import EnhancementCache
+from src.util.image_store import ImageRecord, ImageStore
+
+PROJECT_SUFFIX = '.zeeman'
+FORMAT_NAME = 'zeeman-project'
+FORMAT_VERSION = 1
+THUMBNAIL_JPEG_QUALITY = 85
+
+@dataclass
+class Project:
+    images: ImageStore
+    measurements: MeasurementSet
+    calibration_points: List[Tuple[float, float]] = field(default_factory=list)
+    calibration_params: Optional[Tuple[float, float]] = None
+    settings: Dict[str, Any] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)    # image files that were not found
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if callable(getattr(value, 'x', None)) and callable(getattr(value, 'y', None)):
+        # QPoint and friends, e.g. a measurement center.
+        return [value.x(), value.y()]
+    raise TypeError(f"Cannot store {type(value).__name__} in a project file")
+
+def _params_tuple(params) -> tuple:
+    return tuple(_params_tuple(value) if isinstance(value, list) else value for value in params)
+
+def load_enhanced(record: ImageRecord, params: tuple) -> Optional[np.ndarray]:
+    # The enhanced image embedded for record, if it was made with params.
+    if record.enhanced_member is None or record.enhanced_member[2] != params:
+        return None
+    archive, member, _ = record.enhanced_member
+    with zipfile.ZipFile(archive) as f:
+        return ImageStore.decode_bytes(f.read(member), f"{member} in {archive}", cv2.IMREAD_UNCHANGED)
+
+def _copy_member(source: Tuple[str, str], target: zipfile.ZipFile, name: str):
+    with zipfile.ZipFile(source[0]) as f:
+        target.writestr(name, f.read(source[1]), compress_type=zipfile.ZIP_STORED)
+
+def _image_entry(record: ImageRecord, index: int, images: ImageStore, archive: zipfile.ZipFile, project_dir: Path,
+                 thumbnails: bool, enhancement_cache: Optional[EnhancementCache],
+                 enhancement_params: Optional[tuple]) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {'path': None, 'relative_path': None, 'sha256': None,
+                             'shape': list(record.shape) if record.shape is not None else None,
+                             'metadata': record.metadata, 'image': None, 'thumbnail': None, 'enhanced': None}
+    if record.path is not None:
+        entry['path'] = os.path.abspath(record.path)
+        try:
+            entry['relative_path'] = Path(os.path.relpath(entry['path'], project_dir)).as_posix()
+        except ValueError:
+            # Different drive on Windows.
+            pass
+        # A hash restored from a project stays valid until a decode finds the file changed.
+        if record.content_hash is None or record.content_changed:
+            record.content_hash = images.file_hash(record.path)
+            record.content_changed = False
+        entry['sha256'] = record.content_hash
+    else:
+        # No source file: the pixels only exist in this session, so they are stored losslessly.
+        entry['image'] = f'images/{index}.png'
+        if record.archive_member is not None and images.resident_pixels(record) is None:
+            _copy_member(record.archive_member, archive, entry['image'])
+        else:
+            archive.writestr(entry['image'], images.encode_image(images.get_pixels(record)),
+                             compress_type=zipfile.ZIP_STORED)
+
+    if thumbnails and record.thumbnail is not None:
+        entry['thumbnail'] = f'thumbnails/{index}.jpg'
+        archive.writestr(entry['thumbnail'],
+                         images.encode_image(record.thumbnail, '.jpg',
+                                             (cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY)),
+                         compress_type=zipfile.ZIP_STORED)
+
+    if enhancement_params is not None:
+        # Only enhanced images that are already cached are stored; nothing is computed for the save.
+        pixels = images.resident_pixels(record)
+        enhanced = None
+        if enhancement_cache is not None and pixels is not None:
+            enhanced = enhancement_cache.peek(pixels, enhancement_params)
+        member = f'enhanced/{index}.png'
+        if enhanced is not None:
+            archive.writestr(member, images.encode_image(enhanced), compress_type=zipfile.ZIP_STORED)
+            entry['enhanced'] = {'member': member, 'params': enhancement_params}
+        elif record.enhanced_member is not None and record.enhanced_member[2] == enhancement_params:
+            _copy_member(record.enhanced_member[:2], archive, member)
+            entry['enhanced'] = {'member': member, 'params': enhancement_params}
+    return entry
+
+def save_project(path: Path, images: ImageStore, measurements: MeasurementSet,
+                 calibration_points: Sequence[Tuple[float, float]] = (),
+                 calibration_params: Optional[Tuple[float, float]] = None,
+                 settings: Optional[Dict[str, Any]] = None, thumbnails: bool = True,
+                 enhancement_cache: Optional[EnhancementCache] = None,
+                 enhancement_params: Optional[tuple] = None):
+    """
+    Write the session to path.
+
+    Source files are hashed once per session. Images without a source file are embedded.
+    Thumbnails are embedded unless thumbnails is False. Enhanced images are embedded only
+    if enhancement_params is given and enhancement_cache already holds them.
+    The archive is written to a temporary file first, so a failed save keeps the old project.
+    """
+    path = Path(path)
+    project_dir = path.resolve().parent
+    header = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'calibration_points': [list(point) for point in calibration_points],
+        'calibration_params': list(calibration_params) if calibration_params is not None else None,
+        'settings': settings or {},
+        'measurement_columns': list(MeasurementSet.COLUMNS),
+        'images': [],
+    }
+    fd, temp_path = tempfile.mkstemp(prefix=path.name, suffix='.tmp', dir=project_dir)
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for index, record in enumerate(images):
+                header['images'].append(_image_entry(record, index, images, archive, project_dir, thumbnails,
+                                                     enhancement_cache, enhancement_params))
+            with archive.open('measurements.npy', 'w') as member:
+                np.lib.format.write_array(member, np.stack([measurements.column(name)
+                                                            for name in MeasurementSet.COLUMNS]),
+                                          allow_pickle=False)
+            archive.writestr('project.json', json.dumps(header, separators=(',', ':'), default=_json_default))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    # Embedded members are now read from the new file, which may have replaced the old one.
+    for record, entry in zip(images, header['images']):
+        if entry['image'] is not None:
+            record.archive_member = (str(path), entry['image'])
+        if entry['enhanced'] is not None:
+            record.enhanced_member = (str(path), entry['enhanced']['member'], enhancement_params)
+
+def _find_image(entry: Dict[str, Any], project_dir: Path) -> Optional[str]:
+    # Next to the project first, so a project moved together with its images still opens.
+    candidates = []
+    if entry['relative_path'] is not None:
+        candidates.append(project_dir / entry['relative_path'])
+    candidates.append(Path(entry['path']))
+    candidates.append(project_dir / Path(entry['path']).name)
+    for candidate in candidates:
+        if candidate.is_file():
+            return str(candidate)
+    return None
+
+def load_project(path: Path, images: Optional[ImageStore] = None) -> Project:
+    """
+    Read a project written by save_project.
+
+    Images are added to images (a new ImageStore by default) without being read. Their
+    hashes are checked when they are first decoded. Entries whose source file cannot be
+    found are skipped and listed in Project.missing.
+    """
+    path = Path(path)
+    project_dir = path.resolve().parent
+    images = images if images is not None else ImageStore()
+    missing = []
+    try:
+        with zipfile.ZipFile(path) as archive:
+            header = json.loads(archive.read('project.json'))
+            if header.get('format') != FORMAT_NAME:
+                raise ValueError(f"{path} is not a Zeeman project file")
+            if header.get('version', 0) > FORMAT_VERSION:
+                raise ValueError(f"{path} was saved by a newer version (format {header['version']})")
+
+            with archive.open('measurements.npy') as member:
+                data = np.lib.format.read_array(member, allow_pickle=False)
+            measurements = MeasurementSet.from_columns(dict(zip(header['measurement_columns'], data)))
+
+            for entry in header['images']:
+                source = None
+                if entry['image'] is None:
+                    source = _find_image(entry, project_dir)
+                    if source is None:
+                        missing.append(entry['path'])
+                        continue
+                thumbnail = None
+                if entry['thumbnail'] is not None:
+                    thumbnail = ImageStore.decode_bytes(archive.read(entry['thumbnail']), entry['thumbnail'])
+                record = images.add_reference(
+                    source, entry['shape'], thumbnail, content_hash=entry['sha256'],
+                    archive_member=(str(path), entry['image']) if entry['image'] is not None else None,
+                    **entry['metadata'])
+                if entry['enhanced'] is not None:
+                    record.enhanced_member = (str(path), entry['enhanced']['member'],
+                                              _params_tuple(entry['enhanced']['params']))
+    except (KeyError, TypeError, zipfile.BadZipFile, json.JSONDecodeError) as e:
+        raise ValueError(f"{path} is not a valid project file: {e}")
+
+    calibration_params = header['calibration_params']
+    return Project(images=images, measurements=measurements,
+                   calibration_points=[tuple(point) for point in header['calibration_points']],
+                   calibration_params=tuple(calibration_params) if calibration_params is not None else None,
+                   settings=header['settings'], missing=missing)